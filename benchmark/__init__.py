@@ -0,0 +1,6 @@
+"""Benchmark suite for the CQL interpreter.
+
+    python -m benchmark.generate --rows 1e6          # synthetic CSV files
+    python -m benchmark.run --rows 1e6 -o run.json   # time the workload
+    python -m benchmark.run --rows 1e6 --compare run.json
+"""
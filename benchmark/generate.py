@@ -0,0 +1,148 @@
+"""Synthetic weather data in the format of estacoes.csv / observacoes.csv.
+
+Stations are spread over mainland Portugal and the islands. Observations are
+hourly: every hour has on average one reading per station, but the station
+of each reading is drawn from a Zipf-like distribution, so a few stations
+report much more often than the rest (as with the real network, where some
+stations report every few minutes). Values follow daily and seasonal cycles,
+and about 0.5% of the cells are left empty. The same seed always produces
+the same files.
+"""
+
+import argparse
+import csv
+import math
+import os
+import random
+from bisect import bisect
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+LOCAIS = [
+    'Bouro', 'Braga', 'Porto / Pedras Rubras', 'Viana do Castelo', 'Bragança',
+    'Vila Real', 'Aveiro', 'Viseu', 'Guarda', 'Coimbra', 'Leiria', 'Castelo Branco',
+    'Santarém', 'Lisboa / Geofísico', 'Setúbal, Areias', 'Portalegre', 'Évora',
+    'Beja', 'Sines', 'Faro', 'Olhão, EPPO', 'Sagres', 'Funchal', 'Porto Santo',
+    'Ponta Delgada', 'Angra do Heroísmo', 'Horta', 'Graciosa / Serra das Fontes',
+]
+
+# (longitude, latitude) bounds of the regions stations are placed in, with weights
+REGIONS = [
+    ((-9.5, -6.2), (37.0, 42.1), 0.85),    # Continente
+    ((-17.3, -16.3), (32.6, 33.1), 0.05),  # Madeira
+    ((-31.3, -25.0), (36.9, 39.7), 0.10),  # Açores
+]
+
+DIRECOES = ['N', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'NW']
+
+OBSERVACOES_HEADERS = ['Id', 'IntensidadeVentoKM', 'Temperatura', 'Radiacao', 'DirecaoVento',
+                       'IntensidadeVento', 'Humidade', 'DataHoraObservacao']
+
+START = datetime(2024, 1, 1)
+MISSING_RATE = 0.005
+ZIPF_EXPONENT = 1.1
+
+
+def parse_count(value):
+    """Parse a row count such as 1000, 1e6 or 10^8"""
+    if '^' in value:
+        base, exponent = value.split('^')
+        return int(base) ** int(exponent)
+    return int(float(value))
+
+
+def default_stations(rows):
+    return max(10, min(2000, rows // 1000))
+
+
+def station_weights(stations):
+    """Cumulative Zipf-like weights: station k reports ~1/k^s as often as E1"""
+    return list(accumulate(1 / k ** ZIPF_EXPONENT for k in range(1, stations + 1)))
+
+
+def write_estacoes(filename, stations, rng):
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Id', 'Local', 'Coordenadas'])
+        for k in range(1, stations + 1):
+            (lon_lo, lon_hi), (lat_lo, lat_hi), _ = rng.choices(
+                REGIONS, weights=[r[2] for r in REGIONS])[0]
+            local = LOCAIS[(k - 1) % len(LOCAIS)]
+            if k > len(LOCAIS):
+                local += f" {k // len(LOCAIS) + 1}"
+            coordenadas = f"[{rng.uniform(lon_lo, lon_hi):.8f},{rng.uniform(lat_lo, lat_hi):.8f}]"
+            writer.writerow([f"E{k}", local, coordenadas])
+
+
+def observation(station, when, rng):
+    """One row of observacoes for a station at a given time"""
+    day = when.timetuple().tm_yday
+    hour = when.hour + when.minute / 60
+    season = -math.cos(2 * math.pi * (day - 15) / 365)         # -1 no inverno, 1 no verão
+    daily = -math.cos(2 * math.pi * (hour - 4) / 24)           # mínimo às 4h
+    offset = (station * 7919 % 100) / 20 - 2.5                 # clima local de cada estação
+
+    temperatura = 15 + 7 * season + 5 * daily + offset + rng.gauss(0, 1.5)
+    humidade = min(100.0, max(15.0, 75 - 3 * (temperatura - 15) + rng.gauss(0, 8)))
+    sun = max(0.0, math.sin(math.pi * (hour - 6) / 14)) if 6 <= hour <= 20 else 0.0
+    radiacao = max(0.0, sun * (650 + 300 * season) * rng.uniform(0.4, 1.0))
+    vento_km = rng.gammavariate(2.0, 4.0)
+
+    row = [f"E{station}", f"{vento_km:.1f}", f"{temperatura:.1f}", f"{radiacao:.1f}",
+           rng.choice(DIRECOES), f"{vento_km / 3.6:.1f}", f"{humidade:.1f}",
+           when.strftime('%Y-%m-%dT%H:%M')]
+    if rng.random() < MISSING_RATE:
+        row[rng.randrange(1, 7)] = ''
+    return row
+
+
+def write_observacoes(filename, rows, stations, rng):
+    weights = station_weights(stations)
+    total = weights[-1]
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(OBSERVACOES_HEADERS)
+        for i in range(rows):
+            # Em média uma leitura por estação e por hora, por ordem cronológica
+            when = START + timedelta(hours=i // stations, minutes=(i % stations) * 60 // stations)
+            station = bisect(weights, rng.random() * total) + 1
+            writer.writerow(observation(min(station, stations), when, rng))
+
+
+def generate(directory, rows, stations=None, seed=42):
+    """Write estacoes/observacoes CSV files for a scale and return their paths.
+
+    Files that already exist for the same scale and seed are reused."""
+    stations = stations or default_stations(rows)
+    os.makedirs(directory, exist_ok=True)
+    suffix = f"{rows}_{stations}_{seed}"
+    estacoes = os.path.join(directory, f"estacoes_{suffix}.csv")
+    observacoes = os.path.join(directory, f"observacoes_{suffix}.csv")
+    rng = random.Random(seed)
+    if not os.path.exists(estacoes):
+        write_estacoes(estacoes + '.tmp', stations, rng)
+        os.replace(estacoes + '.tmp', estacoes)
+    rng = random.Random(seed + 1)
+    if not os.path.exists(observacoes):
+        write_observacoes(observacoes + '.tmp', rows, stations, rng)
+        os.replace(observacoes + '.tmp', observacoes)
+    return estacoes, observacoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gerador de dados meteorológicos sintéticos')
+    parser.add_argument('--rows', type=parse_count, default=10 ** 5,
+                        help='número de observações (ex.: 1e6 ou 10^8)')
+    parser.add_argument('--stations', type=int, default=None,
+                        help='número de estações (por omissão depende de --rows)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', default=os.path.join(os.path.dirname(__file__), 'data'),
+                        help='diretório onde são escritos os ficheiros')
+    args = parser.parse_args()
+
+    for filename in generate(args.out, args.rows, args.stations, args.seed):
+        print(filename)
+
+
+if __name__ == '__main__':
+    main()
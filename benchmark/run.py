@@ -0,0 +1,190 @@
+"""Run a fixed CQL workload over generated data and record timings as JSON.
+
+Every case is a CQL statement run in-process through main.run_source; its
+output is discarded. Each case is repeated --repeat times and the median
+time is used for throughput (rows of the input table per second) and for
+comparisons with an earlier run (--compare). Peak RSS is the high-water mark
+of the process after the case. The result cache is disabled unless --cache
+is given, so repeated runs measure real work.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+
+from benchmark.generate import default_stations, generate, parse_count
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import main as cql  # noqa: E402
+
+SETUP = """
+PROCEDURE resumo DO
+    CREATE TABLE frias SELECT Id, Temperatura, DataHoraObservacao FROM observacoes WHERE Temperatura < 5;
+    CREATE TABLE frias_local FROM estacoes JOIN frias USING (Id);
+END;
+"""
+
+# (name, statement, table whose size is the number of rows processed)
+CASES = [
+    ('import_estacoes', 'IMPORT TABLE estacoes FROM "{estacoes}";', 'estacoes'),
+    ('import_observacoes', 'IMPORT TABLE observacoes FROM "{observacoes}";', 'observacoes'),
+    ('select_filter', 'SELECT Id, Temperatura, DataHoraObservacao FROM observacoes '
+                      'WHERE Temperatura > 10 AND Humidade < 95;', 'observacoes'),
+    ('select_limit', 'SELECT * FROM observacoes WHERE Temperatura > 10 LIMIT 100;', 'observacoes'),
+    ('join', 'CREATE TABLE completo FROM estacoes JOIN observacoes USING (Id);', 'observacoes'),
+    ('create_select', 'CREATE TABLE quentes SELECT * FROM observacoes WHERE Temperatura > 8;',
+     'observacoes'),
+    ('export', 'EXPORT TABLE quentes AS "{export}";', 'quentes'),
+    ('call_procedure', 'CALL resumo;', 'observacoes'),
+]
+
+
+class DiscardOutput:
+    """Text sink for the interpreter output that only keeps error messages"""
+    def __init__(self):
+        self.errors = []
+
+    def write(self, text):
+        if text.startswith('Erro'):
+            self.errors.append(text.strip())
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def run_case(statement):
+    """Run a statement; returns (seconds, error messages printed by it)"""
+    sink = DiscardOutput()
+    with redirect_stdout(sink):
+        start = time.perf_counter()
+        cql.run_source(statement)
+        seconds = time.perf_counter() - start
+    return seconds, sink.errors
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(args):
+    stations = args.stations or default_stations(args.rows)
+    estacoes, observacoes = generate(args.data, args.rows, stations, args.seed)
+    files = {'estacoes': estacoes, 'observacoes': observacoes,
+             'export': os.path.join(args.data, 'quentes_export.csv')}
+
+    settings = [f'SET parallelism {args.workers};']
+    if not args.cache:
+        settings.append('SET cache_memory 0;')
+    run_case(' '.join(settings) + SETUP)
+
+    results = []
+    for name, statement, table in CASES:
+        statement = statement.format(**files)
+        times = []
+        for _ in range(args.repeat):
+            seconds, errors = run_case(statement)
+            if errors:
+                raise SystemExit(f"Erro no caso '{name}': {errors[0]}")
+            times.append(seconds)
+        median = statistics.median(times)
+        rows = cql.table_size(cql.tables[table])
+        results.append({
+            'name': name,
+            'statement': statement,
+            'seconds': times,
+            'median_seconds': median,
+            'rows': rows,
+            'rows_per_second': rows / median if median else None,
+            'peak_rss_bytes': cql.peak_memory(),
+        })
+        print(f"{name:<20} {median:10.4f} s {rows / median if median else 0:14,.0f} linhas/s "
+              f"{cql.format_bytes(cql.peak_memory()):>12}", file=sys.stderr)
+
+    if os.path.exists(files['export']):
+        os.remove(files['export'])
+    return {
+        'meta': {
+            'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'rows': args.rows,
+            'stations': stations,
+            'seed': args.seed,
+            'repeat': args.repeat,
+            'workers': args.workers,
+            'cache': args.cache,
+        },
+        'results': results,
+    }
+
+
+def compare(report, baseline, threshold):
+    """Print the change of every case against a baseline; returns the regressions"""
+    previous = {case['name']: case for case in baseline['results']}
+    regressions = []
+    print(f"\nComparação com {baseline['meta'].get('commit')} ({baseline['meta'].get('date')}):",
+          file=sys.stderr)
+    for case in report['results']:
+        old = previous.get(case['name'])
+        if old is None or not old['median_seconds']:
+            continue
+        ratio = case['median_seconds'] / old['median_seconds']
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  REGRESSÃO'
+            regressions.append(case['name'])
+        print(f"{case['name']:<20} {old['median_seconds']:10.4f} s -> "
+              f"{case['median_seconds']:10.4f} s  ({ratio:.2f}x){flag}", file=sys.stderr)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do interpretador CQL')
+    parser.add_argument('--rows', type=parse_count, default=10 ** 5,
+                        help='número de observações (ex.: 1e6 ou 10^8)')
+    parser.add_argument('--stations', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=1, help='SET parallelism')
+    parser.add_argument('--cache', action='store_true', help='manter a cache de resultados ativa')
+    parser.add_argument('--data', default=os.path.join(os.path.dirname(__file__), 'data'),
+                        help='diretório dos ficheiros gerados')
+    parser.add_argument('-o', '--output', help='ficheiro JSON onde guardar os resultados')
+    parser.add_argument('--compare', help='resultados JSON anteriores para comparar')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='abrandamento relativo considerado regressão (por omissão 0.10)')
+    args = parser.parse_args()
+
+    report = run_benchmark(args)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
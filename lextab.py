@@ -0,0 +1,10 @@
+# lextab.py. This file automatically created by PLY (version 3.11). Don't edit!
+_tabversion   = '3.10'
+_lextokens    = set(('ANALYZE', 'AND', 'APPEND', 'AS', 'ASC', 'BY', 'CACHE', 'CALL', 'CLEAR', 'COMMA', 'CREATE', 'DESC', 'DISCARD', 'DO', 'END', 'EQUALS', 'EXECUTE', 'EXPLAIN', 'EXPORT', 'FOLLOW', 'FROM', 'GREATER', 'GREATER_EQ', 'GRID', 'GROUP', 'HASH', 'IDENTIFIER', 'IMPORT', 'INDEX', 'INTO', 'JOIN', 'LESS', 'LESS_EQ', 'LIMIT', 'LOAD', 'LPAREN', 'MATERIALIZED', 'MEMORY', 'MINUS', 'NOT_EQUALS', 'NUMBER', 'ON', 'ORDER', 'PREPARE', 'PRINT', 'PROCEDURE', 'QUESTION', 'REFRESH', 'RENAME', 'RPAREN', 'SAVE', 'SELECT', 'SEMICOLON', 'SET', 'SHOW', 'SORTED', 'STAR', 'STATS', 'STRING', 'TABLE', 'USING', 'WHERE'))
+_lexreflags   = 64
+_lexliterals  = ''
+_lexstateinfo = {'INITIAL': 'inclusive'}
+_lexstatere   = {'INITIAL': [('(?P<t_IDENTIFIER>[a-zA-Z_][a-zA-Z0-9_]*)|(?P<t_STAR>\\*)|(?P<t_STRING>\\"([^\\\\\\n]|(\\\\.))*?\\"|\\\'([^\\\\\\n]|(\\\\.))*?\\\')|(?P<t_NUMBER>\\d+\\.?\\d*)|(?P<t_newline>\\n+)|(?P<t_COMMENT_SINGLELINE>\\-\\-.*)|(?P<t_COMMENT_MULTILINE>\\{\\-[\\s\\S]*?\\-\\})|(?P<t_GREATER_EQ>>=)|(?P<t_LESS_EQ><=)|(?P<t_NOT_EQUALS><>)|(?P<t_LPAREN>\\()|(?P<t_RPAREN>\\))|(?P<t_QUESTION>\\?)|(?P<t_GREATER>>)|(?P<t_LESS><)|(?P<t_EQUALS>=)|(?P<t_COMMA>,)|(?P<t_SEMICOLON>;)|(?P<t_MINUS>-)', [None, ('t_IDENTIFIER', 'IDENTIFIER'), ('t_STAR', 'STAR'), ('t_STRING', 'STRING'), None, None, None, None, ('t_NUMBER', 'NUMBER'), ('t_newline', 'newline'), ('t_COMMENT_SINGLELINE', 'COMMENT_SINGLELINE'), ('t_COMMENT_MULTILINE', 'COMMENT_MULTILINE'), (None, 'GREATER_EQ'), (None, 'LESS_EQ'), (None, 'NOT_EQUALS'), (None, 'LPAREN'), (None, 'RPAREN'), (None, 'QUESTION'), (None, 'GREATER'), (None, 'LESS'), (None, 'EQUALS'), (None, 'COMMA'), (None, 'SEMICOLON'), (None, 'MINUS')])]}
+_lexstateignore = {'INITIAL': ' \t'}
+_lexstateerrorf = {'INITIAL': 't_error'}
+_lexstateeoff = {}
@@ -1,12 +1,32 @@
 import ply.lex as lex
 import ply.yacc as yacc
+import argparse
+import atexit
 import csv
+import glob
+import json
+import heapq
+import io
+import math
+import mmap
 import sys
 import os
+import time
+import pickle
 import re
+import struct
+import threading
 import traceback
 
-from collections import defaultdict
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter, OrderedDict, defaultdict, deque
+from contextlib import contextmanager
+from functools import lru_cache
+from hashlib import blake2b
+from datetime import datetime, timedelta, timezone
+from itertools import chain, count, filterfalse, islice, repeat
+from operator import and_, itemgetter
 
 # ==============================================
 # Lexic
@@ -17,7 +37,12 @@ tokens = (
     'DISCARD', 'RENAME', 'PRINT', 'JOIN', 'USING', 'PROCEDURE', 'DO', 
     'END', 'CALL', 'AND', 'LIMIT', 'AS', 'IDENTIFIER', 'STRING', 'NUMBER',
     'GREATER', 'LESS', 'GREATER_EQ', 'LESS_EQ', 'EQUALS', 'NOT_EQUALS',
-    'COMMA', 'SEMICOLON', 'LPAREN', 'RPAREN','STAR'
+    'COMMA', 'SEMICOLON', 'LPAREN', 'RPAREN','STAR',
+    'INDEX', 'ON', 'HASH', 'SORTED', 'SET', 'SAVE', 'LOAD',
+    'CACHE', 'STATS', 'CLEAR', 'GROUP', 'BY',
+    'ORDER', 'ASC', 'DESC', 'EXPLAIN', 'ANALYZE', 'GRID', 'MINUS',
+    'MATERIALIZED', 'REFRESH', 'INTO', 'APPEND', 'FOLLOW', 'SHOW', 'MEMORY',
+    'PREPARE', 'EXECUTE', 'QUESTION'
 )
 
 
@@ -38,7 +63,34 @@ reserved = {
     'procedure': 'PROCEDURE',
     'do': 'DO',
     'end': 'END',
+    'index': 'INDEX',
+    'on': 'ON',
+    'hash': 'HASH',
+    'sorted': 'SORTED',
+    'grid': 'GRID',
+    'materialized': 'MATERIALIZED',
+    'refresh': 'REFRESH',
+    'into': 'INTO',
+    'append': 'APPEND',
+    'follow': 'FOLLOW',
+    'set': 'SET',
+    'save': 'SAVE',
+    'load': 'LOAD',
+    'cache': 'CACHE',
+    'stats': 'STATS',
+    'clear': 'CLEAR',
+    'show': 'SHOW',
+    'memory': 'MEMORY',
+    'group': 'GROUP',
+    'by': 'BY',
+    'order': 'ORDER',
+    'asc': 'ASC',
+    'desc': 'DESC',
+    'explain': 'EXPLAIN',
+    'analyze': 'ANALYZE',
     'call': 'CALL',
+    'prepare': 'PREPARE',
+    'execute': 'EXECUTE',
     'and': 'AND',
     'limit': 'LIMIT',
     'as': 'AS'
@@ -55,6 +107,8 @@ t_COMMA = r','
 t_SEMICOLON = r';'
 t_LPAREN = r'\('
 t_RPAREN = r'\)'
+t_MINUS = r'-'
+t_QUESTION = r'\?'
 
 # Ignores spaces and tabs
 t_ignore = ' \t'
@@ -94,16 +148,14 @@ def t_error(t):
     print(f"Carácter ilegal '{t.value[0]}'")
     t.lexer.skip(1)
 
-# Constructor
-lexer = lex.lex()
+# The lexer is built lazily, together with the parser (see get_parser)
 
 # ==============================================
 # SINTATIC
 # ==============================================
 
-# Data Structures For Memory
-tables = {}
-procedures = {}
+# The grammar only builds AST nodes (dicts with a 'type' key); execution is
+# done afterwards by the planner/executor below.
 
 def p_program(p):
     '''program : statement
@@ -115,210 +167,125 @@ def p_program(p):
 
 
 def p_statements(p):
-    '''statements : statement SEMICOLON
-                 | statements statement SEMICOLON'''
-    if len(p) == 3:  # statement SEMICOLON
+    '''statements : statement
+                 | statements statement'''
+    if len(p) == 2:
         p[0] = [p[1]] if p[1] is not None else []
-    else:  # statements statement SEMICOLON
+    else:
         p[0] = p[1] + ([p[2]] if p[2] is not None else [])
 
 def p_statement(p):
     '''statement : import_stmt SEMICOLON
+                | follow_stmt SEMICOLON
                 | export_stmt SEMICOLON
+                | save_stmt SEMICOLON
+                | load_stmt SEMICOLON
                 | discard_stmt SEMICOLON
                 | rename_stmt SEMICOLON
                 | print_stmt SEMICOLON
                 | select_stmt SEMICOLON
                 | create_select_stmt SEMICOLON
                 | create_join_stmt SEMICOLON
+                | create_index_stmt SEMICOLON
+                | refresh_stmt SEMICOLON
+                | analyze_stmt SEMICOLON
+                | set_stmt SEMICOLON
+                | cache_stmt SEMICOLON
+                | show_memory_stmt SEMICOLON
+                | explain_stmt SEMICOLON
+                | prepare_stmt SEMICOLON
+                | execute_stmt SEMICOLON
                 | procedure_decl SEMICOLON
-                | procedure_call SEMICOLON'''
-    p[0] = p[1]
+                | procedure_call SEMICOLON
+                | error SEMICOLON'''
+    # Depois de um erro de sintaxe a instrução é descartada até ao ';'
+    p[0] = p[1] if p.slice[1].type != 'error' else None
 
 
-# IMPORT TABLE
+# IMPORT TABLE / IMPORT INTO ... APPEND
 def p_import_stmt(p):
-    'import_stmt : IMPORT TABLE IDENTIFIER FROM STRING'
-    filename = p[5]
-    table_name = p[3]
-    
-    try:
-        with open(filename, 'r', newline='') as f:
-            reader = csv.reader(f)
-            headers = next(reader)
-            num_columns = len(headers)
-
-            valid_data = []
-            line_number = 1  # header is line 1
+    '''import_stmt : IMPORT TABLE IDENTIFIER FROM STRING
+                  | IMPORT INTO IDENTIFIER FROM STRING APPEND'''
+    p[0] = {'type': 'import_stmt', 'table': p[3], 'file': p[5], 'append': len(p) == 7}
 
-            for row in reader:
-                line_number += 1
-
-                # Ignorar linhas comentadas
-                if not row or row[0].strip().startswith('#'):
-                    continue
-
-                # Validação: número de colunas correto
-                if len(row) != num_columns:
-                    print(f"Aviso: Linha {line_number} ignorada - número de colunas inválido (esperado {num_columns}, obtido {len(row)})")
-                    continue
-
-                # Remover aspas de campos se necessário
-                processed_row = [field.strip('"').strip("'") for field in row]
-                valid_data.append(processed_row)
-
-            # Armazenar na memória
-            tables[table_name] = {
-                'headers': headers,
-                'data': valid_data
-            }
-
-            print(f"Tabela '{table_name}' importada com sucesso de '{filename}' ({len(valid_data)} linhas válidas)")
-    
-    except Exception as e:
-        print(f"Erro ao importar tabela de '{filename}': {e}")
-    
-    p[0] = {'type': 'import_stmt', 'table': table_name, 'file': filename}
+# FOLLOW TABLE (ingest the lines appended to a CSV file since the last poll)
+def p_follow_stmt(p):
+    'follow_stmt : FOLLOW TABLE IDENTIFIER FROM STRING'
+    p[0] = {'type': 'follow_stmt', 'table': p[3], 'file': p[5]}
 
 # EXPORT TABLE
 def p_export_stmt(p):
     'export_stmt : EXPORT TABLE IDENTIFIER AS STRING'
-    table_name = p[3]
-    filename = p[5]
-    
-    if table_name not in tables:
-        print(f"Erro: Tabela '{table_name}' não encontrada")
-        return
-    
-    try:
-        with open(filename, 'w', newline='') as f:
-            writer = csv.writer(f, quoting=csv.QUOTE_MINIMAL)
+    p[0] = {'type': 'export_stmt', 'table': p[3], 'file': p[5]}
 
-            table = tables[table_name]
-            writer.writerow(table['headers'])
-            for row in table['data']:
-                writer.writerow(row)
+# SAVE TABLE (formato binário)
+def p_save_stmt(p):
+    'save_stmt : SAVE TABLE IDENTIFIER AS STRING'
+    p[0] = {'type': 'save_stmt', 'table': p[3], 'file': p[5]}
 
-        print(f"Tabela '{table_name}' exportada com sucesso para '{filename}'")
-    
-    except Exception as e:
-        print(f"Erro ao exportar tabela para '{filename}': {e}")
-        
-    p[0] = {'type': 'export_stmt', 'table': table_name, 'file': filename}
+# LOAD TABLE (formato binário)
+def p_load_stmt(p):
+    'load_stmt : LOAD TABLE IDENTIFIER FROM STRING'
+    p[0] = {'type': 'load_stmt', 'table': p[3], 'file': p[5]}
 
 # DISCARD TABLE
 def p_discard_stmt(p):
     'discard_stmt : DISCARD TABLE IDENTIFIER'
-    table_name = p[3]
-    if table_name in tables:
-        del tables[table_name]
-        print(f"Tabela '{table_name}' descartada")
-    else:
-        print(f"Erro: Tabela '{table_name}' não encontrada")
-        
-    p[0] = {'type': 'discard_stmt', 'table': table_name}
+    p[0] = {'type': 'discard_stmt', 'table': p[3]}
 
 # RENAME TABLE
 def p_rename_stmt(p):
     'rename_stmt : RENAME TABLE IDENTIFIER IDENTIFIER'
-    old_name = p[3]
-    new_name = p[4]
-    
-    if old_name in tables:
-        tables[new_name] = tables.pop(old_name)
-        print(f"Tabela '{old_name}' renomeada para '{new_name}'")
-    else:
-        print(f"Erro: Tabela '{old_name}' não encontrada")
-        
-    p[0] = {'type': 'rename_stmt', 'old_table': old_name, 'new_table': new_name}
+    p[0] = {'type': 'rename_stmt', 'old_table': p[3], 'new_table': p[4]}
 
 # PRINT TABLE
 def p_print_stmt(p):
     'print_stmt : PRINT TABLE IDENTIFIER'
-    table_name = p[3]
-    
-    if table_name not in tables:
-        print(f"Erro: Tabela '{table_name}' não encontrada")
-        return
-    
-    table = tables[table_name]
-    print("\n" + " | ".join(table['headers']))
-    print("-" * (sum(len(h) for h in table['headers']) + 3 * (len(table['headers']) - 1)))
-    
-    for row in table['data']:
-        print(" | ".join(str(x) for x in row))
-    print()
-    
-    p[0] = {'type': 'print_stmt', 'table': table_name}
+    p[0] = {'type': 'print_stmt', 'table': p[3]}
 
 def p_select_stmt(p):
-    '''select_stmt : SELECT select_fields FROM IDENTIFIER where_clause limit_clause'''
-    fields = p[2]
-    table_name = p[4]
-    conditions = p[5]
-    limit = p[6]
-
-    if table_name not in tables:
-        print(f"Erro: Tabela '{table_name}' não encontrada")
-        return
-
-    table = tables[table_name]
-    headers = table['headers']
-    data = table['data']
-
-    # Verifica se os campos existem
-    if fields == ['*']:
-        selected_indices = list(range(len(headers)))
-        selected_headers = headers
-    else:
-        selected_indices = []
-        selected_headers = []
-        for field in fields:
-            if field not in headers:
-                print(f"Erro: Campo '{field}' não encontrado na tabela '{table_name}'")
-                return
-            idx = headers.index(field)
-            selected_indices.append(idx)
-            selected_headers.append(field)
-
-    # Aplica cláusula WHERE
-    filtered_data = []
-    for row in data:
-        if not conditions or evaluate_conditions(row, headers, conditions):
-            filtered_data.append([row[i] for i in selected_indices])
-
-    # Aplica cláusula LIMIT
-    if limit is not None:
-        filtered_data = filtered_data[:limit]
-
-    # Imprime o resultado
-    print("\n" + " | ".join(selected_headers))
-    print("-" * (sum(len(h) for h in selected_headers) + 3 * (len(selected_headers) - 1)))
-    for row in filtered_data:
-        print(" | ".join(str(cell) for cell in row))
-    print()
-    # Retorna resultado
+    '''select_stmt : SELECT select_fields FROM IDENTIFIER where_clause group_clause order_clause limit_clause'''
     p[0] = {
         'type': 'select_stmt',
-        'fields': fields,
-        'table': table_name,
-        'conditions': conditions,
-        'limit': limit,
-        'result': {
-            'headers': selected_headers,
-            'data': filtered_data
-        }
+        'fields': p[2],
+        'table': p[4],
+        'conditions': p[5],
+        'group_by': p[6],
+        'order_by': p[7],
+        'limit': p[8]
     }
 
 
 def p_select_fields(p):
     '''select_fields : STAR
-                    | field_list'''
+                    | select_list'''
     if isinstance(p[1], str) and p[1] == '*':
         p[0] = ['*']
     else:
         p[0] = p[1]
 
+def p_select_list(p):
+    '''select_list : select_item
+                  | select_list COMMA select_item'''
+    if len(p) == 2:
+        p[0] = [p[1]]
+    else:
+        p[0] = p[1] + [p[3]]
+
+# A select item is a field name, an aggregate {'func': ..., 'field': ...} or
+# TIME_BUCKET('1h', field) {'func': 'time_bucket', 'width': '1h', 'field': ...}
+def p_select_item(p):
+    '''select_item : IDENTIFIER
+                  | IDENTIFIER LPAREN STAR RPAREN
+                  | IDENTIFIER LPAREN IDENTIFIER RPAREN
+                  | IDENTIFIER LPAREN STRING COMMA IDENTIFIER RPAREN'''
+    if len(p) == 2:
+        p[0] = p[1]
+    elif len(p) == 5:
+        p[0] = {'func': p[1].lower(), 'field': p[3]}
+    else:
+        p[0] = {'func': p[1].lower(), 'width': p[3], 'field': p[5]}
+
 def p_field_list(p):
     '''field_list : IDENTIFIER
                  | field_list COMMA IDENTIFIER'''
@@ -344,19 +311,82 @@ def p_condition_list(p):
         p[0] = p[1] + [p[3]]
 
 def p_condition(p):
-    '''condition : IDENTIFIER GREATER NUMBER
-                 | IDENTIFIER LESS NUMBER
-                 | IDENTIFIER GREATER_EQ NUMBER
-                 | IDENTIFIER LESS_EQ NUMBER
+    '''condition : IDENTIFIER GREATER value
+                 | IDENTIFIER LESS value
+                 | IDENTIFIER GREATER_EQ value
+                 | IDENTIFIER LESS_EQ value
                  | IDENTIFIER EQUALS value
                  | IDENTIFIER NOT_EQUALS value'''
     p[0] = {'field': p[1], 'op': p[2], 'value': p[3]}
 
+# Spatial predicates: WITHIN_BBOX(col, minlon, minlat, maxlon, maxlat),
+# WITHIN_DISTANCE(col, lon, lat, km) and NEAREST(col, lon, lat, k)
+def p_condition_spatial(p):
+    '''condition : IDENTIFIER LPAREN IDENTIFIER COMMA number_list RPAREN'''
+    p[0] = {'field': p[3], 'op': p[1].upper(), 'value': p[5]}
+
+def p_number_list(p):
+    '''number_list : signed_number
+                  | number_list COMMA signed_number'''
+    if len(p) == 2:
+        p[0] = [p[1]]
+    else:
+        p[0] = p[1] + [p[3]]
+
 def p_value(p):
     '''value : STRING
-            | NUMBER'''
+            | signed_number'''
     p[0] = p[1]
 
+# Parameters: '?' in a PREPAREd statement, a name in a procedure with arguments
+def p_value_parameter(p):
+    '''value : QUESTION
+            | IDENTIFIER'''
+    p[0] = {'param': None if p[1] == '?' else p[1]}
+
+def p_value_list(p):
+    '''value_list : value
+                 | value_list COMMA value'''
+    if len(p) == 2:
+        p[0] = [p[1]]
+    else:
+        p[0] = p[1] + [p[3]]
+
+def p_signed_number(p):
+    '''signed_number : NUMBER
+                    | MINUS NUMBER'''
+    p[0] = p[1] if len(p) == 2 else -p[2]
+
+def p_group_clause(p):
+    '''group_clause : GROUP BY select_list
+                   | empty'''
+    if len(p) == 2:
+        p[0] = None
+    else:
+        p[0] = p[3]
+
+def p_order_clause(p):
+    '''order_clause : ORDER BY order_list
+                   | empty'''
+    if len(p) == 2:
+        p[0] = None
+    else:
+        p[0] = p[3]
+
+def p_order_list(p):
+    '''order_list : order_item
+                 | order_list COMMA order_item'''
+    if len(p) == 2:
+        p[0] = [p[1]]
+    else:
+        p[0] = p[1] + [p[3]]
+
+def p_order_item(p):
+    '''order_item : select_item
+                 | select_item ASC
+                 | select_item DESC'''
+    p[0] = {'field': p[1], 'desc': len(p) == 3 and p[2].lower() == 'desc'}
+
 def p_limit_clause(p):
     '''limit_clause : LIMIT NUMBER
                    | empty'''
@@ -365,351 +395,4597 @@ def p_limit_clause(p):
     else:
         p[0] = p[2]
 
-# CREATE TABLE FROM SELECT
+# CREATE [MATERIALIZED] TABLE FROM SELECT
 def p_create_select_stmt(p):
-    'create_select_stmt : CREATE TABLE IDENTIFIER select_stmt'
-    table_name = p[3]
-    select_result = p[4]['result']  # Resultado da consulta SELECT
-    
-    if not isinstance(select_result, dict) or 'headers' not in select_result or 'data' not in select_result:
-        print("Erro: Resultado da consulta SELECT inválido")
-        return
-    
-    if table_name in tables:
-        print(f"Aviso: Substituindo tabela existente '{table_name}'")
-    
-    tables[table_name] = {
-        'headers': select_result['headers'],
-        'data': select_result['data']
-    }
-    print(f"Tabela '{table_name}' criada com sucesso com {len(select_result['data'])} registros")
-    
-    p[0] = {'type': 'create_select_stmt', 'table': table_name, 'select': p[4]}
+    'create_select_stmt : create_table IDENTIFIER select_stmt'
+    p[0] = {'type': 'create_select_stmt', 'table': p[2], 'select': p[3],
+            'materialized': p[1]}
 
 def p_create_join_stmt(p):
-    'create_join_stmt : CREATE TABLE IDENTIFIER FROM IDENTIFIER JOIN IDENTIFIER USING LPAREN IDENTIFIER RPAREN'
-    new_table = p[3]       # Nome da nova tabela
-    left_table = p[5]      # Primeira tabela a unir
-    right_table = p[7]     # Segunda tabela a unir
-    join_column = p[10]     # Coluna para o JOIN
-    
-    # Verificar se as tabelas existem
-    if left_table not in tables:
-        print(f"Erro: Tabela '{left_table}' não encontrada")
-        return
-        
-    if right_table not in tables:
-        print(f"Erro: Tabela '{right_table}' não encontrada")
-        return
-    
-    left_data = tables[left_table]
-    right_data = tables[right_table]
-    
-    # Verificar se a coluna de junção existe em ambas as tabelas
-    if join_column not in left_data['headers']:
-        print(f"Erro: Coluna '{join_column}' não encontrada em '{left_table}'")
-        return
-        
-    if join_column not in right_data['headers']:
-        print(f"Erro: Coluna '{join_column}' não encontrada em '{right_table}'")
-        return
-    
-    # Obter índices das colunas de junção
-    left_idx = left_data['headers'].index(join_column)
-    right_idx = right_data['headers'].index(join_column)
-    
-    # Criar dicionário para lookup da tabela direita
-    right_lookup = {}
-    for row in right_data['data']:
-        key = row[right_idx]
-        if key not in right_lookup:
-            right_lookup[key] = []
-        right_lookup[key].append(row)
-    
-    # Realizar o JOIN
-    joined_data = []
-    for left_row in left_data['data']:
-        join_key = left_row[left_idx]
-        if join_key in right_lookup:
-            for right_row in right_lookup[join_key]:
-                # Combinar as linhas (excluindo a coluna de junção duplicada)
-                combined_row = left_row + right_row[:right_idx] + right_row[right_idx+1:]
-                joined_data.append(combined_row)
-    
-    # Combinar os cabeçalhos (excluindo a coluna de junção duplicada)
-    combined_headers = left_data['headers'] + [
-        h for h in right_data['headers'] if h != join_column
-    ]
-    
-    # Armazenar a nova tabela
-    tables[new_table] = {
-        'headers': combined_headers,
-        'data': joined_data
+    'create_join_stmt : create_table IDENTIFIER FROM IDENTIFIER JOIN IDENTIFIER USING LPAREN field_list RPAREN'
+    p[0] = {
+        'type': 'create_join_stmt',
+        'new_table': p[2],
+        'left_table': p[4],
+        'right_table': p[6],
+        'join_columns': p[9],
+        'materialized': p[1]
     }
-    
-    print(f"Tabela '{new_table}' criada com sucesso a partir do JOIN entre '{left_table}' e '{right_table}'")
-    print(f"Total de registros: {len(joined_data)}")
-    print(f"Colunas: {', '.join(combined_headers)}")
-    
+
+def p_create_table(p):
+    '''create_table : CREATE TABLE
+                   | CREATE MATERIALIZED TABLE'''
+    p[0] = len(p) == 4
+
+# REFRESH TABLE (materialized tables)
+def p_refresh_stmt(p):
+    'refresh_stmt : REFRESH TABLE IDENTIFIER'
+    p[0] = {'type': 'refresh_stmt', 'table': p[3]}
+
+# CREATE INDEX
+def p_create_index_stmt(p):
+    'create_index_stmt : CREATE INDEX IDENTIFIER ON IDENTIFIER LPAREN IDENTIFIER RPAREN index_using'
     p[0] = {
-        'type': 'create_join_stmt', 
-        'new_table': new_table, 
-        'left_table': left_table, 
-        'right_table': right_table, 
-        'join_column': join_column
+        'type': 'create_index_stmt',
+        'name': p[3],
+        'table': p[5],
+        'column': p[7],
+        'kind': p[9]
     }
 
+def p_index_using(p):
+    '''index_using : USING HASH
+                  | USING SORTED
+                  | USING GRID
+                  | empty'''
+    if len(p) == 2:
+        p[0] = 'hash'
+    else:
+        p[0] = p[2].lower()
+
+# ANALYZE TABLE (collect the statistics used by the planner)
+def p_analyze_stmt(p):
+    'analyze_stmt : ANALYZE TABLE IDENTIFIER'
+    p[0] = {'type': 'analyze_stmt', 'table': p[3]}
+
+# SET
+def p_set_stmt(p):
+    'set_stmt : SET IDENTIFIER value'
+    p[0] = {'type': 'set_stmt', 'name': p[2].lower(), 'value': p[3]}
+
+# CACHE STATS / CACHE CLEAR
+def p_cache_stmt(p):
+    '''cache_stmt : CACHE STATS
+                 | CACHE CLEAR'''
+    p[0] = {'type': f'cache_{p[2].lower()}_stmt'}
+
+# SHOW MEMORY
+def p_show_memory_stmt(p):
+    'show_memory_stmt : SHOW MEMORY'
+    p[0] = {'type': 'show_memory_stmt'}
+
+# EXPLAIN [ANALYZE]
+def p_explain_stmt(p):
+    '''explain_stmt : EXPLAIN explainable_stmt
+                   | EXPLAIN ANALYZE explainable_stmt'''
+    p[0] = {'type': 'explain_stmt', 'analyze': len(p) == 4, 'statement': p[len(p) - 1]}
+
+def p_explainable_stmt(p):
+    '''explainable_stmt : select_stmt
+                       | create_select_stmt
+                       | create_join_stmt
+                       | import_stmt'''
+    p[0] = p[1]
+
 # PROCEDURE
 def p_procedure_decl(p):
-    '''procedure_decl : PROCEDURE IDENTIFIER DO statements END'''
-    procedure_name = p[2]
-    statements_text = []
-    mydict={procedure_name:p[4]}
-    print(mydict)
-    # Extract the text of each statement from the statements list
-    for stmt in p[4]:
-        # Find the statement text in the source code if possible
-        # Otherwise just save the statement type for execution
-        if isinstance(stmt, dict) and 'type' in stmt:
-            statements_text.append(stmt)
-    
-    # Store procedure as a list of commands to execute
-    procedures[procedure_name] = statements_text
-    
-    print(f"Procedimento '{procedure_name}' definido com {len(statements_text)} instruções")
-    
-    p[0] = {'type': 'procedure_decl', 'name': procedure_name}
+    '''procedure_decl : PROCEDURE IDENTIFIER DO statements END
+                     | PROCEDURE IDENTIFIER LPAREN field_list RPAREN DO statements END'''
+    if len(p) == 6:
+        p[0] = {'type': 'procedure_decl', 'name': p[2], 'params': [], 'body': p[4]}
+    else:
+        p[0] = {'type': 'procedure_decl', 'name': p[2], 'params': p[4], 'body': p[7]}
 
 # CALL PROCEDURE
 def p_procedure_call(p):
-    'procedure_call : CALL IDENTIFIER'
-    procedure_name = p[2]
-    
-    if procedure_name in procedures:
-        print(f"\nExecutando procedimento '{procedure_name}':")
-        procedure_statements = procedures[procedure_name]
-        
-        for i, stmt in enumerate(procedure_statements):
-            try:
-                if isinstance(stmt, dict) and 'type' in stmt:
-                    # For clarity in debug output
-                    stmt_type = stmt['type']
-                    print(f">> Executando instrução {i+1}: {stmt_type}")
-                    
-                    # Execute different statement types
-                    if stmt_type == 'create_select_stmt':
-                        # For CREATE TABLE ... SELECT
-                        table_name = stmt['table']
-                        select_result = stmt['select']['result']
-                        tables[table_name] = {
-                            'headers': select_result['headers'],
-                            'data': select_result['data']
-                        }
-                        print(f"Tabela '{table_name}' criada com sucesso com {len(select_result['data'])} registros")
-                    
-                    elif stmt_type == 'create_join_stmt':
-                        # For CREATE TABLE ... FROM ... JOIN
-                        execute_join(stmt['new_table'], stmt['left_table'], stmt['right_table'], stmt['join_column'])
-                    
-                    # Add handlers for other statement types as needed
-                    elif stmt_type == 'select_stmt':
-                        # Executar SELECT (já imprime o resultado)
-                        pass
-                    
-                    elif stmt_type == 'print_stmt':
-                        # Imprimir tabela
-                        table_name = stmt['table']
-                        if table_name in tables:
-                            table = tables[table_name]
-                            print("\n" + " | ".join(table['headers']))
-                            print("-" * (sum(len(h) for h in table['headers']) + 3 * (len(table['headers']) - 1)))
-                            for row in table['data']:
-                                print(" | ".join(str(x) for x in row))
-                            print()
-                        else:
-                            print(f"Erro: Tabela '{table_name}' não encontrada")
-                            
-                    # Add other statement types as needed
-                    
-                else:
-                    print(f">> Aviso: Instrução {i+1} não pode ser executada (formato inválido)")
-            except Exception as e:
-                print(f"Erro na execução da instrução {i+1}: {str(e)}")
-                traceback.print_exc()
-        
-        print(f"Procedimento '{procedure_name}' concluído\n")
-    else:
-        print(f"Erro: Procedimento '{procedure_name}' não encontrado")
-    
-    p[0] = {'type': 'procedure_call', 'name': procedure_name}
+    '''procedure_call : CALL IDENTIFIER
+                     | CALL IDENTIFIER LPAREN value_list RPAREN'''
+    p[0] = {'type': 'procedure_call', 'name': p[2], 'args': p[4] if len(p) == 6 else []}
+
+# PREPARE / EXECUTE
+def p_prepare_stmt(p):
+    'prepare_stmt : PREPARE IDENTIFIER AS explainable_stmt'
+    # Os '?' são numerados pela ordem em que aparecem; os argumentos de um
+    # procedimento ({'param': nome}) ficam como estão
+    marks = [param for param in find_parameters(p[4]) if param['param'] is None]
+    for number, param in enumerate(marks, 1):
+        param['param'] = number
+    p[0] = {'type': 'prepare_stmt', 'name': p[2], 'statement': p[4]}
+
+def p_execute_stmt(p):
+    '''execute_stmt : EXECUTE IDENTIFIER
+                   | EXECUTE IDENTIFIER LPAREN value_list RPAREN'''
+    p[0] = {'type': 'execute_stmt', 'name': p[2], 'args': p[4] if len(p) == 6 else []}
 
 def p_empty(p):
     'empty :'
     pass
 
 def p_error(p):
-    if p:
+    # A recuperação é feita pela regra 'statement : error SEMICOLON'
+    if p and p.lexpos >= 0:     # o ';' acrescentado no fim do script tem lexpos -1
         print(f"Erro de sintaxe na linha {p.lineno}, token '{p.value}' (tipo: {p.type})")
-        # Recuperação de erro: descarta tokens até encontrar um ponto-e-vírgula
-        parser.errok()
-        parser.token()  # Descarta o token problemático
     else:
         print("Erro de sintaxe: comando incompleto ou inválido")
 
 # ==============================================
-# Auxiliary Functions
+# Planner / Executor
 # ==============================================
 
-def execute_join(new_table, left_table, right_table, join_column):
-    """Helper function to execute a JOIN operation"""
-    # Verificar se as tabelas existem
-    if left_table not in tables:
-        print(f"Erro: Tabela '{left_table}' não encontrada")
-        return
-        
-    if right_table not in tables:
-        print(f"Erro: Tabela '{right_table}' não encontrada")
-        return
-    
-    left_data = tables[left_table]
-    right_data = tables[right_table]
-    
-    # Verificar se a coluna de junção existe em ambas as tabelas
-    if join_column not in left_data['headers']:
-        print(f"Erro: Coluna '{join_column}' não encontrada em '{left_table}'")
-        return
-        
-    if join_column not in right_data['headers']:
-        print(f"Erro: Coluna '{join_column}' não encontrada em '{right_table}'")
-        return
-    
-    # Obter índices das colunas de junção
-    left_idx = left_data['headers'].index(join_column)
-    right_idx = right_data['headers'].index(join_column)
-    
-    # Criar dicionário para lookup da tabela direita
-    right_lookup = {}
-    for row in right_data['data']:
-        key = row[right_idx]
-        if key not in right_lookup:
-            right_lookup[key] = []
-        right_lookup[key].append(row)
-    
-    # Realizar o JOIN
-    joined_data = []
-    for left_row in left_data['data']:
-        join_key = left_row[left_idx]
-        if join_key in right_lookup:
-            for right_row in right_lookup[join_key]:
-                # Combinar as linhas (excluindo a coluna de junção duplicada)
-                combined_row = left_row + right_row[:right_idx] + right_row[right_idx+1:]
-                joined_data.append(combined_row)
-    
-    # Combinar os cabeçalhos (excluindo a coluna de junção duplicada)
-    combined_headers = left_data['headers'] + [
-        h for h in right_data['headers'] if h != join_column
-    ]
-    
-    # Armazenar a nova tabela
-    tables[new_table] = {
-        'headers': combined_headers,
-        'data': joined_data
-    }
-    
-    print(f"Tabela '{new_table}' criada com sucesso a partir do JOIN entre '{left_table}' e '{right_table}'")
-    print(f"Total de registros: {len(joined_data)}")
-    print(f"Colunas: {', '.join(combined_headers)}")
+# Data Structures For Memory
+tables = {}
+procedures = {}
+prepared = {}       # PREPARE: name -> PreparePlan
+indexes = {}
+materialized = {}
+follows = {}        # FOLLOW TABLE: table -> {'file', 'offset', 'records'}
+table_stats = {}    # ANALYZE TABLE: table -> {'rows', 'columns'} (see Table Statistics)
 
-def evaluate_conditions(row, headers, conditions):
-    for cond in conditions:
-        field = cond['field']
-        op = cond['op']
-        value = cond['value']
-        
-        if field not in headers:
-            return False
-        
-        idx = headers.index(field)
-        cell_value = row[idx]
-        
-        # Try convert to number
-        try:
-            cell_num = float(cell_value)
-            if isinstance(value, str):
-                try:
-                    value_num = float(value)
-                except ValueError:
-                    pass
-                else:
-                    value = value_num
-        except ValueError:
-            pass
-        
-        # Comparasion
-        if op == '=':
-            if str(cell_value) != str(value):
-                return False
-        elif op == '<>':
-            if str(cell_value) == str(value):
-                return False
-        elif op == '>':
-            if float(cell_value) <= float(value):
-                return False
-        elif op == '<':
-            if float(cell_value) >= float(value):
-                return False
-        elif op == '>=':
-            if float(cell_value) < float(value):
-                return False
-        elif op == '<=':
-            if float(cell_value) > float(value):
-                return False
-    
-    return True
+# Settings changed with SET <name> <value>
+settings = {
+    'join_memory': 256 * 1024 * 1024,   # bytes for the build side of a JOIN
+    'parallelism': 1,                   # worker processes for scans and probes
+    'cache_memory': 64 * 1024 * 1024,   # bytes of cached query results
+    'sort_memory': 256 * 1024 * 1024,   # bytes sorted in memory by ORDER BY
+    'auto_analyze': 0,                  # 1 = ANALYZE every table after IMPORT
+    'memory_limit': 0,                  # bytes of tables kept in memory (0 = no limit)
+    'spill_dir': '.',                   # directory of the files of spilled tables
+}
 
-# Construction of parser
-parser = yacc.yacc()
+SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
 
-# ==============================================
-# UI
-# ==============================================
 
-def main():
-    print("Interpretador CQL (Comma Query Language)")
-    
-    if len(sys.argv) > 1:
-        filename = sys.argv[1]
-        
-        if not filename.endswith('.fca'):
-            print("Erro: O ficheiro deve ter extensão .fca")
-            return
-        
-        if not os.path.exists(filename):
-            print(f"Erro: Ficheiro '{filename}' não encontrado")
-            return
-        
-        try:
-            with open(filename, 'r') as f:
-                content = f.read()
-                parser.source_code = content  # Store the source code for procedure extraction
-                commands = [cmd.strip() for cmd in content.split(';') if cmd.strip()]
-                for cmd in commands:
-                    parser.parse(cmd + ';')
-        except Exception as e:
-            print("Erro ao ler o ficheiro:")
-            traceback.print_exc()
+def parse_size(value):
+    """Parse a byte count such as 1048576, '512M' or '4G'"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMGT]?)B?\s*', value.upper())
+    if not match:
+        raise CQLError(f"Tamanho inválido '{value}'")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2)])
+
+
+def parse_positive_int(name, value):
+    if not isinstance(value, int) or value < 1:
+        raise CQLError(f"Valor inválido para '{name}': esperado um inteiro positivo")
+    return value
+
+
+def parse_directory(value):
+    if not isinstance(value, str) or not os.path.isdir(value):
+        raise CQLError(f"Diretório '{value}' não encontrado")
+    return value
+
+
+def parse_flag(name, value):
+    if value not in (0, 1):
+        raise CQLError(f"Valor inválido para '{name}': esperado 0 ou 1")
+    return value
+
+
+class CQLError(Exception):
+    """Error raised while executing a statement (message is shown to the user)"""
+
+
+def get_table(table_name):
+    if table_name not in tables:
+        raise CQLError(f"Tabela '{table_name}' não encontrada")
+    touch_table(table_name)
+    table = tables[table_name]
+    if table.get('spilled'):
+        return reload_table(table_name)
+    return table
+
+
+# Every change to the catalog goes through these helpers so that whatever is
+# derived from a table (indexes, cached results) follows it.
+
+def store_table(table_name, table, definition=None):
+    """Register a table, replacing any table with the same name.
+
+    definition is the materialized table definition the table was built
+    from (None for a plain table)."""
+    discard_spilled(tables.get(table_name))
+    tables[table_name] = table
+    follows.pop(table_name, None)
+    table_stats.pop(table_name, None)
+    if definition is None:
+        materialized.pop(table_name, None)
     else:
+        materialized[table_name] = definition
+    invalidate_indexes(table_name)
+    bump_table_version(table_name)
+    touch_table(table_name)
+    enforce_memory_limit(table_name)
+    refresh_dependents(table_name)
+
+
+def append_table(table_name, delta):
+    """Append the rows of delta (a table with the same columns) to a table"""
+    table = appendable_table(table_name)
+    if delta['headers'] != table['headers'] or delta['types'] != table['types']:
+        raise CQLError(f"As colunas a acrescentar não correspondem às de '{table_name}'")
+    start = table_size(table)
+    for column, new in zip(table['columns'], delta['columns']):
+        column.extend(new)
+
+    # Uma coluna ordenada continua ordenada se as novas linhas vierem depois
+    known = table.get('sorted_columns', {})
+    for position in [p for p, ordered in known.items() if ordered]:
+        column = table['columns'][position]
+        known[position] = all(column[i - 1] <= column[i]
+                              for i in range(max(start, 1), len(column)))
+    extend_zone_maps(table, start)
+    extend_indexes(table_name, start)
+    table_stats.pop(table_name, None)
+    bump_table_version(table_name)
+    touch_table(table_name)
+    enforce_memory_limit(table_name)
+    refresh_dependents(table_name, start)
+
+
+def appendable_table(table_name):
+    """The table with columns of its own, copied once so that appending never
+    changes data shared with the result cache or a mapped file"""
+    # Uma tabela despejada volta primeiro para a memória (e o ficheiro é
+    # apagado): uma cópia que guardasse 'spilled' seria recarregada por cima
+    # das linhas acrescentadas
+    table = get_table(table_name)
+    if not table.get('appendable'):
+        columns = [new_column(t, column) for t, column in zip(table['types'], table['columns'])]
+        zones = {position: {key: list(values) for key, values in zone.items()}
+                 for position, zone in table.get('zones', {}).items()}
+        table = tables[table_name] = dict(table, columns=columns, zones=zones, appendable=True)
+    return table
+
+
+def drop_table(table_name):
+    discard_spilled(tables.pop(table_name))
+    materialized.pop(table_name, None)
+    follows.pop(table_name, None)
+    table_stats.pop(table_name, None)
+    forget_table_use(table_name)
+    for index in indexes_on(table_name):
+        del indexes[index['name']]
+    bump_table_version(table_name)
+
+
+def rename_table(old_name, new_name):
+    replaced = new_name in tables
+    if replaced:
+        drop_table(new_name)
+    tables[new_name] = tables.pop(old_name)
+    if old_name in materialized:
+        materialized[new_name] = dict(materialized.pop(old_name), name=new_name)
+    # As definições que liam a tabela passam a lê-la pelo novo nome
+    for name, definition in list(materialized.items()):
+        if old_name in definition['sources']:
+            materialized[name] = renamed_definition(definition, old_name, new_name)
+    if old_name in follows:
+        follows[new_name] = follows.pop(old_name)
+    if old_name in table_stats:
+        table_stats[new_name] = table_stats.pop(old_name)
+    forget_table_use(old_name)
+    touch_table(new_name)
+    for index in indexes_on(old_name):
+        index['table'] = new_name
+    bump_table_version(old_name)
+    bump_table_version(new_name)
+    if replaced:
+        # O que era construído sobre a tabela substituída lê agora outros dados
+        refresh_dependents(new_name)
+
+
+# ---------- Parameters ----------
+# A value in a statement may be a parameter instead of a literal: a '?' of a
+# PREPAREd statement (numbered 1, 2, ... in order) or the name of an argument
+# of the procedure it is in. The AST keeps {'param': number or name}; EXECUTE
+# and CALL bind the arguments for the running thread and the plans read the
+# values through bind_values() when they run, so a statement is parsed and
+# planned once however many times it is executed.
+
+parameter_state = threading.local()
+
+
+@contextmanager
+def parameter_bindings(bindings):
+    """Make the parameter values visible to the plans run inside"""
+    previous = getattr(parameter_state, 'bindings', None)
+    parameter_state.bindings = bindings
+    try:
+        yield
+    finally:
+        parameter_state.bindings = previous
+
+
+def is_parameter(node):
+    return isinstance(node, dict) and node.keys() == {'param'}
+
+
+def find_parameters(node):
+    """The parameter nodes of an AST node, in the order they were written"""
+    if is_parameter(node):
+        yield node
+    elif isinstance(node, dict):
+        for value in node.values():
+            yield from find_parameters(value)
+    elif isinstance(node, list):
+        for item in node:
+            yield from find_parameters(item)
+
+
+def bind_values(node):
+    """Copy of an AST node with its parameters replaced by their current values"""
+    if is_parameter(node):
+        name = node['param']
+        bindings = getattr(parameter_state, 'bindings', None) or {}
+        if name in bindings:
+            return bindings[name]
+        if name is None:
+            raise CQLError("'?' só pode ser usado numa instrução PREPARE")
+        raise CQLError(f"Valor '{name}' desconhecido: use aspas para texto ou "
+                       f"um argumento do procedimento")
+    if isinstance(node, dict):
+        return {key: bind_values(value) for key, value in node.items()}
+    if isinstance(node, list):
+        return [bind_values(item) for item in node]
+    return node
+
+
+# ---------- Operators ----------
+# Each operator is built once by the planner and can be run many times; every
+# call to run() reads the current state of the catalog and returns a fresh
+# relation {'headers': [...], 'types': [...], 'columns': [...], 'ids': ...}.
+# 'columns' are the typed columns the rows come from and 'ids' an iterable of
+# the positions of the rows that are part of the relation, so filters and
+# projections never copy column data. Operators that produce new rows (JOIN)
+# return {'headers', 'types', 'rows': iterator} instead.
+#
+# Relations are lazy: 'ids'/'rows' are only pulled by the sink (PRINT,
+# EXPORT, CREATE TABLE), so a LIMIT stops the scan as soon as it is reached.
+
+class TableScan:
+    def __init__(self, table_name):
+        self.table_name = table_name
+
+    def run(self):
+        table = get_table(self.table_name)
+        return table_relation(table)
+
+    def describe(self):
+        size = table_size(tables[self.table_name]) if self.table_name in tables else 0
+        return f"TableScan {self.table_name} ({size} rows)"
+
+
+class DeltaScan:
+    """The rows of a table from row 'start' on (new rows of a materialized table source)"""
+    def __init__(self, table_name, start):
+        self.table_name = table_name
+        self.start = start
+
+    def run(self):
+        table = get_table(self.table_name)
+        return dict(table_relation(table), ids=range(self.start, table_size(table)))
+
+    def describe(self):
+        return f"DeltaScan {self.table_name} (from row {self.start})"
+
+
+class Filter:
+    def __init__(self, child, conditions):
+        self.child = child
+        self.conditions = conditions
+        self.access_path = 'full scan'
+        self.remaining = conditions     # condições avaliadas linha a linha
+        self.workers = 1
+        self.estimate = None            # linhas previstas pelas estatísticas
+        self.parameterized = any(True for _ in find_parameters(conditions))
+
+    def run(self):
+        relation, conditions = self.access(self.child.run())
+        predicate = compile_conditions(conditions, relation)
+        if predicate is None:
+            return relation
+
+        self.workers = parallel_workers(relation)
+        if self.workers > 1:
+            return dict(relation, ids=parallel_filter(relation, conditions, self.workers))
+        return dict(relation, ids=filter(predicate, relation['ids']))
+
+    def access(self, relation):
+        """Choose the access path; returns the candidate rows and the conditions left"""
+        conditions = bind_values(self.conditions) if self.parameterized else self.conditions
+        where = conditions
+        self.access_path = 'full scan'
+        self.workers = 1
+
+        # Directly over a table an index may answer part of the WHERE clause
+        if isinstance(self.child, TableScan):
+            access = choose_access_path(self.child.table_name, relation, conditions)
+            if access is not None:
+                ids, conditions, self.access_path = access
+                relation = dict(relation, ids=ids)
+
+        # Com estatísticas, as condições mais seletivas e baratas vêm primeiro
+        stats = table_stats.get(getattr(self.child, 'table_name', None))
+        self.estimate = None
+        if stats is not None:
+            # A estimativa conta também as condições respondidas pelo índice
+            self.estimate = round(stats['rows'] * conditions_selectivity(
+                stats, where, relation))
+            conditions = order_conditions(stats, conditions, relation)
+        self.remaining = conditions
+        return relation, conditions
+
+    def prepare(self):
+        """Make the planning decisions of run() without scanning (EXPLAIN)"""
+        relation, conditions = self.access(self.child.run())
+        if conditions:
+            self.workers = parallel_workers(relation)
+
+    def describe(self):
+        text = "Filter"
+        if self.remaining:
+            text += " " + " AND ".join(format_condition(c) for c in self.remaining)
+        text += f" [{self.access_path}"
+        if self.workers > 1:
+            text += f", parallel ({self.workers} workers)"
+        if self.estimate is not None:
+            text += f", est. {self.estimate} rows"
+        return text + "]"
+
+
+class Project:
+    def __init__(self, child, fields, table_name):
+        self.child = child
+        self.fields = fields
+        self.table_name = table_name
+
+    def run(self):
+        relation = self.child.run()
+        headers = relation['headers']
+        if self.fields == ['*']:
+            return relation
+
+        # Verifica se os campos existem
+        selected_indices = []
+        for field in self.fields:
+            if field not in headers:
+                raise CQLError(f"Campo '{field}' não encontrado na tabela '{self.table_name}'")
+            selected_indices.append(headers.index(field))
+
+        projected = dict(relation,
+                         headers=list(self.fields),
+                         types=[relation['types'][i] for i in selected_indices])
+        if 'rows' in relation:
+            projected['rows'] = (tuple([row[i] for i in selected_indices])
+                                 for row in relation['rows'])
+        else:
+            projected['columns'] = [relation['columns'][i] for i in selected_indices]
+        return projected
+
+    def describe(self):
+        return "Project " + ", ".join(self.fields)
+
+
+class Limit:
+    def __init__(self, child, limit):
+        self.child = child
+        self.limit = limit
+
+    def run(self):
+        relation = self.child.run()
+        if 'rows' in relation:
+            return dict(relation, rows=islice(relation['rows'], self.limit))
+        ids = relation['ids']
+        if isinstance(ids, range):
+            return dict(relation, ids=ids[:self.limit])
+        return dict(relation, ids=islice(ids, self.limit))
+
+    def describe(self):
+        return f"Limit {self.limit}"
+
+
+AGGREGATE_FUNCTIONS = ('count', 'sum', 'avg', 'min', 'max')
+
+
+class HashAggregate:
+    """GROUP BY with COUNT/SUM/AVG/MIN/MAX, computed in a single pass.
+
+    The hash table only keeps one accumulator list per group (keyed on the
+    GROUP BY columns), never the grouped rows, so memory grows with the number
+    of groups and not with the size of the input."""
+    def __init__(self, child, fields, group_by, table_name):
+        self.child = child
+        self.fields = fields
+        self.group_by = group_by or []
+        self.table_name = table_name
+        self.groups = None
+
+    def run(self):
+        relation = self.child.run()
+        headers = relation['headers']
+        types = relation['types']
+        if self.fields == ['*']:
+            raise CQLError("SELECT * não pode ser usado com GROUP BY")
+
+        # Chave: (posição da coluna, largura do TIME_BUCKET ou None)
+        keys = []
+        for item in self.group_by:
+            field = item if isinstance(item, str) else item['field']
+            if field not in headers:
+                raise CQLError(f"Campo '{field}' não encontrado na tabela '{self.table_name}'")
+            position = headers.index(field)
+            if isinstance(item, str):
+                keys.append((position, None))
+            elif item['func'] != 'time_bucket':
+                raise CQLError(f"GROUP BY só aceita campos e TIME_BUCKET ({field_name(item)})")
+            elif types[position] != 'timestamp':
+                raise CQLError(f"TIME_BUCKET requer uma coluna temporal (campo '{field}')")
+            else:
+                keys.append((position, parse_interval(item['width'])))
+        key_names = [field_name(item) for item in self.group_by]
+
+        # Cada campo do SELECT é uma coluna da chave ou um agregado
+        aggregates = []
+        outputs = []
+        out_types = []
+        for item in self.fields:
+            if isinstance(item, str) or item['func'] == 'time_bucket':
+                name = field_name(item)
+                field = item if isinstance(item, str) else item['field']
+                if field not in headers:
+                    raise CQLError(f"Campo '{field}' não encontrado na tabela '{self.table_name}'")
+                if name not in key_names:
+                    raise CQLError(f"Campo '{name}' tem de constar do GROUP BY ou ser agregado")
+                n = key_names.index(name)
+                outputs.append(('key', n))
+                out_types.append(types[keys[n][0]])
+                continue
+
+            func, field = item['func'], item['field']
+            if func not in AGGREGATE_FUNCTIONS:
+                raise CQLError(f"Função de agregação '{func.upper()}' desconhecida")
+            if field == '*':
+                if func != 'count':
+                    raise CQLError(f"{func.upper()}(*) não é suportado")
+                position = None
+            elif field not in headers:
+                raise CQLError(f"Campo '{field}' não encontrado na tabela '{self.table_name}'")
+            else:
+                position = headers.index(field)
+                if func in ('sum', 'avg') and types[position] not in NUMERIC_TYPES:
+                    raise CQLError(f"{func.upper()} requer uma coluna numérica (campo '{field}')")
+                if func != 'count' and types[position] == 'point':
+                    raise CQLError(f"{func.upper()} não se aplica à coluna espacial '{field}'")
+            outputs.append(('aggregate', len(aggregates)))
+            out_types.append(aggregate_type(func, types[position] if position is not None else None))
+            aggregates.append((func, position))
+
+        aggregate, initial, results = compile_aggregation(relation, keys, aggregates)
+        groups = {}
+        aggregate(groups)
+        if not groups and not keys:
+            # Sem GROUP BY há sempre uma linha, mesmo sem registos
+            groups[()] = list(initial)
+        self.groups = len(groups)
+
+        rows = [group_row(key, accumulator, len(keys), outputs, results)
+                for key, accumulator in groups.items()]
+        # MIN/MAX de um grupo vazio sobre uma coluna inteira não cabem num array('q')
+        for n, out_type in enumerate(out_types):
+            if out_type == 'int' and any(isinstance(row[n], float) for row in rows):
+                out_types[n] = 'float'
+        return {'headers': [field_name(item) for item in self.fields],
+                'types': out_types, 'rows': iter(rows)}
+
+    def describe(self):
+        text = "HashAggregate " + ", ".join(field_name(item) for item in self.fields)
+        if self.group_by:
+            text += " group by " + ", ".join(field_name(item) for item in self.group_by)
+        if self.groups is not None:
+            text += f" [{self.groups} groups]"
+        return text
+
+
+def aggregate_type(func, col_type):
+    if func == 'count':
+        return 'int'
+    if func == 'avg':
+        return 'float'
+    return col_type
+
+
+def group_row(key, accumulator, key_size, outputs, results):
+    if key_size == 1:
+        key = (key,)
+    return tuple([key[n] if kind == 'key' else results[n](accumulator)
+                  for kind, n in outputs])
+
+
+class Sort:
+    """ORDER BY over a relation.
+
+    With a LIMIT only the best k rows are kept, in a bounded heap. Otherwise
+    rows are sorted in memory up to settings['sort_memory'] bytes; beyond
+    that sorted runs are spilled to temporary files and merged."""
+    def __init__(self, child, order, limit, table_name):
+        self.child = child
+        self.order = order
+        self.limit = limit
+        self.table_name = table_name
+        self.runs = None         # corridas despejadas para disco (0 = em memória)
+
+    def run(self):
+        relation = self.child.run()
+        self.runs = 0
+        key = compile_sort_key(self.order, relation, self.table_name)
+        # Sobre colunas ordenam-se apenas os ids das linhas
+        items = relation['rows'] if 'rows' in relation else relation['ids']
+        if self.limit is not None:
+            ordered = heapq.nsmallest(self.limit, items, key=key)
+        else:
+            ordered = self.external_sort(items, key)
+        if 'rows' in relation:
+            return dict(relation, rows=iter(ordered))
+        return dict(relation, ids=ordered)
+
+    def external_sort(self, items, key):
+        budget = settings['sort_memory']
+        run = []
+        files = []
+        item_bytes = None
+        try:
+            for item in items:
+                run.append((key(item), item))
+                if item_bytes is None:
+                    item_bytes = estimate_sort_item_bytes(run[0])
+                if len(run) * item_bytes > budget:
+                    run.sort(key=itemgetter(0))
+                    files.append(spill_run(run))
+                    run = []
+            run.sort(key=itemgetter(0))
+            if not files:
+                yield from map(itemgetter(1), run)
+                return
+
+            self.runs = len(files)
+            # Demasiadas corridas: juntá-las por fases para limitar os ficheiros abertos
+            while len(files) > MAX_MERGE_RUNS:
+                group, files = files[:MAX_MERGE_RUNS], files[MAX_MERGE_RUNS:]
+                merged = heapq.merge(*map(read_partition, group), key=itemgetter(0))
+                files.append(spill_run(merged))
+                for f in group:
+                    f.close()
+            # heapq.merge é estável: em caso de empate mantém a ordem das corridas
+            merged = heapq.merge(*map(read_partition, files), run, key=itemgetter(0))
+            yield from map(itemgetter(1), merged)
+        finally:
+            for f in files:
+                f.close()
+
+    def describe(self):
+        text = "Sort " + ", ".join(field_name(o['field']) + (" DESC" if o['desc'] else "")
+                                   for o in self.order)
+        if self.limit is not None:
+            return text + f" [top-{self.limit} heap]"
+        if self.runs is None:
+            return text + f" [in memory up to {settings['sort_memory']} bytes, external merge beyond]"
+        if self.runs:
+            return text + f" [external merge sort, {self.runs} spilled runs]"
+        return text + " [in memory]"
+
+
+class Descending:
+    """Sort key wrapper that reverses the order of a value (DESC on text)"""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+class HashJoin:
+    """Equi-join on one or more USING columns.
+
+    The hash table is built on the smaller input (or taken from an existing
+    hash index). If the build side grows past settings['join_memory'] bytes
+    the join switches to a grace hash join: both inputs are partitioned by
+    key into temporary files and each partition pair is joined on its own.
+    When both tables have been analyzed the build side is the one with the
+    smaller estimated hash table, and a build side known to be over budget
+    is partitioned from the start."""
+    def __init__(self, left, right, left_name, right_name, join_columns):
+        self.left = left
+        self.right = right
+        self.left_name = left_name
+        self.right_name = right_name
+        self.join_columns = join_columns
+        self.build_side = None
+        self.workers = 1
+        self.code_join = False
+        self.partitions = 0      # partições do grace hash join (0 = em memória)
+        self.repartitions = 0    # partições que voltaram a ser divididas
+        self.planned_partitions = 0
+        self.estimate = None
+
+    def run(self):
+        left_data = self.left.run()
+        right_data = self.right.run()
+        join_columns = self.join_columns
+
+        # Verificar se as colunas de junção existem em ambas as tabelas
+        for join_column in join_columns:
+            if join_column not in left_data['headers']:
+                raise CQLError(f"Coluna '{join_column}' não encontrada em '{self.left_name}'")
+            if join_column not in right_data['headers']:
+                raise CQLError(f"Coluna '{join_column}' não encontrada em '{self.right_name}'")
+
+        # Obter índices das colunas de junção
+        left_positions = [left_data['headers'].index(c) for c in join_columns]
+        right_positions = [right_data['headers'].index(c) for c in join_columns]
+        left_key = itemgetter(*left_positions)
+        right_key = itemgetter(*right_positions)
+        right_rest = row_getter([i for i, h in enumerate(right_data['headers'])
+                                 if h not in join_columns])
+
+        # Lado de construção: um índice hash existente ou a entrada mais pequena
+        build_left = self.choose_build_side(left_data, right_data)
+        if build_left:
+            build, probe, build_key, probe_key = left_data, right_data, left_key, right_key
+            build_positions, probe_positions = left_positions, right_positions
+            combine = lambda build_row, probe_row: build_row + right_rest(probe_row)
+        else:
+            build, probe, build_key, probe_key = right_data, left_data, right_key, left_key
+            build_positions, probe_positions = right_positions, left_positions
+            combine = lambda build_row, probe_row: probe_row + right_rest(build_row)
+
+        build_index = self.build_index(build_left)
+        self.plan_strategy(build_left, build, probe, build_index)
+        if self.planned_partitions:
+            # As estatísticas mostram que a construção não cabe: partição imediata
+            self.partitions = self.planned_partitions
+            rows = self.grace_hash_join(relation_rows(build), relation_rows(probe), build_key,
+                                        probe_key, combine, self.partitions, 0)
+        elif self.workers > 1:
+            # Sonda em paralelo: os trabalhadores só devolvem pares de ids
+            if build_index is not None:
+                lookup = index_data(build_index)
+            else:
+                lookup = build_id_lookup(build, build_positions)
+            pairs = parallel_probe(probe, probe_positions, lookup, self.workers)
+            rows = gather_pairs(pairs, probe['columns'], build['columns'], combine)
+        elif build_index is not None:
+            lookup = IndexLookup(index_data(build_index), build['columns'])
+            rows = probe_lookup(lookup, relation_rows(probe), probe_key, combine)
+        elif self.code_join:
+            pairs = code_join_pairs(build, probe, build_positions[0], probe_positions[0])
+            rows = gather_pairs(pairs, probe['columns'], build['columns'], combine)
+        else:
+            rows = self.hash_join(relation_rows(build), relation_rows(probe), build_key,
+                                  probe_key, combine, relation_size(build))
+
+        # Combinar os cabeçalhos (excluindo as colunas de junção duplicadas)
+        combined_headers = left_data['headers'] + [
+            h for h in right_data['headers'] if h not in join_columns
+        ]
+        combined_types = left_data['types'] + [
+            t for h, t in zip(right_data['headers'], right_data['types']) if h not in join_columns
+        ]
+        return {'headers': combined_headers, 'types': combined_types, 'rows': rows}
+
+    def plan_strategy(self, build_left, build, probe, build_index):
+        """Decide how the hash table is obtained and whether to probe in parallel"""
+        self.partitions = self.repartitions = 0
+        if build_index is not None:
+            self.build_side = f"hash index '{build_index['name']}' on {self.build_name(build_left)}"
+        else:
+            self.build_side = f"hash build on {self.build_name(build_left)}"
+        self.workers = 1
+        self.code_join = False
+        self.planned_partitions = 0
+        self.estimate = self.estimate_rows()
+        if 'columns' in build and 'columns' in probe:
+            workers = parallel_workers(probe)
+            if workers > 1 and (build_index is not None or self.build_fits(build)):
+                self.workers = workers
+                return
+            if build_index is None and self.dictionary_keys(build, probe) and self.build_fits(build):
+                # Chaves codificadas dos dois lados: a junção compara códigos
+                self.code_join = True
+                self.build_side = f"dictionary-code hash build on {self.build_name(build_left)}"
+                return
+        build_bytes = self.estimate_build_bytes(build_left)
+        if build_index is None and build_bytes is not None:
+            budget = settings['join_memory']
+            if build_bytes > budget:
+                self.planned_partitions = min(MAX_JOIN_PARTITIONS,
+                                              max(2, 2 * math.ceil(build_bytes / budget)))
+
+    def dictionary_keys(self, build, probe):
+        """Whether the join is on one column that is dictionary-encoded on both sides"""
+        if len(self.join_columns) != 1:
+            return False
+        column = self.join_columns[0]
+        return all(isinstance(r['columns'][r['headers'].index(column)], DictColumn)
+                   for r in (build, probe))
+
+    def prepare(self):
+        """Make the planning decisions of run() without joining (EXPLAIN)"""
+        left_data = self.left.run()
+        right_data = self.right.run()
+        build_left = self.choose_build_side(left_data, right_data)
+        build, probe = (left_data, right_data) if build_left else (right_data, left_data)
+        self.plan_strategy(build_left, build, probe, self.build_index(build_left))
+
+    def describe(self):
+        text = (f"HashJoin {self.left_name}, {self.right_name} using "
+                f"({', '.join(self.join_columns)}) [{self.strategy()}")
+        if self.estimate is not None:
+            text += f", est. {self.estimate} rows"
+        return text + "]"
+
+    def strategy(self):
+        """Describe how the last run built and probed the join"""
+        text = self.build_side or 'not run'
+        if self.partitions or self.planned_partitions:
+            text += f", grace hash join ({self.partitions or self.planned_partitions} partitions"
+            if self.repartitions:
+                text += f", {self.repartitions} re-partitioned"
+            text += ")"
+        if self.workers > 1:
+            text += f", parallel probe ({self.workers} workers)"
+        return text
+
+    def build_fits(self, build):
+        """Whether the build side stays within the JOIN_MEMORY budget"""
+        size = relation_size(build)
+        if not size:
+            return size == 0
+        first = next(iter(build['ids']))
+        sample = tuple(column[first] for column in build['columns'])
+        return size * estimate_row_bytes(sample) <= settings['join_memory']
+
+    def build_name(self, build_left):
+        return self.left_name if build_left else self.right_name
+
+    def build_index(self, build_left):
+        if len(self.join_columns) != 1:
+            return None
+        child = self.left if build_left else self.right
+        if not isinstance(child, TableScan):
+            return None
+        return find_index(child.table_name, self.join_columns[0], 'hash')
+
+    def choose_build_side(self, left_data, right_data):
+        """True when the hash table should be built on the left input"""
+        if len(self.join_columns) == 1:
+            # Um índice hash já construído dispensa a fase de construção
+            if self.build_index(False) is not None:
+                return False
+            if self.build_index(True) is not None:
+                return True
+        # Com estatísticas dos dois lados compara-se o tamanho da tabela de hash
+        left_bytes = self.estimate_build_bytes(True)
+        right_bytes = self.estimate_build_bytes(False)
+        if left_bytes is not None and right_bytes is not None:
+            return left_bytes < right_bytes
+        left_size = relation_size(left_data)
+        right_size = relation_size(right_data)
+        return left_size is not None and right_size is not None and left_size < right_size
+
+    def input_stats(self, left):
+        """Statistics of an input that reads a whole analyzed table (or None)"""
+        child = self.left if left else self.right
+        if not isinstance(child, TableScan):
+            return None
+        return table_stats.get(child.table_name)
+
+    def estimate_build_bytes(self, build_left):
+        """Estimated size of a hash table built on one input, from its statistics"""
+        stats = self.input_stats(build_left)
+        if stats is None:
+            return None
+        return stats['rows'] * stats_row_bytes(stats)
+
+    def estimate_rows(self):
+        """Estimated join output: |L| * |R| / the largest distinct count of a key
+        column (the columns of a composite key are usually correlated)"""
+        left, right = self.input_stats(True), self.input_stats(False)
+        if left is None or right is None:
+            return None
+        if any(c not in left['columns'] or c not in right['columns'] for c in self.join_columns):
+            return None
+        distinct = max(stats['columns'][c]['distinct']
+                       for c in self.join_columns for stats in (left, right))
+        return round(left['rows'] * right['rows'] / max(1, distinct))
+
+    def hash_join(self, build_rows, probe_rows, build_key, probe_key, combine, build_size,
+                  depth=0):
+        """In-memory hash join that falls back to grace hash join over budget"""
+        budget = settings['join_memory']
+        lookup = defaultdict(list)
+        build_rows = iter(build_rows)
+        row_bytes = None
+        count = 0
+        for row in build_rows:
+            lookup[build_key(row)].append(row)
+            count += 1
+            if row_bytes is None:
+                row_bytes = estimate_row_bytes(row)
+            if depth < MAX_SPILL_DEPTH and count * row_bytes > budget:
+                # Orçamento excedido: particionar tudo em disco
+                if build_size is None:
+                    partitions = DEFAULT_JOIN_PARTITIONS
+                else:
+                    partitions = min(MAX_JOIN_PARTITIONS,
+                                     max(2, 2 * math.ceil(build_size * row_bytes / budget)))
+                if depth == 0:
+                    self.partitions = partitions
+                else:
+                    self.repartitions += 1
+                spilled = chain(chain.from_iterable(lookup.values()), build_rows)
+                del lookup
+                yield from self.grace_hash_join(spilled, probe_rows, build_key, probe_key,
+                                                combine, partitions, depth)
+                return
+
+        yield from probe_lookup(lookup, probe_rows, probe_key, combine)
+
+    def grace_hash_join(self, build_rows, probe_rows, build_key, probe_key, combine,
+                        partitions, depth):
+        build_files = spill_partitions(build_rows, build_key, partitions, depth)
+        probe_files = spill_partitions(probe_rows, probe_key, partitions, depth)
+        for build_file, probe_file in zip(build_files, probe_files):
+            with build_file, probe_file:
+                # Partições demasiado grandes voltam a ser divididas (com outro hash)
+                yield from self.hash_join(read_partition(build_file), read_partition(probe_file),
+                                          build_key, probe_key, combine, None, depth + 1)
+
+
+def build_id_lookup(relation, positions):
+    """Hash table key -> ids of the rows of relation with that key"""
+    key = column_key(relation['columns'], positions)
+    lookup = defaultdict(list)
+    for i in relation['ids']:
+        lookup[key(i)].append(i)
+    return lookup
+
+
+def code_join_pairs(build, probe, build_position, probe_position):
+    """(probe id, build id) pairs of a join on dictionary-encoded key columns"""
+    build_column = build['columns'][build_position]
+    probe_column = probe['columns'][probe_position]
+    # Código de cada valor do dicionário da sonda no dicionário da construção
+    translate = [build_column.lookup.get(value, -1) for value in probe_column.values]
+    build_codes = build_column.codes
+    lookup = defaultdict(list)
+    for i in build['ids']:
+        lookup[build_codes[i]].append(i)
+    matches_of = [lookup.get(code) for code in translate]
+    probe_codes = probe_column.codes
+    for i in probe['ids']:
+        matches = matches_of[probe_codes[i]]
+        if matches:
+            for j in matches:
+                yield i, j
+
+
+def gather_pairs(pairs, probe_columns, build_columns, combine):
+    """Turn (probe id, build id) pairs into joined rows"""
+    pairs = iter(pairs)
+    while True:
+        batch = list(islice(pairs, BATCH_SIZE))
+        if not batch:
+            return
+        probe_ids, build_ids = zip(*batch)
+        yield from map(combine, gather_rows(build_columns, build_ids),
+                       gather_rows(probe_columns, probe_ids))
+
+
+def probe_lookup(lookup, probe_rows, probe_key, combine):
+    for probe_row in probe_rows:
+        matches = lookup.get(probe_key(probe_row))
+        if matches:
+            for build_row in matches:
+                yield combine(build_row, probe_row)
+
+
+class IndexLookup:
+    """Hash index seen as a join lookup: key -> list of row tuples.
+
+    Rows are only gathered for the keys that are actually probed."""
+    def __init__(self, buckets, columns):
+        self.buckets = buckets
+        self.columns = columns
+        self.rows = {}
+
+    def get(self, key):
+        rows = self.rows.get(key)
+        if rows is None:
+            ids = self.buckets.get(key)
+            if ids is None:
+                return None
+            rows = self.rows[key] = list(gather_rows(self.columns, ids))
+        return rows
+
+
+def plan_select(stmt, scan=None):
+    """Build the operator tree of a SELECT statement (reading scan, if given)"""
+    root = scan or TableScan(stmt['table'])
+    if stmt['conditions']:
+        root = Filter(root, stmt['conditions'])
+    order_by = stmt.get('order_by')
+    if stmt.get('group_by') or any(isinstance(f, dict) for f in stmt['fields']):
+        root = HashAggregate(root, stmt['fields'], stmt.get('group_by'), stmt['table'])
+        if order_by:
+            root = Sort(root, order_by, stmt['limit'], stmt['table'])
+    else:
+        # Ordena antes da projeção: o ORDER BY pode usar campos não selecionados
+        if order_by:
+            root = Sort(root, order_by, stmt['limit'], stmt['table'])
+        root = Project(root, stmt['fields'], stmt['table'])
+    if stmt['limit'] is not None:
+        root = Limit(root, stmt['limit'])
+    return root
+
+
+def plan_join(stmt, left=None, right=None):
+    """Build the operator tree of a CREATE TABLE ... JOIN statement"""
+    return HashJoin(left or TableScan(stmt['left_table']), right or TableScan(stmt['right_table']),
+                    stmt['left_table'], stmt['right_table'], stmt['join_columns'])
+
+
+# ---------- Statement plans ----------
+
+class ImportPlan:
+    def __init__(self, stmt):
+        self.table_name = stmt['table']
+        self.filename = stmt['file']
+        self.append = stmt.get('append', False)
+
+    def execute(self):
+        if self.append:
+            get_table(self.table_name)
+        try:
+            filenames = csv_files(self.filename)
+            if self.append:
+                added = sum(append_csv(self.table_name, filename) for filename in filenames)
+                print(f"{added} linhas de '{self.filename}' acrescentadas a '{self.table_name}' "
+                      f"({table_size(get_table(self.table_name))} no total)")
+            else:
+                store_table(self.table_name, read_csv_files(filenames))
+                files = f"{len(filenames)} ficheiros, " if len(filenames) > 1 else ''
+                print(f"Tabela '{self.table_name}' importada com sucesso de '{self.filename}' "
+                      f"({files}{table_size(tables[self.table_name])} linhas válidas)")
+            if settings['auto_analyze']:
+                analyze_table(self.table_name)
+        except CQLError:
+            raise
+        except Exception as e:
+            print(f"Erro ao importar tabela de '{self.filename}': {e}")
+
+    def describe(self):
+        if self.append:
+            return f"Append '{self.filename}' to {self.table_name}"
+        return f"Import '{self.filename}' into {self.table_name}"
+
+
+class FollowPlan:
+    def __init__(self, stmt):
+        self.table_name = stmt['table']
+        self.filename = stmt['file']
+
+    def execute(self):
+        try:
+            state = follows.get(self.table_name)
+            if state is None or state['file'] != os.path.abspath(self.filename):
+                follow_csv(self.table_name, self.filename)
+                print(f"Tabela '{self.table_name}' importada de '{self.filename}' "
+                      f"({table_size(get_table(self.table_name))} linhas válidas); "
+                      f"os próximos FOLLOW leem só as linhas novas")
+                return
+            added = poll_csv(self.table_name)
+            print(f"{added} linhas novas de '{self.filename}' em '{self.table_name}' "
+                  f"({table_size(get_table(self.table_name))} no total)")
+        except CQLError:
+            raise
+        except Exception as e:
+            print(f"Erro ao seguir '{self.filename}': {e}")
+
+
+class ExportPlan:
+    def __init__(self, stmt):
+        self.table_name = stmt['table']
+        self.filename = stmt['file']
+
+    def execute(self):
+        table = get_table(self.table_name)
+        try:
+            write_csv(self.filename, table['headers'], table_rows(table), table['types'])
+            print(f"Tabela '{self.table_name}' exportada com sucesso para '{self.filename}'")
+        except Exception as e:
+            print(f"Erro ao exportar tabela para '{self.filename}': {e}")
+
+
+class SavePlan:
+    def __init__(self, stmt):
+        self.table_name = stmt['table']
+        self.filename = stmt['file']
+
+    def execute(self):
+        table = get_table(self.table_name)
+        try:
+            save_table(table, self.filename)
+            print(f"Tabela '{self.table_name}' guardada com sucesso em '{self.filename}'")
+        except Exception as e:
+            print(f"Erro ao guardar tabela em '{self.filename}': {e}")
+
+
+class LoadPlan:
+    def __init__(self, stmt):
+        self.table_name = stmt['table']
+        self.filename = stmt['file']
+
+    def execute(self):
+        try:
+            store_table(self.table_name, load_table(self.filename))
+            print(f"Tabela '{self.table_name}' carregada com sucesso de '{self.filename}' "
+                  f"({table_size(tables[self.table_name])} linhas)")
+        except Exception as e:
+            print(f"Erro ao carregar tabela de '{self.filename}': {e}")
+
+
+class DiscardPlan:
+    def __init__(self, stmt):
+        self.table_name = stmt['table']
+
+    def execute(self):
+        get_table(self.table_name)
+        drop_table(self.table_name)
+        print(f"Tabela '{self.table_name}' descartada")
+
+
+class RenamePlan:
+    def __init__(self, stmt):
+        self.old_name = stmt['old_table']
+        self.new_name = stmt['new_table']
+
+    def execute(self):
+        get_table(self.old_name)
+        rename_table(self.old_name, self.new_name)
+        print(f"Tabela '{self.old_name}' renomeada para '{self.new_name}'")
+
+
+class PrintPlan:
+    def __init__(self, stmt):
+        self.table_name = stmt['table']
+
+    def execute(self):
+        table = get_table(self.table_name)
+        print_rows(table['headers'], table_rows(table), table['types'])
+
+
+class SelectPlan:
+    def __init__(self, stmt):
+        self.stmt = stmt
+        self.root = plan_select(stmt)
+
+    def execute(self):
+        table_names = [self.stmt['table']]
+        key = cache_key(self.stmt, table_names)
+        table = cache_get(key)
+        if table is not None:
+            print_rows(table['headers'], table_rows(table), table['types'])
+            return
+
+        relation = self.root.run()
+        rows = CachingRows(relation_rows(relation), settings['cache_memory'])
+        print_rows(relation['headers'], rows, relation['types'])
+        if rows.complete:
+            cache_put(key, table_names,
+                      make_table(relation['headers'], relation['types'], rows.kept), rows.bytes)
+
+    def describe(self):
+        return "Select"
+
+
+class CreateSelectPlan:
+    def __init__(self, stmt):
+        self.table_name = stmt['table']
+        self.select = stmt['select']
+        self.definition = materialized_definition(self.table_name, stmt)
+        self.root = plan_select(stmt['select'])
+
+    def execute(self):
+        definition = bound_definition(self.definition)
+        if definition is not None:
+            table = build_materialized(definition, self.root)
+        else:
+            table = cached_table(self.select, [self.select['table']], self.root)
+        if self.table_name in tables:
+            print(f"Aviso: Substituindo tabela existente '{self.table_name}'")
+        store_table(self.table_name, table, definition)
+        kind = 'materializada ' if self.definition is not None else ''
+        print(f"Tabela {kind}'{self.table_name}' criada com sucesso com {table_size(table)} registros")
+
+    def describe(self):
+        kind = 'materialized ' if self.definition is not None else ''
+        return f"Create {kind}table {self.table_name}"
+
+
+class CreateJoinPlan:
+    def __init__(self, stmt):
+        self.new_table = stmt['new_table']
+        self.left_table = stmt['left_table']
+        self.right_table = stmt['right_table']
+        # A chave da cache não depende do nome da tabela criada
+        self.query = dict(stmt, new_table=None, materialized=False)
+        self.definition = materialized_definition(self.new_table, stmt)
+        self.root = plan_join(stmt)
+
+    def execute(self):
+        definition = bound_definition(self.definition)
+        if definition is not None:
+            table = build_materialized(definition, self.root)
+        else:
+            table = cached_table(self.query, [self.left_table, self.right_table], self.root)
+        store_table(self.new_table, table, definition)
+        kind = 'materializada ' if self.definition is not None else ''
+        print(f"Tabela {kind}'{self.new_table}' criada com sucesso a partir do JOIN entre "
+              f"'{self.left_table}' e '{self.right_table}'")
+        print(f"Total de registros: {table_size(table)}")
+        print(f"Colunas: {', '.join(table['headers'])}")
+
+    def describe(self):
+        kind = 'materialized ' if self.definition is not None else ''
+        return f"Create {kind}table {self.new_table}"
+
+
+def cached_table(stmt, table_names, root):
+    """Result of the operator tree root as a table, reusing a cached copy"""
+    key = cache_key(stmt, table_names)
+    table = cache_get(key)
+    if table is None:
+        table = relation_to_table(root.run())
+        cache_put(key, table_names, table)
+    return table
+
+
+class RefreshPlan:
+    def __init__(self, stmt):
+        self.table_name = stmt['table']
+
+    def execute(self):
+        get_table(self.table_name)
+        if self.table_name not in materialized:
+            raise CQLError(f"'{self.table_name}' não é uma tabela materializada")
+        refresh_materialized(self.table_name)
+
+
+class CacheStatsPlan:
+    def __init__(self, stmt):
+        pass
+
+    def execute(self):
+        lookups = cache_stats['hits'] + cache_stats['misses']
+        ratio = cache_stats['hits'] / lookups if lookups else 0.0
+        print(f"Cache: {len(result_cache)} entradas, {cache_stats['bytes']} de "
+              f"{settings['cache_memory']} bytes")
+        print(f"Acertos: {cache_stats['hits']}  Falhas: {cache_stats['misses']}  "
+              f"(taxa de acerto {ratio:.1%})")
+        print(f"Expulsões: {cache_stats['evictions']}  Invalidações: {cache_stats['invalidations']}")
+
+
+def table_state(table, mapped):
+    if table.get('spilled'):
+        return 'em disco'
+    return 'mapeada (LOAD)' if mapped else 'em memória'
+
+
+class ShowMemoryPlan:
+    def __init__(self, stmt):
+        pass
+
+    def execute(self):
+        catalog = dict(tables)
+        usage = {name: estimate_table_bytes(table) for name, table in catalog.items()}
+        mapped = {name: mapped_table_bytes(table) for name, table in catalog.items()}
+        limit = settings['memory_limit']
+        print(f"Tabelas em memória: {format_bytes(sum(usage.values()))} "
+              f"({'limite ' + format_bytes(limit) if limit else 'sem limite'})")
+        print(f"Mapeadas de ficheiros: {format_bytes(sum(mapped.values()))} "
+              f"(fora do limite: o sistema pode libertar estas páginas)")
+        print(f"Expulsões: {memory_stats['evictions']} "
+              f"({format_bytes(memory_stats['bytes'])} despejados para "
+              f"'{settings['spill_dir']}'), recargas: {memory_stats['reloads']}")
+        # Das tabelas usadas mais recentemente para as mais antigas
+        recent = tables_by_use()[::-1]
+        names = [name for name in recent if name in usage]
+        names += [name for name in usage if name not in recent]
+        rows = [(name, table_size(catalog[name]), format_bytes(usage[name]),
+                 format_bytes(mapped[name]), table_state(catalog[name], mapped[name]))
+                for name in names]
+        print_rows(['Tabela', 'Linhas', 'Memória', 'Mapeada', 'Estado'], rows)
+
+
+class CacheClearPlan:
+    def __init__(self, stmt):
+        pass
+
+    def execute(self):
+        entries = len(result_cache)
+        clear_cache()
+        print(f"Cache limpa ({entries} entradas removidas)")
+
+
+class CreateIndexPlan:
+    def __init__(self, stmt):
+        self.name = stmt['name']
+        self.table_name = stmt['table']
+        self.column = stmt['column']
+        self.kind = stmt['kind']
+
+    def execute(self):
+        table = get_table(self.table_name)
+        if self.column not in table['headers']:
+            raise CQLError(f"Coluna '{self.column}' não encontrada em '{self.table_name}'")
+        col_type = table['types'][table['headers'].index(self.column)]
+        if (self.kind == 'grid') != (col_type == 'point'):
+            raise CQLError(f"Um índice {self.kind.upper()} não se aplica à coluna "
+                           f"'{self.column}' ({col_type}); colunas espaciais usam USING GRID")
+        if self.name in indexes:
+            print(f"Aviso: Substituindo índice existente '{self.name}'")
+
+        index = {'name': self.name, 'table': self.table_name, 'column': self.column,
+                 'kind': self.kind, 'data': None}
+        index_data(index)
+        indexes[self.name] = index
+        print(f"Índice '{self.name}' ({self.kind}) criado em '{self.table_name}({self.column})'")
+
+
+class AnalyzePlan:
+    def __init__(self, stmt):
+        self.table_name = stmt['table']
+
+    def execute(self):
+        stats = analyze_table(self.table_name)
+        table = tables[self.table_name]
+        print(f"Estatísticas de '{self.table_name}' recolhidas ({stats['rows']} linhas)")
+        rows = []
+        for header, col_type in zip(table['headers'], table['types']):
+            column = stats['columns'][header]
+            rows.append((header, col_type, column['distinct'], column['nulls'],
+                         format_stat(column.get('min'), col_type),
+                         format_stat(column.get('max'), col_type)))
+        print_rows(['Coluna', 'Tipo', 'Distintos', 'Nulos', 'Mínimo', 'Máximo'], rows)
+
+
+class SetPlan:
+    def __init__(self, stmt):
+        self.name = stmt['name']
+        self.value = stmt['value']
+
+    def execute(self):
+        if self.name not in SETTING_PARSERS:
+            raise CQLError(f"Parâmetro '{self.name.upper()}' desconhecido")
+        settings[self.name] = SETTING_PARSERS[self.name](bind_values(self.value))
+        shrink_cache()
+        enforce_memory_limit()
+        print(f"Parâmetro '{self.name.upper()}' definido para {settings[self.name]}")
+
+
+SETTING_PARSERS = {
+    'join_memory': parse_size,
+    'parallelism': lambda value: parse_positive_int('PARALLELISM', value),
+    'cache_memory': parse_size,
+    'sort_memory': parse_size,
+    'auto_analyze': lambda value: parse_flag('AUTO_ANALYZE', value),
+    'memory_limit': parse_size,
+    'spill_dir': parse_directory,
+}
+
+
+class ExplainPlan:
+    """EXPLAIN shows the plan chosen for a statement; EXPLAIN ANALYZE also runs
+    it and reports rows, times and peak memory per operator."""
+    def __init__(self, stmt):
+        self.analyze = stmt['analyze']
+        self.statement = stmt['statement']
+        self.plan = compile_statement(stmt['statement'])
+        self.root = getattr(self.plan, 'root', None)
+
+    def execute(self):
+        if not self.analyze:
+            for op in walk_operators(self.root):
+                if hasattr(op, 'prepare'):
+                    op.prepare()
+            print("\nPlano de execução:")
+            print_plan(self.plan, self.root)
+            print()
+            return
+
+        profiler = Profiler(self.root)
+        try:
+            with profiler.measuring(profiler.total):
+                if self.statement['type'] == 'select_stmt':
+                    # O resultado é consumido mas não é mostrado
+                    produced = sum(1 for _ in relation_rows(self.root.run()))
+                else:
+                    produced = None
+                    with bypassing_cache():
+                        self.plan.execute()
+        finally:
+            profiler.close()
+
+        print("\nPlano de execução (tempos incluem as entradas de cada operador):")
+        print_plan(self.plan, self.root, profiler)
+        if produced is not None:
+            print(f"{produced} linhas produzidas (não mostradas)")
+        total = profiler.total
+        print(f"Total: {format_ms(total.wall)} de tempo real, {format_ms(total.cpu)} de CPU, "
+              f"memória +{format_bytes(total.peak)} (pico do processo "
+              f"{format_bytes(peak_memory())})\n")
+
+
+class ProcedurePlan:
+    def __init__(self, stmt):
+        self.name = stmt['name']
+        self.params = stmt.get('params', [])
+        duplicated = {p for p in self.params if self.params.count(p) > 1}
+        if duplicated:
+            raise CQLError(f"Argumento '{duplicated.pop()}' repetido no procedimento '{self.name}'")
+        # O corpo é compilado uma única vez; cada CALL volta a executar os planos
+        self.body = [compile_statement(s) for s in stmt['body']]
+        self.types = [s['type'] for s in stmt['body']]
+        self.statements = stmt['body']
+
+    def execute(self):
+        procedures[self.name] = self
+        signature = f"{self.name}({', '.join(self.params)})" if self.params else self.name
+        print(f"Procedimento '{signature}' definido com {len(self.body)} instruções")
+
+
+class CallPlan:
+    def __init__(self, stmt):
+        self.name = stmt['name']
+        self.args = stmt.get('args', [])
+
+    def execute(self):
+        if self.name not in procedures:
+            raise CQLError(f"Procedimento '{self.name}' não encontrado")
+        procedure = procedures[self.name]
+        if len(self.args) != len(procedure.params):
+            raise CQLError(f"O procedimento '{self.name}' espera {len(procedure.params)} "
+                           f"argumentos ({len(self.args)} dados)")
+        # Os argumentos podem vir dos parâmetros de quem chama
+        bindings = dict(zip(procedure.params, bind_values(self.args)))
+
+        print(f"\nExecutando procedimento '{self.name}':")
+        with parameter_bindings(bindings):
+            for i, (stmt_type, plan) in enumerate(zip(procedure.types, procedure.body)):
+                print(f">> Executando instrução {i+1}: {stmt_type}")
+                try:
+                    plan.execute()
+                except CQLError as e:
+                    print(f"Erro: {e}")
+                except Exception as e:
+                    print(f"Erro na execução da instrução {i+1}: {str(e)}")
+                    traceback.print_exc()
+        print(f"Procedimento '{self.name}' concluído\n")
+
+
+class PreparePlan:
+    def __init__(self, stmt):
+        self.name = stmt['name']
+        self.statement = stmt['statement']
+        self.parameters = sum(1 for param in find_parameters(stmt['statement'])
+                              if isinstance(param['param'], int))
+        # Analisada e planeada uma vez; EXECUTE só associa os valores
+        self.plan = compile_statement(stmt['statement'])
+
+    def execute(self):
+        if self.name in prepared:
+            print(f"Aviso: Substituindo instrução preparada '{self.name}'")
+        prepared[self.name] = self
+        print(f"Instrução '{self.name}' preparada com {self.parameters} parâmetros")
+
+
+class ExecutePlan:
+    def __init__(self, stmt):
+        self.name = stmt['name']
+        self.args = stmt['args']
+
+    def execute(self):
+        if self.name not in prepared:
+            raise CQLError(f"Instrução preparada '{self.name}' não encontrada")
+        statement = prepared[self.name]
+        if len(self.args) != statement.parameters:
+            raise CQLError(f"A instrução '{self.name}' espera {statement.parameters} "
+                           f"parâmetros ({len(self.args)} dados)")
+        values = bind_values(self.args)
+        # Dentro de um procedimento os argumentos dele continuam visíveis
+        bindings = dict(getattr(parameter_state, 'bindings', None) or {})
+        bindings.update(enumerate(values, 1))
+        with parameter_bindings(bindings):
+            statement.plan.execute()
+
+
+PLANNERS = {
+    'import_stmt': ImportPlan,
+    'follow_stmt': FollowPlan,
+    'export_stmt': ExportPlan,
+    'save_stmt': SavePlan,
+    'load_stmt': LoadPlan,
+    'discard_stmt': DiscardPlan,
+    'rename_stmt': RenamePlan,
+    'print_stmt': PrintPlan,
+    'select_stmt': SelectPlan,
+    'create_select_stmt': CreateSelectPlan,
+    'create_join_stmt': CreateJoinPlan,
+    'create_index_stmt': CreateIndexPlan,
+    'refresh_stmt': RefreshPlan,
+    'analyze_stmt': AnalyzePlan,
+    'set_stmt': SetPlan,
+    'cache_stats_stmt': CacheStatsPlan,
+    'cache_clear_stmt': CacheClearPlan,
+    'show_memory_stmt': ShowMemoryPlan,
+    'explain_stmt': ExplainPlan,
+    'procedure_decl': ProcedurePlan,
+    'procedure_call': CallPlan,
+    'prepare_stmt': PreparePlan,
+    'execute_stmt': ExecutePlan,
+}
+
+
+def compile_statement(stmt):
+    """Compile an AST node into a plan that can be executed many times"""
+    return PLANNERS[stmt['type']](stmt)
+
+
+def execute_statement(stmt):
+    """Compile and run a single AST node, reporting errors to the user"""
+    try:
+        return compile_statement(stmt).execute()
+    except CQLError as e:
+        print(f"Erro: {e}")
+    except Exception as e:
+        # Um erro inesperado numa instrução não interrompe o resto do script
+        print(f"Erro inesperado em {stmt['type']}: {type(e).__name__}: {e}")
+
+
+def statement_end(lineno):
+    """A ';' for a statement the script left unterminated"""
+    token = lex.LexToken()
+    token.type, token.value, token.lineno, token.lexpos = 'SEMICOLON', ';', lineno, -1
+    return token
+
+
+def statement_tokens(source_lexer):
+    """Group the tokens of a script into statements (a PROCEDURE ends at its END)"""
+    tokens = []
+    depth = 0
+    closed = False      # acabou de fechar um PROCEDURE: o ';' seguinte é opcional
+    for token in iter(source_lexer.token, None):
+        if closed and token.type != 'SEMICOLON':
+            yield tokens + [statement_end(tokens[-1].lineno)]
+            tokens = []
+        closed = False
+        tokens.append(token)
+        if token.type == 'PROCEDURE':
+            depth += 1
+        elif token.type == 'END' and depth:
+            depth -= 1
+            closed = depth == 0
+        elif token.type == 'SEMICOLON' and depth == 0:
+            yield tokens
+            tokens = []
+    if tokens:
+        # Como antes, a última instrução pode não ter ';'
+        yield tokens + [statement_end(tokens[-1].lineno)]
+
+
+def parse_statements(text):
+    """Parse a script one statement at a time, yielding each AST node once it is read.
+
+    The script is tokenized in one pass; a syntax error only discards the
+    statement it is in."""
+    parser = get_parser()
+    source_lexer = lexer.clone()
+    source_lexer.lineno = 1
+    source_lexer.input(text)
+    for tokens in statement_tokens(source_lexer):
+        tokens = iter(tokens)
+        statements = parser.parse(lexer=source_lexer, tokenfunc=lambda: next(tokens, None))
+        yield from (stmt for stmt in statements or [] if stmt is not None)
+
+
+def parse_source(text):
+    """Parse a whole script into a list of AST nodes"""
+    return list(parse_statements(text))
+
+
+def run_source(text):
+    """Parse a piece of CQL source and execute each statement as soon as it is parsed"""
+    for stmt in parse_statements(text):
+        execute_statement(stmt)
+
+# ==============================================
+# Storage
+# ==============================================
+
+# Tables are stored column by column:
+#   {'headers': [...], 'types': [...], 'columns': [...]}
+# Column types are inferred once at IMPORT time: 'int' columns are kept in an
+# array('q'), 'float' columns in an array('d') (empty cells become NaN),
+# ISO-8601 dates/times become 'timestamp' columns of seconds since the epoch
+# (UTC) in an array('q') (empty cells become MISSING_TIMESTAMP), '[lon,lat]'
+# pairs become 'point' columns (a PointColumn: one array('d') of longitudes
+# and one of latitudes, NaN when missing) and everything else is a 'str'
+# column: a DictColumn when few distinct values repeat over many rows (Id,
+# DirecaoVento...), otherwise a list of strings.
+
+ARRAY_CODES = {'int': 'q', 'float': 'd', 'timestamp': 'q'}
+NUMERIC_TYPES = ('int', 'float')
+MISSING_TIMESTAMP = -2 ** 63
+EPOCH = datetime(1970, 1, 1)
+EPOCH_ORDINAL = EPOCH.toordinal()
+INTERVAL_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 7 * 86400}
+
+
+POINT_PATTERN = re.compile(r'\[\s*([-+]?[\d.]+(?:[eE][-+]?\d+)?)\s*,'
+                           r'\s*([-+]?[\d.]+(?:[eE][-+]?\d+)?)\s*\]')
+MISSING_POINT = (math.nan, math.nan)
+
+
+class PointColumn:
+    """Column of (lon, lat) points kept as two parallel float arrays"""
+    __slots__ = ('lon', 'lat')
+
+    def __init__(self, points=(), lon=None, lat=None):
+        if lon is None:
+            lon, lat = array('d'), array('d')
+            for x, y in points:
+                lon.append(x)
+                lat.append(y)
+        self.lon = lon
+        self.lat = lat
+
+    def __len__(self):
+        return len(self.lon)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return PointColumn(lon=self.lon[i], lat=self.lat[i])
+        return (self.lon[i], self.lat[i])
+
+    def __iter__(self):
+        return zip(self.lon, self.lat)
+
+    def append(self, point):
+        self.lon.append(point[0])
+        self.lat.append(point[1])
+
+    def extend(self, points):
+        for point in points:
+            self.append(point)
+
+
+# Typecodes of the codes of a DictColumn, by number of distinct values
+DICTIONARY_CODES = ((256, 'B'), (65536, 'H'), (2 ** 32, 'I'))
+DICTIONARY_MAX_VALUES = 65536
+DICTIONARY_SAMPLE = 10_000
+
+
+def dictionary_code(size):
+    return next(code for limit, code in DICTIONARY_CODES if size <= limit)
+
+
+class DictColumn:
+    """String column stored as its distinct values plus one small code per row.
+
+    Rows decode to the strings of 'values', so every row with the same value
+    shares one string object; predicates and joins can work on 'codes'."""
+    __slots__ = ('values', 'codes', 'lookup')
+
+    def __init__(self, values, codes):
+        self.values = values
+        self.codes = codes
+        self.lookup = {value: code for code, value in enumerate(values)}
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return DictColumn(list(self.values), array(dictionary_code(len(self.values)),
+                                                       self.codes[i]))
+        return self.values[self.codes[i]]
+
+    def __iter__(self):
+        return map(self.values.__getitem__, self.codes)
+
+    def append(self, value):
+        code = self.lookup.get(value)
+        if code is None:
+            code = self.lookup[value] = len(self.values)
+            self.values.append(value)
+            if dictionary_code(len(self.values)) != self.codes.typecode:
+                self.codes = array(dictionary_code(len(self.values)), self.codes)
+        self.codes.append(code)
+
+    def extend(self, values):
+        for value in values:
+            self.append(value)
+
+    def copy(self):
+        return DictColumn(list(self.values), array(dictionary_code(len(self.values)), self.codes))
+
+    def take(self, ids):
+        """Rows ids of the column, still encoded"""
+        codes = self.codes
+        return DictColumn(list(self.values), array(dictionary_code(len(self.values)),
+                                                   map(codes.__getitem__, ids)))
+
+
+def encode_strings(values):
+    """Dictionary-encode a column of strings if it has few distinct values"""
+    # Uma amostra evita construir o dicionário de colunas quase todas distintas
+    sample = values[:DICTIONARY_SAMPLE]
+    if len(set(sample)) * 2 > len(sample):
+        return list(values)
+    lookup = {}
+    codes = [lookup.setdefault(value, len(lookup)) for value in values]
+    if len(lookup) > DICTIONARY_MAX_VALUES or len(lookup) * 2 > len(codes):
+        return list(values)
+    return DictColumn(list(lookup), array(dictionary_code(len(lookup)), codes))
+
+
+def new_column(col_type, values=()):
+    if isinstance(values, DictColumn):
+        return values.copy()
+    if col_type == 'point':
+        return PointColumn(values)
+    code = ARRAY_CODES.get(col_type)
+    return array(code, values) if code else list(values)
+
+
+# What a CSV cell must look like to be read as a number or a timestamp: int()
+# and float() also take '1_000', ' 7', 'nan' or 'inf', and fromisoformat()
+# takes week dates; zero-padded codes such as '007' stay strings. An empty
+# cell is a missing float or timestamp.
+INT_PATTERN = re.compile(r'[-+]?(?:0|[1-9]\d*)')
+FLOAT_PATTERN = re.compile(r'(?:[-+]?(?:(?:0|[1-9]\d*)(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?)?')
+TIMESTAMP_PATTERN = re.compile(r'(?:\d{4}-\d{2}-\d{2}'
+                               r'(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:\d{2})?)?)?')
+
+
+def parse_float(value):
+    return float(value) if value != '' else math.nan
+
+
+def parse_timestamp(value):
+    """Seconds since the epoch of an ISO-8601 date/time (UTC unless it has an offset)"""
+    value = value.strip()
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    return ((moment.toordinal() - EPOCH_ORDINAL) * 86400 + moment.hour * 3600
+            + moment.minute * 60 + moment.second)
+
+
+def parse_timestamps(values):
+    # Os mesmos instantes repetem-se em muitas linhas (uma por estação)
+    parsed = {'': MISSING_TIMESTAMP}
+    column = array('q')
+    for value in values:
+        seconds = parsed.get(value)
+        if seconds is None:
+            seconds = parsed[value] = parse_timestamp(value)
+        column.append(seconds)
+    return column
+
+
+@lru_cache(maxsize=65536)
+def format_timestamp(value):
+    if value == MISSING_TIMESTAMP:
+        return ''
+    return (EPOCH + timedelta(seconds=value)).isoformat()
+
+
+def parse_point(value):
+    """(lon, lat) of a '[lon,lat]' cell"""
+    if value == '':
+        return MISSING_POINT
+    match = POINT_PATTERN.fullmatch(value.strip())
+    if not match:
+        raise ValueError(f"invalid point {value!r}")
+    return (float(match.group(1)), float(match.group(2)))
+
+
+def format_point(point):
+    lon, lat = point
+    return '' if lon != lon else f"[{lon!r},{lat!r}]"
+
+
+def parse_interval(text):
+    """Length in seconds of an interval such as '30s', '15m', '1h' or '1d'"""
+    match = re.fullmatch(r'\s*(\d+)\s*([smhdw])\s*', str(text).lower())
+    if not match or int(match.group(1)) == 0:
+        raise CQLError(f"Intervalo inválido '{text}' (ex.: '30s', '15m', '1h', '1d')")
+    return int(match.group(1)) * INTERVAL_UNITS[match.group(2)]
+
+
+def infer_column(values):
+    """Convert a column of raw CSV strings to the narrowest type that fits"""
+    if not any(values):
+        return 'str', list(values)
+    # Os formatos são verificados uma vez por valor distinto
+    distinct = set(values)
+    if all(map(INT_PATTERN.fullmatch, distinct)):
+        try:
+            return 'int', array('q', [int(v) for v in values])
+        except OverflowError:
+            pass
+    if all(map(FLOAT_PATTERN.fullmatch, distinct)):
+        return 'float', array('d', [parse_float(v) for v in values])
+    if all(map(TIMESTAMP_PATTERN.fullmatch, distinct)):
+        try:
+            return 'timestamp', parse_timestamps(values)
+        except (ValueError, OverflowError):
+            pass
+    try:
+        return 'point', PointColumn(map(parse_point, values))
+    except ValueError:
+        pass
+    return 'str', encode_strings(values)
+
+
+def make_table(headers, types, rows):
+    """Build a columnar table from an iterable of typed rows"""
+    columns = [new_column(t) for t in types]
+    for row in rows:
+        for column, value in zip(columns, row):
+            column.append(value)
+    return {'headers': list(headers), 'types': list(types), 'columns': columns}
+
+
+def table_size(table):
+    return len(table['columns'][0]) if table['columns'] else 0
+
+
+# What is derived from a table on first use (sorted flags, zone maps, index
+# data) is built by statements that only hold the table's read lock (--serve):
+# builds take this lock, so each structure is built once and never seen half
+# built.
+build_lock = threading.RLock()
+
+
+def column_is_sorted(table, position):
+    """Whether a column of a table is in ascending order (checked once per table)"""
+    known = table.get('sorted_columns', {})
+    if position not in known:
+        with build_lock:
+            known = table.setdefault('sorted_columns', {})
+            if position not in known:
+                column = table['columns'][position]
+                known[position] = all(a <= b for a, b in zip(column, islice(column, 1, None)))
+    return known[position]
+
+
+def estimate_column_bytes(column):
+    """Approximate heap footprint of a column (mapped columns live in the page cache)"""
+    if isinstance(column, array):
+        return column.itemsize * len(column)
+    if isinstance(column, PointColumn):
+        return estimate_column_bytes(column.lon) + estimate_column_bytes(column.lat)
+    if isinstance(column, DictColumn):
+        return (estimate_column_bytes(column.codes) + estimate_column_bytes(column.values)
+                + sys.getsizeof(column.lookup))
+    if not isinstance(column, list):
+        return 0
+    sample = column[:100]
+    if not sample:
+        return sys.getsizeof(column)
+    average = sum(sys.getsizeof(value) for value in sample) / len(sample)
+    return sys.getsizeof(column) + int(average * len(column))
+
+
+def estimate_table_bytes(table):
+    return sum(estimate_column_bytes(column) for column in table['columns'])
+
+
+def mapped_column_bytes(column):
+    """Bytes of a column read from a mapped file (LOAD TABLE) rather than kept on the heap"""
+    if isinstance(column, memoryview):
+        return column.nbytes
+    if isinstance(column, MappedStrings):
+        return mapped_column_bytes(column.offsets) + column.blob.nbytes
+    if isinstance(column, PointColumn):
+        return mapped_column_bytes(column.lon) + mapped_column_bytes(column.lat)
+    if isinstance(column, DictColumn):
+        return mapped_column_bytes(column.codes)
+    return 0
+
+
+def mapped_table_bytes(table):
+    return sum(mapped_column_bytes(column) for column in table['columns'])
+
+
+def table_rows(table):
+    """Iterate over the rows of a table as tuples of typed values"""
+    return zip(*table['columns'])
+
+
+def table_relation(table):
+    """View a whole table as a relation"""
+    return {'headers': table['headers'], 'types': table['types'],
+            'columns': table['columns'], 'ids': range(table_size(table))}
+
+
+# Number of row ids gathered at a time when turning a relation into rows
+BATCH_SIZE = 1024
+
+
+def relation_rows(relation):
+    """Lazily iterate over the rows of a relation as tuples of typed values"""
+    if 'rows' in relation:
+        return relation['rows']
+    ids = relation['ids']
+    columns = relation['columns']
+    if isinstance(ids, range) and ids.step == 1:
+        return islice(zip(*columns), ids.start, ids.stop)
+    return gather_rows(columns, ids)
+
+
+def gather_rows(columns, ids):
+    ids = iter(ids)
+    getters = [column.__getitem__ for column in columns]
+    while True:
+        batch = list(islice(ids, BATCH_SIZE))
+        if not batch:
+            return
+        yield from zip(*[list(map(getter, batch)) for getter in getters])
+
+
+def relation_size(relation):
+    """Number of rows of a relation, or None if it is only known once consumed"""
+    ids = relation.get('ids')
+    return len(ids) if isinstance(ids, (range, array, list)) else None
+
+
+def column_key(columns, positions):
+    """Function giving the join/index key of row i (a tuple for composite keys)"""
+    if len(positions) == 1:
+        return columns[positions[0]].__getitem__
+    key_columns = [columns[p] for p in positions]
+    return lambda i: tuple([column[i] for column in key_columns])
+
+
+def row_getter(positions):
+    """Like itemgetter, but always returns a tuple"""
+    if len(positions) == 1:
+        position = positions[0]
+        return lambda row: (row[position],)
+    if not positions:
+        return lambda row: ()
+    return itemgetter(*positions)
+
+
+def relation_to_table(relation):
+    """Copy the rows of a relation into a new columnar table"""
+    if 'rows' in relation:
+        table = make_table(relation['headers'], relation['types'], relation['rows'])
+        table['columns'] = [encode_strings(column) if t == 'str' else column
+                            for t, column in zip(table['types'], table['columns'])]
+        return table
+    ids = relation['ids']
+    if not isinstance(ids, range):
+        ids = array('q', ids)
+    columns = [column.take(ids) if isinstance(column, DictColumn)
+               else encode_strings(list(map(column.__getitem__, ids))) if t == 'str'
+               else new_column(t, map(column.__getitem__, ids))
+               for t, column in zip(relation['types'], relation['columns'])]
+    return {'headers': list(relation['headers']), 'types': list(relation['types']),
+            'columns': columns}
+
+
+# Encoding of the CSV files read and written (the same whichever the locale,
+# and in the IMPORT workers that decode byte ranges of a file)
+CSV_ENCODING = 'utf-8'
+
+
+def write_csv(filename, headers, rows, types=None):
+    format_row = row_formatter(types or [None] * len(headers))
+    with open(filename, 'w', newline='', encoding=CSV_ENCODING) as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_MINIMAL)
+        writer.writerow(headers)
+        for row in rows:
+            writer.writerow(format_row(row))
+
+
+def read_csv_table(filename):
+    """Read a CSV file into a table, skipping comments and malformed lines"""
+    with open(filename, 'r', newline='', encoding=CSV_ENCODING) as f:
+        return csv_table(csv.reader(f))
+
+
+def column_count_warning(where, expected, found):
+    return (f"Aviso: {where} ignorada - número de colunas inválido "
+            f"(esperado {expected}, obtido {found})")
+
+
+def csv_rows(reader, num_columns, first_line=1, skipped=None):
+    """(line number, fields) of the valid rows of a CSV reader.
+
+    Malformed lines are reported, or collected in skipped as (line, fields found)."""
+    line_number = first_line - 1
+    for row in reader:
+        line_number += 1
+
+        # Ignorar linhas comentadas
+        if not row or row[0].strip().startswith('#'):
+            continue
+
+        # Validação: número de colunas correto
+        if len(row) != num_columns:
+            if skipped is None:
+                print(column_count_warning(f"Linha {line_number}", num_columns, len(row)))
+            else:
+                skipped.append((line_number, len(row)))
+            continue
+
+        # Remover aspas de campos se necessário
+        yield line_number, [field.strip('"').strip("'") for field in row]
+
+
+def csv_table(reader):
+    """Table of the rows of a CSV reader whose first row is the header"""
+    headers = next(reader)
+    num_columns = len(headers)
+    valid_data = [row for _, row in csv_rows(reader, num_columns, 2)]
+
+    # Inferir o tipo de cada coluna uma única vez
+    raw_columns = list(zip(*valid_data)) if valid_data else [()] * num_columns
+    del valid_data
+    types = []
+    columns = []
+    for values in raw_columns:
+        col_type, column = infer_column(values)
+        types.append(col_type)
+        columns.append(column)
+
+    # As colunas acabadas de ler não são partilhadas: podem receber linhas novas
+    return {'headers': headers, 'types': types, 'columns': columns, 'appendable': True}
+
+
+def checked_parser(pattern, parse):
+    """parse, for cells that match pattern only (as in infer_column)"""
+    def parse_cell(value):
+        if not pattern.fullmatch(value):
+            raise ValueError(f"invalid value {value!r}")
+        return parse(value)
+    return parse_cell
+
+
+# Conversion of a raw CSV cell to the type of an existing column (appends)
+CELL_PARSERS = {
+    'int': checked_parser(INT_PATTERN, int),
+    'float': checked_parser(FLOAT_PATTERN, parse_float),
+    'timestamp': checked_parser(TIMESTAMP_PATTERN, lambda value: parse_timestamp(value)
+                                if value != '' else MISSING_TIMESTAMP),
+    'point': parse_point,
+    'str': str,
+}
+
+
+def typed_rows(headers, types, rows):
+    """Convert (line number, fields) pairs to typed rows, skipping rows that do not fit"""
+    parsers = [CELL_PARSERS[t] for t in types]
+    for line_number, row in rows:
+        try:
+            yield tuple([parse(value) for parse, value in zip(parsers, row)])
+        except (ValueError, OverflowError):
+            for header, col_type, parse, value in zip(headers, types, parsers, row):
+                try:
+                    parse(value)
+                except (ValueError, OverflowError):
+                    print(f"Aviso: Linha {line_number} ignorada - valor '{value}' inválido "
+                          f"para a coluna '{header}' ({col_type})")
+                    break
+
+
+def append_csv(table_name, filename):
+    """IMPORT INTO ... APPEND: add the rows of a CSV file with the same header"""
+    table = get_table(table_name)
+    with open(filename, 'r', newline='', encoding=CSV_ENCODING) as f:
+        reader = csv.reader(f)
+        headers = next(reader)
+        if headers != table['headers']:
+            raise CQLError(f"O cabeçalho de '{filename}' ({', '.join(headers)}) não corresponde "
+                           f"às colunas de '{table_name}'")
+        rows = typed_rows(headers, table['types'], csv_rows(reader, len(headers), 2))
+        delta = make_table(headers, table['types'], rows)
+    append_table(table_name, delta)
+    return table_size(delta)
+
+
+def csv_files(pattern):
+    """Files named by an IMPORT: a single file or every match of a glob pattern"""
+    if os.path.exists(pattern) or not re.search(r'[*?[]', pattern):
+        return [pattern]
+    filenames = sorted(glob.glob(pattern))
+    if not filenames:
+        raise CQLError(f"Nenhum ficheiro corresponde a '{pattern}'")
+    return filenames
+
+
+def csv_header(filename):
+    """Columns of the first line of a CSV file and the byte offset after it"""
+    with open(filename, 'rb') as f:
+        line = f.readline()
+        offset = f.tell()
+    headers = next(csv.reader([line.decode(CSV_ENCODING)]), None)
+    if not headers:
+        raise CQLError(f"O ficheiro '{filename}' não tem cabeçalho")
+    return headers, offset
+
+
+def read_complete_records(filename, offset):
+    """Text of a file from offset up to the end of its last complete record,
+    and the offset after it (offset must be at the start of a record)"""
+    with open(filename, 'rb') as f:
+        f.seek(offset)
+        data = f.read()
+    # Um registo ainda a meio de ser escrito fica para a próxima leitura. Um
+    # campo entre aspas pode ter mudanças de linha: só se corta numa linha
+    # com um número par de aspas até ela
+    end = data.rfind(b'\n') + 1
+    quotes = data.count(b'"', 0, end)
+    while quotes % 2:
+        previous = data.rfind(b'\n', 0, end - 1) + 1
+        quotes -= data.count(b'"', previous, end)
+        end = previous
+    return data[:end].decode(CSV_ENCODING), offset + end
+
+
+def follow_csv(table_name, filename):
+    """First FOLLOW of a table: import the file and remember how far it was read"""
+    text, offset = read_complete_records(filename, 0)
+    records = list(csv.reader(io.StringIO(text, newline='')))
+    store_table(table_name, csv_table(iter(records)))
+    follows[table_name] = {'file': os.path.abspath(filename), 'offset': offset,
+                           'records': len(records)}
+
+
+def poll_csv(table_name):
+    """Later FOLLOWs: append only the records written since the previous poll"""
+    state = follows[table_name]
+    filename = state['file']
+    if os.path.getsize(filename) < state['offset']:
+        print(f"Aviso: '{filename}' encolheu; a tabela '{table_name}' é importada de novo")
+        follow_csv(table_name, filename)
+        return table_size(get_table(table_name))
+
+    text, offset = read_complete_records(filename, state['offset'])
+    if not text:
+        return 0
+    table = get_table(table_name)
+    records = list(csv.reader(io.StringIO(text, newline='')))
+    # Os avisos numeram os registos como o IMPORT (o cabeçalho é o registo 1)
+    rows = typed_rows(table['headers'], table['types'],
+                      csv_rows(iter(records), len(table['headers']), state['records'] + 1))
+    delta = make_table(table['headers'], table['types'], rows)
+    state['offset'] = offset
+    state['records'] += len(records)
+    append_table(table_name, delta)
+    return table_size(delta)
+
+# ==============================================
+# Binary Table Files
+# ==============================================
+
+# SAVE TABLE / LOAD TABLE use a compact binary layout:
+#
+#   b'CQLB' | u64 header offset | column data ... | JSON header
+#
+# The JSON header holds the schema, the row count, the byte order, the zone
+# maps built so far and, for each column, where its buffers live in the file. Numeric columns are stored
+# as raw fixed-width arrays, point columns as two such arrays (longitudes and
+# latitudes) and string columns as an array('q') of n + 1 offsets followed
+# by one UTF-8 blob; dictionary-encoded string columns store their distinct
+# values that way and then the array of codes. Every buffer starts on an 8-byte boundary so
+# that LOAD can map the file and view the buffers in place.
+
+BINARY_MAGIC = b'CQLB'
+BINARY_VERSION = 2              # a versão 1 não tinha colunas codificadas
+
+
+class MappedStrings:
+    """Read-only string column decoded on demand from a mapped file"""
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], 'utf-8')
+
+    def __iter__(self):
+        offsets = self.offsets
+        blob = self.blob
+        for i in range(len(offsets) - 1):
+            yield str(blob[offsets[i]:offsets[i + 1]], 'utf-8')
+
+
+def write_buffer(f, data):
+    """Write data at the next 8-byte boundary and describe where it went"""
+    f.write(b'\0' * (-f.tell() % 8))
+    offset = f.tell()
+    f.write(data)
+    return {'offset': offset, 'length': len(data)}
+
+
+def write_strings(f, values):
+    offsets = array('q', [0])
+    blob = bytearray()
+    for value in values:
+        blob += value.encode('utf-8')
+        offsets.append(len(blob))
+    return {'offsets': write_buffer(f, offsets.tobytes()), 'blob': write_buffer(f, blob)}
+
+
+def save_table(table, filename):
+    tmp_name = filename + '.tmp'
+    with open(tmp_name, 'wb') as f:
+        # Reservar espaço para o início do ficheiro, que só fica completo no fim
+        f.write(b'\0' * 16)
+        column_info = []
+        for col_type, column in zip(table['types'], table['columns']):
+            if col_type in ARRAY_CODES:
+                if isinstance(column, (array, memoryview)):
+                    data = column
+                else:
+                    data = array(ARRAY_CODES[col_type], column)
+                column_info.append({'data': write_buffer(f, memoryview(data).cast('B'))})
+            elif col_type == 'point':
+                column_info.append({
+                    axis: write_buffer(f, memoryview(getattr(column, axis)).cast('B'))
+                    for axis in ('lon', 'lat')})
+            elif isinstance(column, DictColumn):
+                info = write_strings(f, column.values)
+                info['code'] = dictionary_code(len(column.values))
+                info['codes'] = write_buffer(f, array(info['code'], column.codes).tobytes())
+                column_info.append(info)
+            else:
+                column_info.append(write_strings(f, column))
+
+        header = json.dumps({
+            'version': BINARY_VERSION,
+            'byteorder': sys.byteorder,
+            'rows': table_size(table),
+            'headers': table['headers'],
+            'types': table['types'],
+            'columns': column_info,
+            'zone_block_rows': ZONE_BLOCK_ROWS,
+            'zones': table.get('zones', {}),
+        }).encode('utf-8')
+        header_offset = write_buffer(f, header)['offset']
+        f.seek(0)
+        f.write(BINARY_MAGIC + struct.pack('<Q', header_offset))
+    os.replace(tmp_name, filename)
+
+
+def load_table(filename):
+    """Map a binary table file; column data is only paged in when read"""
+    with open(filename, 'rb') as f:
+        if f.read(4) != BINARY_MAGIC:
+            raise CQLError(f"'{filename}' não é um ficheiro de tabela binário")
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    header_offset = struct.unpack_from('<Q', mapped, 4)[0]
+    header = json.loads(bytes(mapped[header_offset:]))
+    if header['version'] not in (1, BINARY_VERSION):
+        raise CQLError(f"Versão {header['version']} do ficheiro '{filename}' não suportada")
+    native = header['byteorder'] == sys.byteorder
+    view = memoryview(mapped)
+
+    def buffer(info, code):
+        data = view[info['offset']:info['offset'] + info['length']]
+        if native:
+            return data.cast(code)
+        swapped = array(code, data.tobytes())
+        swapped.byteswap()
+        return swapped
+
+    columns = []
+    for col_type, info in zip(header['types'], header['columns']):
+        if col_type in ARRAY_CODES:
+            columns.append(buffer(info['data'], ARRAY_CODES[col_type]))
+        elif col_type == 'point':
+            columns.append(PointColumn(lon=buffer(info['lon'], 'd'), lat=buffer(info['lat'], 'd')))
+        else:
+            blob = info['blob']
+            strings = MappedStrings(buffer(info['offsets'], 'q'),
+                                    view[blob['offset']:blob['offset'] + blob['length']])
+            if 'codes' in info:
+                # O dicionário é pequeno: é lido já; os códigos ficam mapeados
+                strings = DictColumn(list(strings), buffer(info['codes'], info['code']))
+            columns.append(strings)
+
+    table = {'headers': header['headers'], 'types': header['types'], 'columns': columns}
+    if header.get('zone_block_rows') == ZONE_BLOCK_ROWS:
+        # Os mapas de zonas guardados evitam ler as colunas para os reconstruir
+        table['zones'] = {int(position): zone for position, zone in header['zones'].items()}
+    return table
+
+
+# ==============================================
+# Indexes
+# ==============================================
+
+# indexes[name] = {'name', 'table', 'column', 'kind', 'data'}
+# A 'hash' index maps each value to the (ascending) ids of the rows holding
+# it; a 'sorted' index keeps the non-NaN values in order ('keys') next to the
+# ids they come from ('order'); a 'grid' index buckets the points of a
+# 'point' column (see Spatial Indexes). 'data' is built lazily and reset to
+# None whenever the table is replaced.
+
+def indexes_on(table_name):
+    # list() copia o catálogo de uma vez: no modo --serve outro pedido pode alterá-lo
+    return [index for index in list(indexes.values()) if index['table'] == table_name]
+
+
+def find_index(table_name, column, kind):
+    for index in indexes_on(table_name):
+        if index['column'] == column and index['kind'] == kind:
+            return index
+    return None
+
+
+def invalidate_indexes(table_name):
+    table = tables[table_name]
+    for index in indexes_on(table_name):
+        if index['column'] in table['headers']:
+            index['data'] = None
+        else:
+            del indexes[index['name']]
+            print(f"Aviso: Índice '{index['name']}' removido (coluna '{index['column']}' "
+                  f"já não existe em '{table_name}')")
+
+
+def extend_indexes(table_name, start):
+    """Add the rows appended to a table from row start on to its built indexes"""
+    table = tables[table_name]
+    for index in indexes_on(table_name):
+        data = index['data']
+        if data is None:
+            continue
+        column = table['columns'][table['headers'].index(index['column'])]
+        if index['kind'] == 'hash':
+            for i in range(start, len(column)):
+                value = column[i]
+                if value == value:
+                    bucket = data.get(value)
+                    if bucket is None:
+                        data[value] = array('q', [i])
+                    else:
+                        bucket.append(i)
+        elif index['kind'] == 'grid':
+            cell, cells = data['cell'], data['cells']
+            for i in range(start, len(column)):
+                x, y = column[i]
+                if x == x and y == y:
+                    key = (math.floor(x / cell), math.floor(y / cell))
+                    cells.setdefault(key, array('q')).append(i)
+        else:
+            # O índice ordenado é reconstruído quando voltar a ser usado
+            index['data'] = None
+
+
+def index_data(index):
+    data = index['data']
+    if data is None:
+        with build_lock:
+            data = index['data']
+            if data is None:
+                table = tables[index['table']]
+                position = table['headers'].index(index['column'])
+                column = table['columns'][position]
+                if index['kind'] == 'hash':
+                    data = build_hash_index(column)
+                elif index['kind'] == 'grid':
+                    data = build_grid_index(column)
+                else:
+                    data = build_sorted_index(column, table['types'][position])
+                index['data'] = data
+    return data
+
+
+def build_hash_index(column):
+    if isinstance(column, DictColumn):
+        by_code = defaultdict(list)
+        for i, code in enumerate(column.codes):
+            by_code[code].append(i)
+        return {column.values[code]: array('q', ids) for code, ids in by_code.items()}
+    buckets = defaultdict(list)
+    for i, value in enumerate(column):
+        if value == value:  # NaN nunca é igual a nada
+            buckets[value].append(i)
+    return {key: array('q', ids) for key, ids in buckets.items()}
+
+
+def build_sorted_index(column, col_type):
+    missing = MISSING_TIMESTAMP if col_type == 'timestamp' else None
+    order = sorted((i for i, value in enumerate(column) if value == value and value != missing),
+                   key=column.__getitem__)
+    return {'keys': new_column(col_type, map(column.__getitem__, order)),
+            'order': array('q', order)}
+
+
+def sorted_index_range(keys, bounds):
+    """Slice [lo, hi) of the sorted keys satisfying every (op, value) bound"""
+    lo, hi = 0, len(keys)
+    for op, value in bounds:
+        if op in ('>', '>=', '='):
+            cut = bisect_right(keys, value) if op == '>' else bisect_left(keys, value)
+            lo = max(lo, cut)
+        if op in ('<', '<=', '='):
+            cut = bisect_left(keys, value) if op == '<' else bisect_right(keys, value)
+            hi = min(hi, cut)
+    return lo, max(lo, hi)
+
+
+def ids_excluding(excluded, size):
+    """Row ids 0..size-1 in order, skipping the ascending ids in excluded"""
+    start = 0
+    for i in excluded:
+        yield from range(start, i)
+        start = i + 1
+    yield from range(start, size)
+
+
+def index_bounds(index, conditions, relation):
+    """Conditions an index can answer, with their typed literals"""
+    used = []
+    bounds = []
+    for cond in conditions:
+        if cond['field'] != index['column']:
+            continue
+        op = cond['op']
+        # NEAREST is not a bound: choose_access_path always answers it first
+        if (op in SPATIAL_ARGUMENTS) != (index['kind'] == 'grid') or op == 'NEAREST':
+            continue
+        compiled = compile_condition(cond, relation['headers'], relation['types'])
+        if not isinstance(compiled, tuple):
+            continue
+        if index['kind'] == 'grid':
+            if not bounds:
+                used, bounds = [cond], [(op, compiled[2])]
+        elif index['kind'] == 'hash':
+            if op in ('=', '<>') and (not bounds or op == '='):
+                used, bounds = [cond], [(op, compiled[2])]
+        elif op != '<>':
+            used.append(cond)
+            bounds.append((op, compiled[2]))
+    return used, bounds
+
+
+def index_lookup(index, bounds, size):
+    """Return (number of candidate rows, function producing their ids)"""
+    data = index_data(index)
+    if index['kind'] == 'hash':
+        op, value = bounds[0]
+        bucket = data.get(value, ())
+        if op == '=':
+            return len(bucket), lambda: bucket
+        return size - len(bucket), lambda: ids_excluding(bucket, size)
+    if index['kind'] == 'grid':
+        op, args = bounds[0]
+        table = tables[index['table']]
+        column = table['columns'][table['headers'].index(index['column'])]
+        search = grid_within_bbox if op == 'WITHIN_BBOX' else grid_within_distance
+        ids = search(data, column, args)
+        return len(ids), lambda: ids
+
+    lo, hi = sorted_index_range(data['keys'], bounds)
+    # Os ids voltam a ser ordenados para manter a ordem original das linhas
+    return hi - lo, lambda: array('q', sorted(data['order'][lo:hi]))
+
+
+def choose_access_path(table_name, relation, conditions):
+    """Pick the index lookup that leaves the fewest candidate rows.
+
+    Returns (ids, remaining conditions, description) or None when the best
+    option is a full scan."""
+    nearest = [cond for cond in conditions if cond['op'] == 'NEAREST']
+    if nearest:
+        return nearest_access(table_name, relation, conditions, nearest)
+
+    size = len(relation['ids'])
+    stats = table_stats.get(table_name)
+    best = None
+    for index in indexes_on(table_name):
+        used, bounds = index_bounds(index, conditions, relation)
+        if not bounds:
+            continue
+        # Ler as linhas pelo índice custa mais por linha do que um varrimento:
+        # com estatísticas um índice pouco seletivo nem chega a ser consultado
+        if (stats is not None
+                and size * conditions_selectivity(stats, used, relation) * INDEX_ROW_COST >= size):
+            continue
+        cost, lookup = index_lookup(index, bounds, size)
+        if stats is not None and cost * INDEX_ROW_COST >= size:
+            continue
+        if cost < size and (best is None or cost < best[0]):
+            best = (cost, lookup, index, used)
+
+    # Uma coluna já ordenada (p.ex. por tempo) dispensa o índice: pesquisa binária
+    table = tables[table_name]
+    for position, (header, col_type) in enumerate(zip(relation['headers'], relation['types'])):
+        if col_type not in ARRAY_CODES:
+            continue
+        used, bounds = index_bounds({'column': header, 'kind': 'sorted'}, conditions, relation)
+        if not bounds or not column_is_sorted(table, position):
+            continue
+        cost, lookup = sorted_column_lookup(table['columns'][position], col_type, bounds)
+        if cost < size and (best is None or cost < best[0]):
+            best = (cost, lookup, {'kind': 'binary search', 'column': header}, used)
+
+    # Sem índice melhor, os mapas de zonas ainda podem saltar blocos inteiros
+    zones = zone_access(table, relation, conditions)
+    if zones is not None and zones[0] < size and (best is None or zones[0] < best[0]):
+        cost, lookup, used, kept = zones
+        blocks = math.ceil(size / ZONE_BLOCK_ROWS)
+        description = (f"zone maps on {' AND '.join(format_condition(c) for c in used)}: "
+                       f"{kept} of {blocks} blocks")
+        # The zone maps only skip blocks: every condition is still checked
+        return lookup(), conditions, description
+
+    if best is None:
+        return None
+    cost, lookup, index, used = best
+    remaining = [cond for cond in conditions if cond not in used]
+    if 'name' in index:
+        description = f"{index['kind']} index '{index['name']}' on "
+    else:
+        description = f"binary search on sorted {index['column']}: "
+    description += ' AND '.join(format_condition(c) for c in used)
+    return lookup(), remaining, description
+
+
+def sorted_column_lookup(column, col_type, bounds):
+    """Like index_lookup, for a column whose values are already in order"""
+    lo, hi = sorted_index_range(column, bounds)
+    # Valores em falta (NaN não ficaria ordenado; instantes em falta ficam no início)
+    if col_type == 'timestamp':
+        lo = max(lo, bisect_right(column, MISSING_TIMESTAMP))
+        hi = max(lo, hi)
+    return hi - lo, lambda: range(lo, hi)
+
+# ==============================================
+# Zone Maps
+# ==============================================
+
+# Tables are split into fixed blocks of ZONE_BLOCK_ROWS consecutive rows (the
+# columns themselves stay contiguous). For a numeric or timestamp column the
+# zone map keeps, per block, the smallest and largest present value and the
+# number of missing values:
+#
+#   table['zones'][position] = {'min': [...], 'max': [...], 'nulls': [...]}
+#
+# A full scan skips the blocks whose range cannot satisfy a comparison (e.g.
+# Temperatura > 22 skips every block with max <= 22). Zone maps are built
+# for a column the first time a WHERE clause needs them, extended on append
+# and written by SAVE TABLE.
+
+ZONE_BLOCK_ROWS = 4096
+
+# (min, max, missing count, literal) -> whether the block may hold a match.
+# A block without values has min = inf and max = -inf and matches nothing,
+# except <>, which missing values always satisfy.
+ZONE_TESTS = {
+    '==': lambda lo, hi, nulls, value: lo <= value <= hi,
+    '!=': lambda lo, hi, nulls, value: nulls > 0 or lo != value or hi != value,
+    '>': lambda lo, hi, nulls, value: hi > value,
+    '>=': lambda lo, hi, nulls, value: hi >= value,
+    '<': lambda lo, hi, nulls, value: lo < value,
+    '<=': lambda lo, hi, nulls, value: lo <= value,
+}
+
+
+def block_zone(column, col_type, start, stop):
+    """(min, max, missing count) of rows start..stop-1 of a column"""
+    block = column[start:stop]
+    if col_type == 'float':
+        # NaN perde todas as comparações: a começar em ±inf, min/max ignoram-no
+        return (min(chain((math.inf,), block)), max(chain((-math.inf,), block)),
+                sum(map(math.isnan, block)))
+    nulls = 0
+    if col_type == 'timestamp' and MISSING_TIMESTAMP in block:
+        present = [value for value in block if value != MISSING_TIMESTAMP]
+        nulls = len(block) - len(present)
+        block = present
+    if not len(block):
+        return math.inf, -math.inf, nulls
+    return min(block), max(block), nulls
+
+
+def extend_zone(zone, column, col_type, start):
+    """Recompute a zone map from the block holding row start on"""
+    first = start // ZONE_BLOCK_ROWS
+    for values in zone.values():
+        del values[first:]
+    for begin in range(first * ZONE_BLOCK_ROWS, len(column), ZONE_BLOCK_ROWS):
+        lo, hi, nulls = block_zone(column, col_type, begin, begin + ZONE_BLOCK_ROWS)
+        zone['min'].append(lo)
+        zone['max'].append(hi)
+        zone['nulls'].append(nulls)
+
+
+def zone_map(table, position):
+    """The zone map of a column, built on first use (None for other types)"""
+    col_type = table['types'][position]
+    if col_type not in ARRAY_CODES:
+        return None
+    zones = table.get('zones', {})
+    if position not in zones:
+        with build_lock:
+            zones = table.setdefault('zones', {})
+            if position not in zones:
+                zone = {'min': [], 'max': [], 'nulls': []}
+                extend_zone(zone, table['columns'][position], col_type, 0)
+                zones[position] = zone
+    return zones[position]
+
+
+def extend_zone_maps(table, start):
+    """Bring the zone maps already built up to date after an append"""
+    for position, zone in table.get('zones', {}).items():
+        extend_zone(zone, table['columns'][position], table['types'][position], start)
+
+
+def zone_access(table, relation, conditions):
+    """Blocks of a table that may hold rows matching the conditions.
+
+    Returns (candidate rows, function producing their ids, conditions used,
+    blocks kept), or None when no condition can use a zone map."""
+    keep = None
+    used = []
+    for cond in conditions:
+        if cond['op'] in SPATIAL_ARGUMENTS or cond['field'] not in relation['headers']:
+            continue
+        compiled = compile_condition(cond, relation['headers'], relation['types'])
+        if not isinstance(compiled, tuple):
+            continue
+        position, op, value = compiled
+        zone = zone_map(table, position)
+        if zone is None:
+            continue
+        matches = map(ZONE_TESTS[op], zone['min'], zone['max'], zone['nulls'], repeat(value))
+        keep = list(matches) if keep is None else list(map(and_, keep, matches))
+        used.append(cond)
+    if keep is None:
+        return None
+
+    size = table_size(table)
+    ranges = [range(block * ZONE_BLOCK_ROWS, min(size, (block + 1) * ZONE_BLOCK_ROWS))
+              for block, kept in enumerate(keep) if kept]
+    return (sum(map(len, ranges)), lambda: chain.from_iterable(ranges), used, len(ranges))
+
+# ==============================================
+# Table Statistics
+# ==============================================
+
+# ANALYZE TABLE t stores in table_stats[t]:
+#
+#   {'rows': n, 'columns': {header: {'distinct', 'nulls', 'width', 'common',
+#                                    'min', 'max', 'histogram'}}}
+#
+# 'distinct' is a HyperLogLog estimate over the present values, 'width' the
+# average bytes of a value, 'common' the most frequent values of a sample
+# with the fraction of rows holding each (so a skewed column such as Id is
+# not taken as uniform), and 'histogram' (numeric and timestamp columns)
+# the HISTOGRAM_BUCKETS + 1 bounds of an equi-depth histogram of a sample:
+# each bucket holds about the same number of rows. The planner uses them to
+# evaluate the most selective, cheapest conditions of a WHERE clause first,
+# to leave aside an index that would return a large part of the table and to
+# size the inputs of a JOIN. Storing, appending to or dropping a table drops
+# its statistics; with SET AUTO_ANALYZE 1 every IMPORT collects them again.
+
+HLL_BITS = 12                   # 4096 registos: erro típico de ~1.6%
+HISTOGRAM_BUCKETS = 32
+ANALYZE_SAMPLE = 100_000        # linhas da amostra dos histogramas e larguras
+ANALYZE_CHUNK = 65536
+COMMON_VALUES = 16
+INDEX_ROW_COST = 4              # uma linha lida pelo índice vale ~4 linhas varridas
+
+# Selectivity of a condition on a column without statistics (or a spatial one)
+DEFAULT_SELECTIVITY = {'==': 0.1, '!=': 0.9, '<': 1 / 3, '<=': 1 / 3, '>': 1 / 3,
+                       '>=': 1 / 3, 'WITHIN_BBOX': 0.1, 'WITHIN_DISTANCE': 0.1,
+                       'NEAREST': 0.01}
+# Relative cost of testing a condition on one row (a comparison costs 1)
+CONDITION_COSTS = {'WITHIN_BBOX': 2, 'WITHIN_DISTANCE': 10}
+
+
+class HyperLogLog:
+    """Distinct-count estimate in 2 ** HLL_BITS one-byte registers"""
+    def __init__(self):
+        self.registers = bytearray(1 << HLL_BITS)
+
+    def add(self, values):
+        registers = self.registers
+        mask = (1 << HLL_BITS) - 1
+        width = 64 - HLL_BITS
+        for value in values:
+            if isinstance(value, str):
+                # hash() de texto muda a cada execução: a estimativa não seria reprodutível
+                h = int.from_bytes(blake2b(value.encode('utf-8'), digest_size=8).digest(), 'little')
+            else:
+                h = hash(value) & 0xFFFFFFFFFFFFFFFF
+            # hash() de inteiros e reais não é uniforme: mistura splitmix64
+            h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+            h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+            h ^= h >> 31
+            rank = width - (h >> HLL_BITS).bit_length() + 1
+            if rank > registers[h & mask]:
+                registers[h & mask] = rank
+
+    def estimate(self):
+        m = len(self.registers)
+        raw = 0.7213 / (1 + 1.079 / m) * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            return round(m * math.log(m / zeros))     # poucos valores: contagem linear
+        return round(raw)
+
+
+def present_values(column, col_type):
+    """The values of a column that are not missing"""
+    if col_type == 'float':
+        return filterfalse(math.isnan, column)
+    if col_type == 'timestamp':
+        return filter(MISSING_TIMESTAMP.__ne__, column)
+    if col_type == 'point':
+        return (point for point in column if point[0] == point[0])
+    if col_type == 'str':
+        return filter(None, column)
+    return iter(column)
+
+
+def column_stats(column, col_type):
+    size = len(column)
+    distinct = HyperLogLog()
+    nulls = 0
+    lo = hi = None
+    for start in range(0, size, ANALYZE_CHUNK):
+        chunk = column[start:start + ANALYZE_CHUNK]
+        present = list(present_values(chunk, col_type))
+        nulls += len(chunk) - len(present)
+        present = set(present)
+        if present and col_type != 'point':
+            lo = min(present) if lo is None else min(lo, min(present))
+            hi = max(present) if hi is None else max(hi, max(present))
+        distinct.add(present)
+
+    sample = list(islice(column, 0, None, max(1, size // ANALYZE_SAMPLE)))
+    stats = {'distinct': distinct.estimate(), 'nulls': nulls, 'min': lo, 'max': hi,
+             'width': sum(map(sys.getsizeof, sample)) / len(sample) if sample else 0,
+             'common': {}}
+    counts = Counter(present_values(sample, col_type)).most_common(COMMON_VALUES)
+    # Só interessam os valores que aparecem mais do que a média
+    average = len(sample) / max(1, stats['distinct'])
+    stats['common'] = {value: n / len(sample) for value, n in counts if n > 1 and n > average}
+    if col_type in ARRAY_CODES:
+        values = sorted(present_values(sample, col_type))
+        if values:
+            last = len(values) - 1
+            stats['histogram'] = [values[b * last // HISTOGRAM_BUCKETS]
+                                  for b in range(HISTOGRAM_BUCKETS + 1)]
+    return stats
+
+
+def analyze_table(table_name):
+    """Collect (and keep) the statistics of a table"""
+    table = get_table(table_name)
+    stats = {'rows': table_size(table),
+             'columns': {header: column_stats(column, col_type) for header, col_type, column
+                         in zip(table['headers'], table['types'], table['columns'])}}
+    table_stats[table_name] = stats
+    return stats
+
+
+def stats_row_bytes(stats):
+    """Estimated bytes of one row as a tuple of Python values"""
+    return (sys.getsizeof(()) + 8 * len(stats['columns'])
+            + sum(column['width'] for column in stats['columns'].values()))
+
+
+def histogram_fraction(bounds, value, inclusive):
+    """Estimated fraction of the values below (or up to) value"""
+    buckets = len(bounds) - 1
+    i = bisect_right(bounds, value) if inclusive else bisect_left(bounds, value)
+    if i == 0:
+        return 0.0
+    if i > buckets:
+        return 1.0
+    lo, hi = bounds[i - 1], bounds[i]
+    within = (value - lo) / (hi - lo) if hi > lo else 1.0
+    return (i - 1 + within) / buckets
+
+
+def condition_selectivity(stats, cond, relation):
+    """Estimated fraction of the rows of a table satisfying one condition"""
+    compiled = compile_condition(cond, relation['headers'], relation['types'])
+    if compiled is True or compiled is False:
+        return float(compiled)
+    position, op, value = compiled
+    column = stats['columns'].get(relation['headers'][position])
+    if column is None or op in SPATIAL_ARGUMENTS or not stats['rows']:
+        return DEFAULT_SELECTIVITY[op]
+
+    present = 1 - column['nulls'] / stats['rows']
+    common = column['common']
+    comparable = column['min'] is not None and relation['types'][position] != 'point'
+    if comparable and not column['min'] <= value <= column['max']:
+        equal = 0.0
+    elif value in common:
+        equal = common[value]
+    else:
+        # Os restantes valores repartem por igual as linhas que sobram
+        others = max(1, column['distinct'] - len(common))
+        equal = max(0.0, present - sum(common.values())) / others
+    if op == '==':
+        return equal
+    if op == '!=':
+        # Os valores em falta também são diferentes
+        return 1 - equal
+    bounds = column.get('histogram')
+    if bounds is None:
+        return DEFAULT_SELECTIVITY[op]
+    if op in ('<', '<='):
+        below = histogram_fraction(bounds, value, op == '<=')
+    else:
+        below = 1 - histogram_fraction(bounds, value, op == '>')
+    return below * present
+
+
+def conditions_selectivity(stats, conditions, relation):
+    """Selectivity of an AND of conditions (taken as independent)"""
+    selectivity = 1.0
+    for cond in conditions:
+        selectivity *= condition_selectivity(stats, cond, relation)
+    return selectivity
+
+
+def order_conditions(stats, conditions, relation):
+    """Order AND conditions so the ones that reject most rows for least work
+    come first (ascending cost / (1 - selectivity))"""
+    def rank(cond):
+        rejected = 1 - condition_selectivity(stats, cond, relation)
+        cost = CONDITION_COSTS.get(cond['op'], 1)
+        return cost / rejected if rejected > 0 else math.inf
+    return sorted(conditions, key=rank)
+
+
+def format_stat(value, col_type):
+    if value is None:
+        return ''
+    return VALUE_FORMATTERS.get(col_type, format_value)(value)
+
+# ==============================================
+# Spatial Indexes
+# ==============================================
+
+# A 'grid' index (CREATE INDEX ... USING GRID) splits the plane into square
+# cells of 'cell' degrees; 'cells' maps (floor(lon / cell), floor(lat / cell))
+# to the ascending ids of the points in that cell. The cell size is chosen so
+# that a cell holds about GRID_POINTS_PER_CELL points on average: WITHIN_BBOX
+# and WITHIN_DISTANCE only visit the cells overlapping their box, and NEAREST
+# visits rings of cells around the query point until no unvisited cell can
+# hold anything closer. Distances are great-circle distances in km.
+
+GRID_POINTS_PER_CELL = 8
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# Spatial predicates and the number of arguments they take after the column
+SPATIAL_ARGUMENTS = {'WITHIN_BBOX': 4, 'WITHIN_DISTANCE': 3, 'NEAREST': 3}
+
+
+def haversine_km(lon1, lat1, lon2, lat2):
+    """Great-circle distance in km between two points given in degrees"""
+    lon1, lat1, lon2, lat2 = map(math.radians, (lon1, lat1, lon2, lat2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def distance_bbox(lon, lat, km):
+    """Box (minlon, minlat, maxlon, maxlat) holding every point within km of (lon, lat)"""
+    dlat = km / KM_PER_DEGREE
+    if abs(lat) + dlat >= 90:
+        return (-180.0, max(-90.0, lat - dlat), 180.0, min(90.0, lat + dlat))
+    dlon = math.degrees(math.asin(math.sin(km / EARTH_RADIUS_KM) / math.cos(math.radians(lat))))
+    if lon - dlon < -180 or lon + dlon > 180:
+        return (-180.0, lat - dlat, 180.0, lat + dlat)
+    return (lon - dlon, lat - dlat, lon + dlon, lat + dlat)
+
+
+def build_grid_index(column):
+    lon, lat = column.lon, column.lat
+    present = [i for i in range(len(lon)) if lon[i] == lon[i] and lat[i] == lat[i]]
+    if not present:
+        return {'cell': 1.0, 'cells': {}}
+    xs = [lon[i] for i in present]
+    ys = [lat[i] for i in present]
+    # A área é medida sem os 1% de pontos mais afastados de cada lado, para que
+    # meia dúzia de estações isoladas não torne as células enormes
+    lo, hi = len(present) // 100, len(present) - 1 - len(present) // 100
+    sorted_xs, sorted_ys = sorted(xs), sorted(ys)
+    width, height = sorted_xs[hi] - sorted_xs[lo], sorted_ys[hi] - sorted_ys[lo]
+    cell = math.sqrt(width * height * GRID_POINTS_PER_CELL / (hi - lo + 1))
+    if cell == 0:
+        # Pontos todos sobre uma linha (ou no mesmo sítio)
+        cell = max(width, height) * GRID_POINTS_PER_CELL / (hi - lo + 1) or 1.0
+    cells = defaultdict(list)
+    for i, x, y in zip(present, xs, ys):
+        cells[math.floor(x / cell), math.floor(y / cell)].append(i)
+    return {'cell': cell, 'cells': {key: array('q', ids) for key, ids in cells.items()}}
+
+
+def grid_cells(data, minlon, minlat, maxlon, maxlat):
+    """Ids of the points in the cells overlapping a box"""
+    cell, cells = data['cell'], data['cells']
+    x0, x1 = math.floor(minlon / cell), math.floor(maxlon / cell)
+    y0, y1 = math.floor(minlat / cell), math.floor(maxlat / cell)
+    if (x1 - x0 + 1) * (y1 - y0 + 1) > len(cells):
+        for (x, y), ids in cells.items():
+            if x0 <= x <= x1 and y0 <= y <= y1:
+                yield from ids
+        return
+    for x in range(x0, x1 + 1):
+        for y in range(y0, y1 + 1):
+            yield from cells.get((x, y), ())
+
+
+def grid_within_bbox(data, column, box):
+    minlon, minlat, maxlon, maxlat = box
+    lon, lat = column.lon, column.lat
+    return array('q', sorted(i for i in grid_cells(data, *box)
+                             if minlon <= lon[i] <= maxlon and minlat <= lat[i] <= maxlat))
+
+
+def grid_within_distance(data, column, args):
+    x, y, km = args
+    lon, lat = column.lon, column.lat
+    return array('q', sorted(i for i in grid_cells(data, *distance_bbox(x, y, km))
+                             if haversine_km(lon[i], lat[i], x, y) <= km))
+
+
+def nearest_points(column, ids, x, y, k):
+    """(distance, id) of the k points among ids closest to (x, y), nearest first"""
+    lon, lat = column.lon, column.lat
+    return heapq.nsmallest(k, ((haversine_km(lon[i], lat[i], x, y), i)
+                               for i in ids if lon[i] == lon[i]))
+
+
+def ring_distance_km(lat, r, cell):
+    """Lower bound of the distance from a point to anything beyond r rings of cells around it"""
+    delta = r * cell
+    farthest = min(90.0, abs(lat) + delta)
+    across = 2 * math.asin(math.cos(math.radians(farthest)) * math.sin(math.radians(min(delta, 180)) / 2))
+    return min(delta * KM_PER_DEGREE, across * EARTH_RADIUS_KM)
+
+
+def grid_nearest(data, column, args):
+    x, y, k = args
+    cell, cells = data['cell'], data['cells']
+    cx, cy = math.floor(x / cell), math.floor(y / cell)
+    best = []
+    r = 0
+    while True:
+        if 8 * r > len(cells):
+            # Anel maior do que a grelha: ver de uma vez as células que faltam
+            ring = [ids for (i, j), ids in cells.items() if max(abs(i - cx), abs(j - cy)) >= r]
+        elif r == 0:
+            ring = [cells.get((cx, cy), ())]
+        else:
+            ring = [cells.get((i, j), ()) for i in range(cx - r, cx + r + 1)
+                    for j in (cy - r, cy + r)]
+            ring += [cells.get((i, j), ()) for i in (cx - r, cx + r)
+                     for j in range(cy - r + 1, cy + r)]
+        best = heapq.nsmallest(k, best + nearest_points(column, chain.from_iterable(ring), x, y, k))
+        if 8 * r > len(cells):
+            break
+        if len(best) == k and best[-1][0] <= ring_distance_km(y, r, cell):
+            break
+        r += 1
+    return array('q', [i for _, i in best])
+
+
+def nearest_access(table_name, relation, conditions, nearest):
+    """Access path of a query with NEAREST: its k rows, nearest first"""
+    if len(nearest) > 1:
+        raise CQLError("Só é permitido um NEAREST por consulta")
+    cond = nearest[0]
+    remaining = [c for c in conditions if c is not cond]
+    compiled = compile_condition(cond, relation['headers'], relation['types'])
+    if not isinstance(compiled, tuple):
+        return range(0), remaining, f"no rows: {format_condition(cond)}"
+    idx, _, args = compiled
+    column = relation['columns'][idx]
+    index = find_index(table_name, cond['field'], 'grid')
+    if index is not None:
+        ids = grid_nearest(index_data(index), column, args)
+        return ids, remaining, f"grid index '{index['name']}' on {format_condition(cond)}"
+    ids = array('q', [i for _, i in nearest_points(column, relation['ids'], *args)])
+    return ids, remaining, f"nearest-neighbour scan: {format_condition(cond)}"
+
+# ==============================================
+# Materialized Tables
+# ==============================================
+
+# materialized[name] = {'name', 'stmt', 'sources', 'incremental'}
+# CREATE MATERIALIZED TABLE remembers the SELECT / JOIN a table was built
+# from. Rows appended to a source (append_table) go through the definition on
+# their own and the result is appended to the materialized table, which in
+# turn updates whatever is built on it. Definitions whose result is not a
+# plain union over new rows (GROUP BY, aggregates, ORDER BY, LIMIT, NEAREST,
+# a table joined with itself) are rebuilt in full instead, as every
+# definition is when a source is replaced or on REFRESH TABLE.
+
+def materialized_definition(table_name, stmt):
+    """Definition of a CREATE [MATERIALIZED] TABLE statement (None if not materialized)"""
+    if not stmt.get('materialized'):
+        return None
+    if stmt['type'] == 'create_select_stmt':
+        select = stmt['select']
+        sources = [select['table']]
+        incremental = not (select.get('group_by') or select.get('order_by')
+                           or select['limit'] is not None
+                           or any(isinstance(f, dict) for f in select['fields'])
+                           or any(c['op'] == 'NEAREST' for c in select['conditions'] or ()))
+    else:
+        sources = [stmt['left_table'], stmt['right_table']]
+        incremental = sources[0] != sources[1]
+    return {'name': table_name, 'stmt': stmt, 'sources': sources, 'incremental': incremental}
+
+
+def renamed_definition(definition, old_name, new_name):
+    """A definition that reads new_name wherever it read old_name (RENAME TABLE)"""
+    stmt = dict(definition['stmt'])
+    if stmt['type'] == 'create_select_stmt':
+        stmt['select'] = dict(stmt['select'], table=new_name)
+    else:
+        for side in ('left_table', 'right_table'):
+            if stmt[side] == old_name:
+                stmt[side] = new_name
+    sources = [new_name if source == old_name else source for source in definition['sources']]
+    # Uma junção que passe a ser da tabela consigo própria deixa de ser incremental
+    incremental = definition['incremental'] and len(set(sources)) == len(sources)
+    return dict(definition, stmt=stmt, sources=sources, incremental=incremental)
+
+
+def bound_definition(definition):
+    """A definition with the parameter values of this execution (refreshes run
+    later, outside the procedure or EXECUTE that created the table)"""
+    if definition is None:
+        return None
+    return dict(definition, stmt=bind_values(definition['stmt']))
+
+
+def depends_on(table_name, source):
+    """Whether a table is materialized (directly or not) from source"""
+    definition = materialized.get(table_name)
+    return definition is not None and any(
+        name == source or depends_on(name, source) for name in definition['sources'])
+
+
+def build_materialized(definition, root):
+    """Contents of a new materialized table (never shared with the result cache)"""
+    if any(name == definition['name'] or depends_on(name, definition['name'])
+           for name in definition['sources']):
+        raise CQLError(f"A tabela materializada '{definition['name']}' não pode depender de si própria")
+    table = relation_to_table(root.run())
+    table['appendable'] = True
+    return table
+
+
+def definition_root(stmt, source=None, start=None):
+    """Operator tree of a definition; with a source, over its rows from start on only"""
+    if stmt['type'] == 'create_select_stmt':
+        return plan_select(stmt['select'], DeltaScan(source, start) if source else None)
+    left = DeltaScan(source, start) if source == stmt['left_table'] else None
+    right = DeltaScan(source, start) if source == stmt['right_table'] else None
+    return plan_join(stmt, left, right)
+
+
+def refresh_materialized(table_name):
+    """Rebuild a materialized table from its sources (and what is built on it)"""
+    definition = materialized[table_name]
+    for source in definition['sources']:
+        get_table(source)
+    table = build_materialized(definition, definition_root(definition['stmt']))
+    print(f"Tabela materializada '{table_name}' reconstruída ({table_size(table)} registros)")
+    store_table(table_name, table, definition)
+
+
+def refresh_dependents(table_name, start=None):
+    """Bring the materialized tables built on a table up to date after it changed.
+
+    With start only the rows from start on are new; otherwise the table was
+    replaced and its dependents are rebuilt."""
+    for definition in [d for d in list(materialized.values()) if table_name in d['sources']]:
+        name = definition['name']
+        missing = [source for source in definition['sources'] if source not in tables]
+        if missing:
+            print(f"Aviso: Tabela materializada '{name}' não atualizada "
+                  f"('{missing[0]}' não existe)")
+            continue
+        if start is not None and definition['incremental']:
+            delta = relation_to_table(definition_root(definition['stmt'], table_name, start).run())
+            print(f"Tabela materializada '{name}' atualizada (+{table_size(delta)} registros)")
+            if table_size(delta):
+                append_table(name, delta)
+        else:
+            refresh_materialized(name)
+
+# ==============================================
+# Result Cache
+# ==============================================
+
+# Results of SELECT / CREATE TABLE ... SELECT / JOIN are kept in an LRU cache
+# keyed by the normalized query and the versions of the tables it reads.
+# Every catalog change bumps the version of the tables involved and drops the
+# entries that read them; entries are evicted once the cache holds more than
+# settings['cache_memory'] bytes.
+
+result_cache = OrderedDict()   # key -> {'table', 'bytes', 'tables'}
+cache_stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0, 'bytes': 0}
+table_versions = {}
+version_counter = count(1)
+cache_state = threading.local() # bypass: EXPLAIN ANALYZE desta thread mede sem a cache
+cache_lock = threading.RLock() # pedidos concorrentes no modo --serve
+
+
+def bump_table_version(table_name):
+    with cache_lock:
+        table_versions[table_name] = next(version_counter)
+        for key in [key for key, entry in result_cache.items() if table_name in entry['tables']]:
+            cache_stats['bytes'] -= result_cache.pop(key)['bytes']
+            cache_stats['invalidations'] += 1
+
+
+def cache_key(stmt, table_names):
+    query = json.dumps(stmt, sort_keys=True, default=str)
+    # Os valores dos parâmetros fazem parte da consulta (EXECUTE, CALL com argumentos)
+    bindings = getattr(parameter_state, 'bindings', None)
+    if bindings:
+        query += json.dumps(sorted(bindings.items(), key=str), default=str)
+    return query, tuple((name, table_versions.get(name)) for name in table_names)
+
+
+def cache_get(key):
+    if getattr(cache_state, 'bypass', False):
+        return None
+    with cache_lock:
+        entry = result_cache.get(key)
+        if entry is None:
+            cache_stats['misses'] += 1
+            return None
+        cache_stats['hits'] += 1
+        result_cache.move_to_end(key)
+        return entry['table']
+
+
+def cache_put(key, table_names, table, size=None):
+    if size is None:
+        size = estimate_table_bytes(table)
+    if size > settings['cache_memory'] or not settings['cache_memory']:
+        return
+    with cache_lock:
+        if key in result_cache:
+            cache_stats['bytes'] -= result_cache.pop(key)['bytes']
+        result_cache[key] = {'table': table, 'bytes': size, 'tables': set(table_names)}
+        cache_stats['bytes'] += size
+        shrink_cache()
+
+
+def shrink_cache():
+    with cache_lock:
+        while result_cache and cache_stats['bytes'] > settings['cache_memory']:
+            cache_stats['bytes'] -= result_cache.popitem(last=False)[1]['bytes']
+            cache_stats['evictions'] += 1
+
+
+def uncache_table(table):
+    """Drop the cached results that are this table (it is being spilled)"""
+    with cache_lock:
+        for key in [key for key, entry in result_cache.items() if entry['table'] is table]:
+            cache_stats['bytes'] -= result_cache.pop(key)['bytes']
+
+
+def clear_cache():
+    with cache_lock:
+        result_cache.clear()
+        cache_stats['bytes'] = 0
+
+
+@contextmanager
+def bypassing_cache():
+    """Skip cached results in the statements this thread runs inside"""
+    previous = getattr(cache_state, 'bypass', False)
+    cache_state.bypass = True
+    try:
+        yield
+    finally:
+        cache_state.bypass = previous
+
+
+class CachingRows:
+    """Pass rows through while keeping a copy for the cache, up to max_bytes"""
+    def __init__(self, rows, max_bytes):
+        self.rows = rows
+        self.max_bytes = max_bytes
+        self.kept = []
+        self.bytes = 0
+        self.complete = False
+
+    def __iter__(self):
+        row_bytes = None
+        for row in self.rows:
+            if self.kept is not None:
+                if row_bytes is None:
+                    row_bytes = estimate_row_bytes(row)
+                self.bytes += row_bytes
+                if self.bytes > self.max_bytes:
+                    self.kept = None
+                else:
+                    self.kept.append(row)
+            yield row
+        self.complete = self.kept is not None
+
+
+# ==============================================
+# Profiling (EXPLAIN ANALYZE)
+# ==============================================
+
+# The profiler wraps run() of every operator of a plan (on the instance, so
+# the operators themselves are unchanged) and the iterators they return, and
+# accounts wall time, CPU time and rows to the operator being pulled. Times
+# and memory are inclusive: pulling a row from an operator also pulls from
+# its inputs. Memory is how much the peak RSS of the process grew while the
+# operator was working; work done by worker processes is not counted.
+
+def operator_children(op):
+    return [getattr(op, name) for name in ('child', 'left', 'right') if hasattr(op, name)]
+
+
+def walk_operators(op):
+    if op is None:
+        return
+    yield op
+    for child in operator_children(op):
+        yield from walk_operators(child)
+
+
+def peak_memory():
+    """Peak RSS of this process in bytes (0 where getrusage is not available)"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0
+    # ru_maxrss vem em KiB no Linux e em bytes no macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+class OperatorProfile:
+    def __init__(self):
+        self.rows = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak = 0       # crescimento do pico de memória do processo
+
+
+class Profiler:
+    def __init__(self, root):
+        self.total = OperatorProfile()
+        self.profiles = {}
+        self.operators = list(walk_operators(root))
+        for op in self.operators:
+            self.profiles[id(op)] = OperatorProfile()
+            op.run = self.profiled_run(op, op.run)
+
+    def close(self):
+        for op in self.operators:
+            del op.run
+
+    def profile(self, op):
+        return self.profiles[id(op)]
+
+    @contextmanager
+    def measuring(self, profile):
+        started = self.start()
+        try:
+            yield
+        finally:
+            self.stop(profile, started)
+
+    def start(self):
+        return time.perf_counter(), time.process_time(), peak_memory()
+
+    def stop(self, profile, started):
+        profile.wall += time.perf_counter() - started[0]
+        profile.cpu += time.process_time() - started[1]
+        profile.peak += peak_memory() - started[2]
+
+    def profiled_run(self, op, run):
+        profile = self.profile(op)
+
+        def profiled():
+            with self.measuring(profile):
+                relation = run()
+            if 'rows' in relation:
+                return dict(relation, rows=self.counted(relation['rows'], profile))
+            ids = relation['ids']
+            if isinstance(ids, range):
+                # Uma vista contígua da tabela: não há trabalho por linha a medir
+                profile.rows += len(ids)
+                return relation
+            return dict(relation, ids=self.counted(ids, profile))
+        return profiled
+
+    def counted(self, items, profile):
+        next_item = iter(items).__next__
+        start, stop = self.start, self.stop
+        while True:
+            started = start()
+            try:
+                item = next_item()
+            except StopIteration:
+                return
+            finally:
+                stop(profile, started)
+            profile.rows += 1
+            yield item
+
+
+def print_plan(plan, root, profiler=None):
+    """Print a statement plan and its operator tree, one operator per line"""
+    print(f"{plan.describe()}")
+
+    def show(op, depth):
+        line = "  " * depth + "-> " + op.describe()
+        if profiler is not None:
+            profile = profiler.profile(op)
+            children = operator_children(op)
+            rows = str(profile.rows)
+            if children:
+                rows = f"{sum(profiler.profile(child).rows for child in children)} -> {rows}"
+            line += (f"  (linhas: {rows}, tempo {format_ms(profile.wall)}, "
+                     f"CPU {format_ms(profile.cpu)}, memória +{format_bytes(profile.peak)})")
+        print(line)
+        for child in operator_children(op):
+            show(child, depth + 1)
+
+    if root is not None:
+        show(root, 1)
+
+# ==============================================
+# Parallel Execution
+# ==============================================
+
+# With SET PARALLELISM N (or --workers N) full scans and JOIN probes are split
+# into consecutive row ranges that run in a pool of worker processes. Workers
+# are forked for each statement, so they see the catalog columns through
+# copy-on-write memory instead of receiving pickled rows; each range returns
+# only a compact array of matching row ids, and the results are merged back in
+# range order.
+#
+# IMPORT splits its input the same way: every file of a glob pattern, and
+# byte ranges of a large file cut at line boundaries, are parsed and typed by
+# the workers, which send back compact typed columns; the process that runs
+# the statement checks that all files have the same header and concatenates
+# the columns, widening int to float (or typing the column again from the
+# text) where two ranges inferred different types.
+
+PARALLEL_MIN_ROWS = 100_000     # abaixo disto não compensa lançar processos
+PARALLEL_MIN_CHUNK = 50_000
+CHUNKS_PER_WORKER = 4
+PARALLEL_MIN_IMPORT_BYTES = 8 << 20
+IMPORT_CHUNK_BYTES = 4 << 20    # tamanho mínimo de cada parte de um IMPORT paralelo
+
+# Valor de uma célula vazia, por tipo, nas partes em que a coluna veio toda vazia
+IMPORT_MISSING = {'float': math.nan, 'timestamp': MISSING_TIMESTAMP, 'point': MISSING_POINT}
+
+# Estado de cada processo trabalhador (preenchido pelo initializer)
+worker_state = {}
+
+
+def parallel_workers(relation):
+    """Number of workers to use for a scan of relation (1 = sequential)"""
+    workers = settings['parallelism']
+    ids = relation.get('ids')
+    if workers > 1 and isinstance(ids, range) and ids.step == 1 and len(ids) >= PARALLEL_MIN_ROWS:
+        return workers
+    return 1
+
+
+def pool_context():
+    # multiprocessing e concurrent.futures só são importados quando há trabalho
+    # paralelo: pesam bastante no arranque do interpretador
+    import multiprocessing
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+
+def parallel_ranges(ids, workers, initializer, initargs, task):
+    """Run task(start, stop) over consecutive ranges of ids in worker processes.
+
+    Results are yielded in range order; only a bounded window of ranges is in
+    flight, so a consumer that stops early (LIMIT) cancels the rest."""
+    chunk = max(PARALLEL_MIN_CHUNK, math.ceil(len(ids) / (workers * CHUNKS_PER_WORKER)))
+    ranges = iter([(start, min(start + chunk, ids.stop))
+                   for start in range(ids.start, ids.stop, chunk)])
+
+    from concurrent.futures import ProcessPoolExecutor
+    executor = ProcessPoolExecutor(workers, mp_context=pool_context(),
+                                   initializer=initializer, initargs=initargs)
+    try:
+        pending = deque(executor.submit(task, *r) for r in islice(ranges, workers * 2))
+        while pending:
+            result = pending.popleft().result()
+            following = next(ranges, None)
+            if following is not None:
+                pending.append(executor.submit(task, *following))
+            yield result
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def parallel_filter(relation, conditions, workers):
+    """Ids of the rows of relation matching conditions, filtered in parallel"""
+    for ids in parallel_ranges(relation['ids'], workers, init_scan_worker,
+                               (relation, conditions), scan_chunk):
+        yield from ids
+
+
+def init_scan_worker(relation, conditions):
+    worker_state['predicate'] = compile_conditions(conditions, relation)
+
+
+def scan_chunk(start, stop):
+    return array('q', filter(worker_state['predicate'], range(start, stop)))
+
+
+def parallel_probe(probe, probe_positions, lookup, workers):
+    """Pairs (probe id, build id) of matching rows, probed in parallel"""
+    for probe_ids, build_ids in parallel_ranges(probe['ids'], workers, init_probe_worker,
+                                                (probe['columns'], probe_positions, lookup),
+                                                probe_chunk):
+        yield from zip(probe_ids, build_ids)
+
+
+def init_probe_worker(columns, positions, lookup):
+    worker_state['key'] = column_key(columns, positions)
+    worker_state['lookup'] = lookup
+
+
+def probe_chunk(start, stop):
+    key = worker_state['key']
+    lookup = worker_state['lookup']
+    probe_ids = array('q')
+    build_ids = array('q')
+    for i in range(start, stop):
+        matches = lookup.get(key(i))
+        if matches:
+            for j in matches:
+                probe_ids.append(i)
+                build_ids.append(j)
+    return probe_ids, build_ids
+
+
+def read_csv_files(filenames):
+    """Read CSV files with the same header into one table, in parallel with SET PARALLELISM"""
+    workers = settings['parallelism']
+    if len(filenames) == 1 and (workers == 1
+                                or os.path.getsize(filenames[0]) < PARALLEL_MIN_IMPORT_BYTES):
+        return read_csv_table(filenames[0])
+
+    headers = None
+    segments = []
+    for filename in filenames:
+        file_headers, offset = csv_header(filename)
+        if headers is None:
+            headers = file_headers
+        elif file_headers != headers:
+            raise CQLError(f"O cabeçalho de '{filename}' ({', '.join(file_headers)}) não "
+                           f"corresponde ao de '{filenames[0]}' ({', '.join(headers)})")
+        segments.append((filename, offset, os.path.getsize(filename)))
+
+    total = sum(stop - start for _, start, stop in segments)
+    if workers == 1 or total < PARALLEL_MIN_IMPORT_BYTES:
+        tasks = [segments]
+    else:
+        chunk = max(IMPORT_CHUNK_BYTES, math.ceil(total / (workers * CHUNKS_PER_WORKER)))
+        tasks = import_tasks(segments, chunk)
+
+    if len(tasks) == 1:
+        results = [parse_segments(tasks[0], len(headers))]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(min(workers, len(tasks)), mp_context=pool_context()) as executor:
+            results = list(executor.map(parse_segments, tasks, repeat(len(headers))))
+
+    report_skipped_lines(tasks, results, len(headers), len(filenames) > 1)
+    types = []
+    columns = []
+    for position in range(len(headers)):
+        merged = merge_columns([result[0][position] for result in results])
+        if merged is None:
+            merged = infer_column(segment_values(chain.from_iterable(tasks), position,
+                                                 len(headers)))
+        types.append(merged[0])
+        columns.append(merged[1])
+    return {'headers': headers, 'types': types, 'columns': columns, 'appendable': True}
+
+
+def import_tasks(segments, chunk):
+    """Group byte ranges of files into tasks of about chunk bytes, cutting large files"""
+    tasks = [[]]
+    size = 0
+    for filename, start, stop in segments:
+        with open(filename, 'rb') as f:
+            cuts = [start]
+            for target in range(start + chunk, stop, chunk):
+                if target <= cuts[-1]:
+                    continue
+                # A parte seguinte começa no início de uma linha, e fora de aspas: com
+                # um número ímpar de aspas a linha acaba dentro de um campo entre aspas
+                quotes = count_quotes(f, cuts[-1], target - 1)
+                quotes += f.readline().count(b'"')
+                while quotes % 2:
+                    line = f.readline()
+                    if not line:
+                        break
+                    quotes += line.count(b'"')
+                if f.tell() >= stop:
+                    break
+                cuts.append(f.tell())
+            cuts.append(stop)
+        for piece in zip(cuts, cuts[1:]):
+            tasks[-1].append((filename, *piece))
+            size += piece[1] - piece[0]
+            if size >= chunk:
+                tasks.append([])
+                size = 0
+    return [task for task in tasks if task]
+
+
+def count_quotes(f, start, stop):
+    """Number of '"' between two offsets of a binary file, leaving it at stop"""
+    f.seek(start)
+    quotes = 0
+    while start < stop:
+        block = f.read(min(IMPORT_CHUNK_BYTES, stop - start))
+        if not block:
+            break
+        quotes += block.count(b'"')
+        start += len(block)
+    return quotes
+
+
+def segment_reader(filename, start, stop):
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        text = f.read(stop - start).decode(CSV_ENCODING)
+    return csv.reader(io.StringIO(text, newline=''))
+
+
+def segment_values(segments, position, num_columns):
+    """Raw cells of one column of the valid rows of byte ranges of CSV files"""
+    values = []
+    for segment in segments:
+        rows = csv_rows(segment_reader(*segment), num_columns, 1, [])
+        values.extend(row[position] for _, row in rows)
+    return values
+
+
+def parse_segments(segments, num_columns):
+    """Typed columns of the valid rows of byte ranges of CSV files (IMPORT worker).
+
+    Returns a (type, column) pair per column, (None, rows) for a column whose
+    cells are all empty, and the record count and malformed lines of each range."""
+    valid_data = []
+    lines = []
+    for segment in segments:
+        # Como em csv_table, cada registo conta como uma linha
+        records = list(segment_reader(*segment))
+        skipped = []
+        valid_data.extend(row for _, row in csv_rows(records, num_columns, 1, skipped))
+        lines.append((len(records), skipped))
+
+    raw_columns = list(zip(*valid_data)) if valid_data else [()] * num_columns
+    del valid_data
+    columns = [infer_column(values) if any(values) else (None, len(values))
+               for values in raw_columns]
+    return columns, lines
+
+
+def report_skipped_lines(tasks, results, num_columns, several_files):
+    """Print the malformed lines found by the workers with their line in the file"""
+    first_line = {}
+    for segments, (_, lines) in zip(tasks, results):
+        for (filename, _, _), (line_count, skipped) in zip(segments, lines):
+            # A linha 1 de cada ficheiro é o cabeçalho
+            line = first_line.get(filename, 2)
+            for local, found in skipped:
+                where = f"Linha {line + local - 1}"
+                if several_files:
+                    where += f" de '{filename}'"
+                print(column_count_warning(where, num_columns, found))
+            first_line[filename] = line + line_count
+
+
+def merge_columns(parts):
+    """Concatenate the (type, column) parts of a column parsed by different workers.
+
+    Returns None when the parts were typed in ways that cannot be merged."""
+    known = {col_type for col_type, _ in parts if col_type is not None}
+    if not known:
+        return 'str', [''] * sum(rows for _, rows in parts)
+    if len(parts) == 1:
+        return parts[0]
+    if known == {'int', 'float'}:
+        known = {'float'}
+    if len(known) > 1:
+        return None
+    col_type = known.pop()
+    if col_type == 'int' and any(part_type is None for part_type, _ in parts):
+        col_type = 'float'      # int('') falha: com células vazias a coluna é float
+    if col_type == 'str':
+        return 'str', merge_strings(parts)
+
+    column = new_column(col_type)
+    for part_type, part in parts:
+        if col_type == 'point':
+            if part_type is None:
+                part = PointColumn(lon=array('d', [math.nan]) * part,
+                                   lat=array('d', [math.nan]) * part)
+            column.lon.extend(part.lon)
+            column.lat.extend(part.lat)
+        elif part_type is None:
+            column.extend(array(column.typecode, [IMPORT_MISSING[col_type]]) * part)
+        elif part.typecode != column.typecode:
+            column.fromlist(part.tolist())
+        else:
+            column.extend(part)
+    return col_type, column
+
+
+def merge_strings(parts):
+    """Concatenate string column parts, merging their dictionaries when all are encoded"""
+    parts = [DictColumn([''], array('B', bytes(part))) if part_type is None else part
+             for part_type, part in parts]
+    if not all(isinstance(part, DictColumn) for part in parts):
+        return encode_strings(list(chain.from_iterable(parts)))
+
+    lookup = {}
+    remaps = [[lookup.setdefault(value, len(lookup)) for value in part.values] for part in parts]
+    rows = sum(len(part) for part in parts)
+    if len(lookup) > DICTIONARY_MAX_VALUES or len(lookup) * 2 > rows:
+        return list(chain.from_iterable(parts))
+    codes = array(dictionary_code(len(lookup)))
+    for part, remap in zip(parts, remaps):
+        if codes.typecode == 'B' and part.codes.typecode == 'B':
+            codes.frombytes(part.codes.tobytes().translate(bytes(remap).ljust(256, b'\0')))
+        else:
+            codes.extend(array(codes.typecode, map(remap.__getitem__, part.codes)))
+    return DictColumn(list(lookup), codes)
+
+
+# ==============================================
+# Spilling
+# ==============================================
+
+# Grace hash join partitions are spilled to anonymous temporary files as
+# pickled batches of rows.
+
+SPILL_BATCH = 4096
+DEFAULT_JOIN_PARTITIONS = 16
+MAX_JOIN_PARTITIONS = 256
+MAX_SPILL_DEPTH = 3
+MAX_MERGE_RUNS = 64             # corridas do ORDER BY juntadas de uma vez
+
+
+def estimate_row_bytes(row):
+    """Rough in-memory footprint of a row kept in a hash table"""
+    return (sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+            + 8 * 3)  # entrada na lista do bucket e no dicionário
+
+
+def spill_partitions(rows, key, partitions, depth):
+    """Split rows into temporary files by the hash of their key"""
+    import tempfile  # importado só quando é preciso despejar para disco
+    files = [tempfile.TemporaryFile() for _ in range(partitions)]
+    buffers = [[] for _ in range(partitions)]
+    for row in rows:
+        part = hash((depth, key(row))) % partitions
+        buffer = buffers[part]
+        buffer.append(row)
+        if len(buffer) >= SPILL_BATCH:
+            pickle.dump(buffer, files[part], pickle.HIGHEST_PROTOCOL)
+            buffer.clear()
+    for f, buffer in zip(files, buffers):
+        if buffer:
+            pickle.dump(buffer, f, pickle.HIGHEST_PROTOCOL)
+        f.seek(0)
+    return files
+
+
+def spill_run(items):
+    """Write already sorted items to a temporary file"""
+    import tempfile
+    f = tempfile.TemporaryFile()
+    items = iter(items)
+    while True:
+        batch = list(islice(items, SPILL_BATCH))
+        if not batch:
+            break
+        pickle.dump(batch, f, pickle.HIGHEST_PROTOCOL)
+    f.seek(0)
+    return f
+
+
+def estimate_sort_item_bytes(item):
+    """Rough in-memory footprint of a (key, row or id) pair being sorted"""
+    return sum(estimate_row_bytes(part) if isinstance(part, tuple) else sys.getsizeof(part)
+               for part in item) + sys.getsizeof(item) + 8
+
+
+def read_partition(f):
+    while True:
+        try:
+            batch = pickle.load(f)
+        except EOFError:
+            return
+        yield from batch
+
+
+# ==============================================
+# Memory Limit
+# ==============================================
+
+# With SET MEMORY_LIMIT (or --memory-limit) the approximate heap footprint of
+# all tables is kept under the limit: whenever a table is stored, grows or is
+# read back, the least recently used tables are written to a file in
+# SET SPILL_DIR (or --spill-dir; the current directory by default, as
+# temporary directories are often kept in RAM) in the binary table format.
+# Until it is used again a spilled table is the mapped table LOAD would give,
+# so its pages belong to the file and the kernel can drop them; its index
+# data, zone maps and its copy in the result cache are dropped. The next
+# statement that uses the table (get_table) reads it back into memory and
+# removes the file. Tables mapped by LOAD TABLE are shown apart by SHOW
+# MEMORY and do not count against the limit, for the same reason. Tables
+# that another statement is using (--serve) are skipped.
+
+table_use = OrderedDict()       # nomes das tabelas, da menos para a mais usada
+table_use_lock = threading.Lock()   # leitores concorrentes (--serve) também a atualizam
+memory_stats = {'evictions': 0, 'bytes': 0, 'reloads': 0}
+
+
+def touch_table(table_name):
+    with table_use_lock:
+        table_use[table_name] = None
+        table_use.move_to_end(table_name)
+
+
+def forget_table_use(table_name):
+    with table_use_lock:
+        table_use.pop(table_name, None)
+
+
+def tables_by_use():
+    """Names of the tables from the least to the most recently used"""
+    with table_use_lock:
+        return list(table_use)
+
+
+def enforce_memory_limit(current=None, keep=None):
+    """Spill least recently used tables until they fit in MEMORY_LIMIT.
+
+    current is the table the running statement is writing (spilled last) and
+    keep a table that must stay in memory (the one just read back)."""
+    limit = settings['memory_limit']
+    if not limit:
+        return
+    usage = {name: estimate_table_bytes(table) for name, table in list(tables.items())}
+    total = sum(usage.values())
+    candidates = [name for name in tables_by_use() if name not in (current, keep)]
+    if current is not None:
+        candidates.append(current)
+    for name in candidates:
+        if total <= limit:
+            break
+        if name not in usage or tables.get(name, {}).get('spilled'):
+            continue    # já está em disco (ou foi removida)
+        try:
+            if name == current:
+                spill_table(name)   # a instrução em curso já tem o bloqueio desta tabela
+            else:
+                lock = table_locks.setdefault(name, ReadWriteLock())
+                if not lock.try_acquire_write():
+                    continue
+                try:
+                    spill_table(name)
+                finally:
+                    lock.release_write()
+        except OSError as e:
+            print(f"Aviso: Não foi possível despejar a tabela '{name}' para "
+                  f"'{settings['spill_dir']}': {e}")
+            return
+        total -= usage[name]
+
+
+def spill_table(table_name):
+    """Write a table to a file in SPILL_DIR and keep only its mapped version"""
+    import tempfile
+    table = tables[table_name]
+    size = estimate_table_bytes(table)
+    fd, filename = tempfile.mkstemp(prefix='.cql-spill-', suffix='.cqlb',
+                                    dir=settings['spill_dir'])
+    os.close(fd)
+    try:
+        save_table(table, filename)
+        spilled = load_table(filename)
+    except BaseException:
+        remove_spill_file(filename)
+        raise
+    # Os mapas de zonas estão no cabeçalho do ficheiro: voltam com a tabela
+    spilled.pop('zones', None)
+    spilled['spilled'] = filename
+    if 'sorted_columns' in table:
+        spilled['sorted_columns'] = table['sorted_columns']
+    tables[table_name] = spilled
+    for index in indexes_on(table_name):
+        index['data'] = None
+    uncache_table(table)
+    memory_stats['evictions'] += 1
+    memory_stats['bytes'] += size
+
+
+def reload_table(table_name):
+    """Read a spilled table back into memory and remove its file"""
+    with build_lock:
+        table = tables[table_name]
+        filename = table.get('spilled')
+        if not filename:
+            return table    # outro leitor já a trouxe de volta
+        loaded = load_table(filename)
+        columns = [new_column(t, column) for t, column in zip(loaded['types'], loaded['columns'])]
+        reloaded = dict(loaded, columns=columns, appendable=True)
+        if 'sorted_columns' in table:
+            reloaded['sorted_columns'] = table['sorted_columns']
+        tables[table_name] = reloaded
+        remove_spill_file(filename)
+        memory_stats['reloads'] += 1
+    enforce_memory_limit(keep=table_name)
+    return reloaded
+
+
+def discard_spilled(table):
+    """Remove the file of a spilled table that is dropped or replaced"""
+    if table is not None and table.get('spilled'):
+        remove_spill_file(table['spilled'])
+
+
+def remove_spill_file(filename):
+    try:
+        os.remove(filename)
+    except OSError:
+        pass
+
+
+def remove_spill_files():
+    for table in list(tables.values()):
+        discard_spilled(table)
+
+
+atexit.register(remove_spill_files)
+
+# ==============================================
+# Auxiliary Functions
+# ==============================================
+
+def format_value(value):
+    if isinstance(value, float) and math.isnan(value):
+        return ''
+    return str(value)
+
+
+# Formatting of the column types whose values are not printed as they are
+VALUE_FORMATTERS = {'timestamp': format_timestamp, 'point': format_point}
+
+
+def row_formatter(types):
+    """Function turning a row of the given column types into strings"""
+    if not any(t in VALUE_FORMATTERS for t in types):
+        return lambda row: [format_value(cell) for cell in row]
+    formatters = [VALUE_FORMATTERS.get(t, format_value) for t in types]
+    return lambda row: [f(cell) for f, cell in zip(formatters, row)]
+
+
+def format_condition(cond):
+    if cond['op'] in SPATIAL_ARGUMENTS:
+        return f"{cond['op']}({cond['field']}, {', '.join(map(str, cond['value']))})"
+    return f"{cond['field']} {cond['op']} {cond['value']!r}"
+
+
+def format_ms(seconds):
+    return f"{seconds * 1000:.2f} ms"
+
+
+def format_bytes(size):
+    for unit in ('B', 'KiB', 'MiB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def print_rows(headers, rows, types=None):
+    format_row = row_formatter(types or [None] * len(headers))
+    print("\n" + " | ".join(headers))
+    print("-" * (sum(len(h) for h in headers) + 3 * (len(headers) - 1)))
+    for row in rows:
+        print(" | ".join(format_row(row)))
+    print()
+
+
+COMPARISON_OPS = {'=': '==', '<>': '!=', '>': '>', '<': '<', '>=': '>=', '<=': '<='}
+
+
+def compile_condition(cond, headers, types):
+    """Resolve one condition to (column index, operator, typed literal).
+
+    Returns True/False instead when the outcome does not depend on the row."""
+    field = cond['field']
+    op = cond['op']
+    value = cond['value']
+
+    if op not in COMPARISON_OPS and op not in SPATIAL_ARGUMENTS:
+        raise CQLError(f"Predicado '{op}' desconhecido")
+    if field not in headers:
+        return False
+
+    idx = headers.index(field)
+    if op in SPATIAL_ARGUMENTS:
+        if types[idx] != 'point':
+            raise CQLError(f"{op} requer uma coluna espacial (campo '{field}')")
+        if len(value) != SPATIAL_ARGUMENTS[op]:
+            raise CQLError(f"{op} espera a coluna e {SPATIAL_ARGUMENTS[op]} números")
+        if op == 'NEAREST' and (not isinstance(value[2], int) or value[2] <= 0):
+            raise CQLError("NEAREST requer um número inteiro positivo de vizinhos")
+        return idx, op, tuple(value)
+    if types[idx] == 'point':
+        # Points are only compared for (in)equality with a '[lon,lat]' literal
+        if op not in ('=', '<>'):
+            raise CQLError(f"Operador '{op}' não se aplica à coluna espacial '{field}'")
+        try:
+            value = parse_point(str(value))
+        except ValueError:
+            return op == '<>'
+    elif types[idx] == 'timestamp':
+        # Timestamp columns take ISO-8601 literals (or seconds since the epoch)
+        try:
+            value = value if isinstance(value, (int, float)) else parse_timestamp(value)
+        except ValueError:
+            if op == '=':
+                return False
+            if op == '<>':
+                return True
+            raise CQLError(f"Valor '{value}' inválido para a coluna temporal '{field}'")
+    elif types[idx] in ARRAY_CODES:
+        # Numeric columns are compared with a numeric literal
+        try:
+            value = float(value)
+        except ValueError:
+            if op == '=':
+                return False
+            if op == '<>':
+                return True
+            raise CQLError(f"Valor '{value}' inválido para a coluna numérica '{field}'")
+    elif op in ('=', '<>'):
+        value = str(value)
+    else:
+        raise CQLError(f"Operador '{op}' requer uma coluna numérica (campo '{field}')")
+
+    return idx, COMPARISON_OPS[op], value
+
+
+def compile_conditions(conditions, relation):
+    """Compile a WHERE condition list into one predicate over row ids.
+
+    Column positions and literals are resolved once and the AND chain is
+    generated as a single short-circuiting expression. Returns None when every
+    row matches."""
+    if not conditions:
+        return None
+
+    namespace = {}
+    terms = []
+    for k, cond in enumerate(conditions):
+        compiled = compile_condition(cond, relation['headers'], relation['types'])
+        if compiled is True:
+            continue
+        if compiled is False:
+            return lambda i: False
+        idx, op, value = compiled
+        if op in SPATIAL_ARGUMENTS:
+            terms.append(spatial_term(k, op, value, relation['columns'][idx], namespace))
+            continue
+        column = relation['columns'][idx]
+        if isinstance(column, DictColumn):
+            # = / <> comparam códigos; um valor fora do dicionário decide já
+            code = column.lookup.get(value)
+            if code is None:
+                if op == '==':
+                    return lambda i: False
+                continue
+            namespace[f'c{k}'] = column.codes
+            namespace[f'v{k}'] = code
+            terms.append(f"c{k}[i] {op} v{k}")
+            continue
+        namespace[f'c{k}'] = relation['columns'][idx]
+        namespace[f'v{k}'] = value
+        if relation['types'][idx] == 'timestamp' and op in ('<', '<='):
+            # Os instantes em falta são o menor inteiro: ficam de fora
+            namespace['MISSING'] = MISSING_TIMESTAMP
+            terms.append(f"MISSING < c{k}[i] {op} v{k}")
+        else:
+            terms.append(f"c{k}[i] {op} v{k}")
+
+    if not terms:
+        return None
+    return eval("lambda i: " + " and ".join(terms), namespace)
+
+
+def spatial_term(k, op, args, column, namespace):
+    """Source of the row test of a WITHIN_BBOX / WITHIN_DISTANCE condition"""
+    if op == 'NEAREST':
+        raise CQLError("NEAREST só pode ser aplicado diretamente a uma tabela")
+    namespace[f'x{k}'], namespace[f'y{k}'] = column.lon, column.lat
+    if op == 'WITHIN_BBOX':
+        minlon, minlat, maxlon, maxlat = args
+        return (f"{minlon!r} <= x{k}[i] <= {maxlon!r} and "
+                f"{minlat!r} <= y{k}[i] <= {maxlat!r}")
+    namespace['haversine_km'] = haversine_km
+    lon, lat, km = args
+    return f"haversine_km(x{k}[i], y{k}[i], {lon!r}, {lat!r}) <= {km!r}"
+
+
+def field_name(item):
+    """Column header of a select item (e.g. 'Id' or 'AVG(Temperatura)')"""
+    if isinstance(item, str):
+        return item
+    if 'width' in item:
+        return f"{item['func'].upper()}('{item['width']}', {item['field']})"
+    return f"{item['func'].upper()}({item['field']})"
+
+
+# Sort key of one ORDER BY column, per column type and direction. Missing
+# values (NaN, MISSING_TIMESTAMP, '') sort last in both directions; no string
+# sorts after every other, so text keys are (is missing, value) pairs.
+SORT_KEYS = {
+    ('int', False): '{0}',
+    ('int', True): '-{0}',
+    ('float', False): '(x if (x := {0}) == x else INF)',
+    ('float', True): '(-x if (x := {0}) == x else INF)',
+    ('str', False): "((x := {0}) == '', x)",
+    ('str', True): "((x := {0}) == '', Descending(x))",
+    ('timestamp', False): '(x if (x := {0}) != MISSING else INF)',
+    ('timestamp', True): '(-x if (x := {0}) != MISSING else INF)',
+}
+
+
+def compile_sort_key(order, relation, table_name):
+    """Compile an ORDER BY list into a key function over row ids (or rows)"""
+    headers = relation['headers']
+    namespace = {'INF': math.inf, 'Descending': Descending, 'MISSING': MISSING_TIMESTAMP}
+    if 'rows' in relation:
+        arg, value = 'r', 'r[{}]'.format
+    else:
+        arg, value = 'i', 'c{}[i]'.format
+    parts = []
+    for item in order:
+        name = field_name(item['field'])
+        if name not in headers:
+            raise CQLError(f"Campo '{name}' não encontrado na tabela '{table_name}'")
+        p = headers.index(name)
+        if (relation['types'][p], item['desc']) not in SORT_KEYS:
+            raise CQLError(f"Não é possível ordenar pela coluna espacial '{name}'")
+        if 'columns' in relation:
+            namespace[f'c{p}'] = relation['columns'][p]
+        parts.append(SORT_KEYS[relation['types'][p], item['desc']].format(value(p)))
+
+    if len(parts) == 1:
+        return eval(f"lambda {arg}: {parts[0]}", namespace)
+    return eval(f"lambda {arg}: ({', '.join(parts)})", namespace)
+
+
+# Test that a value is present (not a missing CSV cell), per column type
+PRESENT_TESTS = {'float': '{0} == {0}', 'str': "{0} != ''", 'timestamp': '{0} != MISSING'}
+
+
+def compile_aggregation(relation, keys, aggregates):
+    """Generate the loop of a hash aggregation over a relation.
+
+    keys is a list of (column position, TIME_BUCKET width in seconds or None)
+    and aggregates a list of (function, column position or None for COUNT(*)).
+    Returns (aggregate, initial, results): aggregate(groups) folds every input
+    row into groups {key: accumulator list}, initial is the accumulator of an
+    empty group and results[n](accumulator) gives the value of aggregate n."""
+    types = relation['types']
+    if 'rows' in relation:
+        source, loop, value = relation['rows'], "for r in source:", "r[{}]".format
+    else:
+        source, loop, value = relation['ids'], "for i in source:", "c{}[i]".format
+    namespace = {'source': source, 'NAN': math.nan, 'MISSING': MISSING_TIMESTAMP}
+    if 'columns' in relation:
+        for p, column in enumerate(relation['columns']):
+            namespace[f'c{p}'] = column
+
+    body = []
+    # Os NaN da chave são trocados por um único objeto para caírem todos no
+    # mesmo grupo (NaN != NaN)
+    for n, (p, width) in enumerate(keys):
+        body.append(f"k{n} = {value(p)}")
+        if types[p] == 'float':
+            body.append(f"if k{n} != k{n}: k{n} = NAN")
+        if width:
+            body.append(f"if k{n} != MISSING: k{n} -= k{n} % {width}")
+    if len(keys) == 1:
+        key = "k0"
+    else:
+        key = "(" + "".join(f"k{n}, " for n in range(len(keys))) + ")"
+    body += [f"a = groups.get({key})",
+             "if a is None:",
+             f"    a = groups[{key}] = list(initial)"]
+
+    used = sorted({p for _, p in aggregates if p is not None})
+    body += [f"x{p} = {value(p)}" for p in used]
+
+    initial = []
+    results = []
+    for func, p in aggregates:
+        s = len(initial)
+        if func == 'count':
+            initial.append(0)
+            update = [f"a[{s}] += 1"]
+        elif func == 'sum':
+            initial.append(0 if types[p] == 'int' else 0.0)
+            update = [f"a[{s}] += x{p}"]
+        elif func == 'avg':
+            initial += [0.0, 0]
+            update = [f"a[{s}] += x{p}", f"a[{s + 1}] += 1"]
+        else:
+            op = '<' if func == 'min' else '>'
+            initial.append(None)
+            update = [f"if a[{s}] is None or x{p} {op} a[{s}]:", f"    a[{s}] = x{p}"]
+
+        present = PRESENT_TESTS.get(types[p]) if p is not None else None
+        if present:
+            body.append("if " + present.format(f"x{p}") + ":")
+            body += ["    " + line for line in update]
+        else:
+            body += update
+
+        if func == 'avg':
+            results.append(lambda a, s=s: a[s] / a[s + 1] if a[s + 1] else math.nan)
+        elif func in ('min', 'max'):
+            missing = {'str': '', 'timestamp': MISSING_TIMESTAMP}.get(types[p], math.nan)
+            results.append(lambda a, s=s, missing=missing: a[s] if a[s] is not None else missing)
+        else:
+            results.append(itemgetter(s))
+
+    namespace['initial'] = initial
+    code = "def aggregate(groups):\n    " + loop + "\n" + "".join(
+        f"        {line}\n" for line in body)
+    exec(code, namespace)
+    return namespace['aggregate'], initial, results
+
+# ==============================================
+# Construction of lexer and parser
+# ==============================================
+
+# The LALR tables ship precomputed in lextab.py / parsetab.py and are loaded in
+# optimize mode, so startup neither validates the grammar nor writes files.
+# After changing tokens or grammar rules run `python main.py --build-tables`.
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+lexer = None
+parser = None
+
+
+def get_parser():
+    global lexer, parser
+    if parser is None:
+        lexer = lex.lex(optimize=True, lextab='lextab', outputdir=PACKAGE_DIR)
+        parser = yacc.yacc(optimize=True, debug=False, write_tables=False,
+                           tabmodule='parsetab', outputdir=PACKAGE_DIR)
+    return parser
+
+
+def build_tables():
+    """Regenerate lextab.py and parsetab.py from the rules in this module"""
+    global lexer, parser
+    for module in ('lextab', 'parsetab'):
+        sys.modules.pop(module, None)
+        path = os.path.join(PACKAGE_DIR, module + '.py')
+        if os.path.exists(path):
+            os.remove(path)
+    lexer = lex.lex(optimize=True, lextab='lextab', outputdir=PACKAGE_DIR)
+    parser = yacc.yacc(debug=False, write_tables=True, tabmodule='parsetab',
+                       outputdir=PACKAGE_DIR)
+    print(f"Tabelas do analisador geradas em '{PACKAGE_DIR}'")
+
+
+def statement_complete(text):
+    """Whether the interactive buffer ends a statement (procedures span lines)"""
+    code = re.sub(r'\{-[\s\S]*?-\}|--.*|"[^"\n]*"|\'[^\'\n]*\'', ' ', text)
+    words = re.findall(r'[a-z_][a-z0-9_]*', code.lower())
+    return code.rstrip().endswith(';') and words.count('procedure') <= words.count('end')
+
+# ==============================================
+# Server (--serve)
+# ==============================================
+
+# python main.py [script.fca] --serve HOST:PORT | --serve unix:/path
+#
+# Clients send CQL text line by line; once the buffer holds a complete
+# statement (as in the REPL) it is run and everything it prints is sent
+# back, followed by a line with a single '.' (output lines starting with '.'
+# get an extra '.', as in POP3). All clients share one in-memory catalog.
+# Statements run in a pool of threads; each one first takes the catalog lock
+# (shared, or exclusive for SET / PROCEDURE / CACHE CLEAR) and then the
+# reader/writer locks of the tables it reads and writes, in name order, so
+# queries run side by side and writers wait only for the tables they touch.
+
+DEFAULT_SERVE_THREADS = 8
+EXCLUSIVE_STATEMENTS = ('set_stmt', 'procedure_decl', 'prepare_stmt', 'cache_clear_stmt')
+
+
+class ReadWriteLock:
+    """Many readers or one writer; a waiting writer holds back new readers"""
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.readers = 0
+        self.writer = False
+        self.waiting_writers = 0
+
+    def acquire_read(self):
+        with self.condition:
+            while self.writer or self.waiting_writers:
+                self.condition.wait()
+            self.readers += 1
+
+    def release_read(self):
+        with self.condition:
+            self.readers -= 1
+            if not self.readers:
+                self.condition.notify_all()
+
+    def acquire_write(self):
+        with self.condition:
+            self.waiting_writers += 1
+            while self.writer or self.readers:
+                self.condition.wait()
+            self.waiting_writers -= 1
+            self.writer = True
+
+    def release_write(self):
+        with self.condition:
+            self.writer = False
+            self.condition.notify_all()
+
+    def try_acquire_write(self):
+        """Take the lock for writing only if nobody holds it or waits for it"""
+        with self.condition:
+            if self.writer or self.readers or self.waiting_writers:
+                return False
+            self.writer = True
+            return True
+
+
+catalog_lock = ReadWriteLock()
+table_locks = {}
+parser_lock = threading.Lock()
+
+
+def statement_tables(stmt, called=()):
+    """(tables read, tables written, needs the whole catalog) of a statement"""
+    kind = stmt['type']
+    if kind in EXCLUSIVE_STATEMENTS:
+        return set(), set(), True
+    if kind == 'select_stmt':
+        return {stmt['table']}, set(), False
+    if kind == 'create_select_stmt':
+        reads, writes = {stmt['select']['table']}, {stmt['table']}
+    elif kind == 'create_join_stmt':
+        reads, writes = {stmt['left_table'], stmt['right_table']}, {stmt['new_table']}
+    elif kind in ('export_stmt', 'print_stmt', 'save_stmt'):
+        return {stmt['table']}, set(), False
+    elif kind in ('import_stmt', 'follow_stmt', 'load_stmt', 'discard_stmt',
+                  'create_index_stmt', 'refresh_stmt'):
+        reads, writes = set(), {stmt['table']}
+        if kind == 'refresh_stmt' and stmt['table'] in materialized:
+            reads = set(materialized[stmt['table']]['sources'])
+    elif kind == 'analyze_stmt':
+        # Só as estatísticas mudam: nada a reconstruir
+        return set(), {stmt['table']}, False
+    elif kind == 'rename_stmt':
+        reads, writes = set(), {stmt['old_table'], stmt['new_table']}
+    elif kind == 'explain_stmt':
+        reads, writes, exclusive = statement_tables(stmt['statement'], called)
+        if not stmt['analyze']:
+            return reads | writes, set(), exclusive
+        return reads, writes, exclusive
+    elif kind == 'execute_stmt':
+        statement = prepared.get(stmt['name'])
+        if statement is None:
+            return set(), set(), False
+        return statement_tables(statement.statement, called)
+    elif kind == 'procedure_call':
+        # Uma chamada bloqueia de uma vez tudo o que o procedimento usa
+        procedure = procedures.get(stmt['name'])
+        if procedure is None or stmt['name'] in called:
+            return set(), set(), procedure is not None
+        reads, writes, exclusive = set(), set(), False
+        for body_stmt in procedure.statements:
+            r, w, x = statement_tables(body_stmt, called + (stmt['name'],))
+            reads |= r
+            writes |= w
+            exclusive = exclusive or x
+        return reads, writes, exclusive
+    else:
+        return set(), set(), False
+
+    # Escrever numa tabela pode reconstruir as tabelas materializadas feitas dela
+    pending = list(writes)
+    while pending:
+        name = pending.pop()
+        for definition in list(materialized.values()):
+            if name in definition['sources'] and definition['name'] not in writes:
+                writes.add(definition['name'])
+                reads |= set(definition['sources'])
+                pending.append(definition['name'])
+    return reads, writes, False
+
+
+@contextmanager
+def statement_locks(stmt):
+    """Hold the catalog and table locks a statement needs while it runs"""
+    reads, writes, exclusive = statement_tables(stmt)
+    if exclusive:
+        catalog_lock.acquire_write()
+        try:
+            yield
+        finally:
+            catalog_lock.release_write()
+        return
+
+    catalog_lock.acquire_read()
+    held = []
+    try:
+        for name in sorted(reads | writes):
+            lock = table_locks.setdefault(name, ReadWriteLock())
+            if name in writes:
+                lock.acquire_write()
+                held.append(lock.release_write)
+            else:
+                lock.acquire_read()
+                held.append(lock.release_read)
+        yield
+    finally:
+        for release in reversed(held):
+            release()
+        catalog_lock.release_read()
+
+
+class ThreadOutput:
+    """sys.stdout replacement sending each thread's prints to its own buffer"""
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def write(self, text):
+        buffer = getattr(self.local, 'buffer', None)
+        return (buffer or self.stream).write(text)
+
+    def flush(self):
+        if getattr(self.local, 'buffer', None) is None:
+            self.stream.flush()
+
+    @contextmanager
+    def capture(self):
+        self.local.buffer = io.StringIO()
+        try:
+            yield self.local.buffer
+        finally:
+            self.local.buffer = None
+
+
+def serve_request(output, source):
+    """Run a client's CQL text in a worker thread and return what it printed"""
+    with output.capture() as buffer:
+        try:
+            with parser_lock:
+                statements = parse_source(source)
+            for stmt in statements:
+                with statement_locks(stmt):
+                    execute_statement(stmt)
+        except Exception as e:
+            print(f"Erro: {e}")
+        return buffer.getvalue()
+
+
+def frame_response(text):
+    lines = text.splitlines()
+    return ''.join(('.' + line if line.startswith('.') else line) + '\n' for line in lines) + '.\n'
+
+
+async def handle_client(reader, writer, output, pool):
+    import asyncio
+    loop = asyncio.get_running_loop()
+    buffer = ''
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            text = line.decode('utf-8', 'replace')
+            if not buffer and text.strip().lower() == 'sair':
+                break
+            buffer += text
+            if not statement_complete(buffer):
+                continue
+            source, buffer = buffer, ''
+            result = await loop.run_in_executor(pool, serve_request, output, source)
+            writer.write(frame_response(result).encode('utf-8'))
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+def serve(address, threads):
+    """Serve the catalog on a TCP address (HOST:PORT) or a Unix socket (unix:PATH)"""
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    output = ThreadOutput(sys.stdout)
+    sys.stdout = output
+    pool = ThreadPoolExecutor(threads, thread_name_prefix='cql')
+    get_parser()
+
+    async def run():
+        handler = lambda reader, writer: handle_client(reader, writer, output, pool)
+        if address.startswith('unix:'):
+            server = await asyncio.start_unix_server(handler, path=address[len('unix:'):])
+        else:
+            host, _, port = address.rpartition(':')
+            server = await asyncio.start_server(handler, host or '127.0.0.1', int(port))
+        print(f"A servir em {address} ({threads} threads). Ctrl+C para terminar.")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("Servidor terminado")
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        sys.stdout = output.stream
+
+# ==============================================
+# UI
+# ==============================================
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Interpretador CQL (Comma Query Language)")
+    arg_parser.add_argument('file', nargs='?', help="script .fca a executar")
+    arg_parser.add_argument('--workers', type=int, default=1, metavar='N',
+                            help="processos usados em scans e JOINs paralelos")
+    arg_parser.add_argument('--build-tables', action='store_true',
+                            help="regenerar lextab.py/parsetab.py depois de alterar a gramática")
+    arg_parser.add_argument('--serve', metavar='ENDEREÇO',
+                            help="servir o catálogo em HOST:PORTA ou unix:CAMINHO "
+                                 "(depois de executar o script, se houver)")
+    arg_parser.add_argument('--threads', type=int, default=DEFAULT_SERVE_THREADS, metavar='N',
+                            help="threads que executam as instruções no modo --serve")
+    arg_parser.add_argument('--memory-limit', metavar='TAMANHO',
+                            help="memória para tabelas (ex.: 4G); as menos usadas vão para disco")
+    arg_parser.add_argument('--spill-dir', metavar='DIRETÓRIO',
+                            help="onde escrever as tabelas despejadas (por omissão o diretório atual)")
+    args = arg_parser.parse_args()
+
+    if args.build_tables:
+        build_tables()
+        return
+
+    print("Interpretador CQL (Comma Query Language)")
+    try:
+        settings['parallelism'] = parse_positive_int('--workers', args.workers)
+        threads = parse_positive_int('--threads', args.threads)
+        if args.memory_limit is not None:
+            settings['memory_limit'] = parse_size(args.memory_limit)
+        if args.spill_dir is not None:
+            settings['spill_dir'] = parse_directory(args.spill_dir)
+    except CQLError as e:
+        print(f"Erro: {e}")
+        return
+
+    if args.file:
+        filename = args.file
+        
+        if not filename.endswith('.fca'):
+            print("Erro: O ficheiro deve ter extensão .fca")
+            return
+        
+        if not os.path.exists(filename):
+            print(f"Erro: Ficheiro '{filename}' não encontrado")
+            return
+        
+        try:
+            with open(filename, 'r') as f:
+                content = f.read()
+            run_source(content)
+        except Exception as e:
+            print("Erro ao ler o ficheiro:")
+            traceback.print_exc()
+
+    if args.serve:
+        serve(args.serve, threads)
+    elif not args.file:
         print("Modo interativo. Escreva 'sair' para encerrar o programa.")
-        parser.source_code = ""  # Initialize source code buffer for interactive mode
+        buffer = ''
         while True:
             try:
-                text = input('CQL> ')
-                if text.lower() == 'sair':
+                text = input('CQL> ' if not buffer else '...> ')
+                if not buffer and text.strip().lower() == 'sair':
                     break
-                parser.source_code += text + "\n"  # Append to source buffer
-                commands = [cmd.strip() for cmd in text.split(';') if cmd.strip()]
-                for cmd in commands:
-                    parser.parse(cmd + ';')
+                buffer += text + '\n'
+                # Uma instrução (ou um PROCEDURE inteiro) pode ocupar várias linhas
+                if statement_complete(buffer):
+                    source, buffer = buffer, ''
+                    run_source(source)
             except EOFError:
                 break
             except Exception as e:
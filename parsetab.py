@@ -0,0 +1,138 @@
+
+# parsetab.py
+# This file is automatically generated. Do not edit.
+# pylint: disable=W,C,R
+_tabversion = '3.10'
+
+_lr_method = 'LALR'
+
+_lr_signature = 'ANALYZE AND APPEND AS ASC BY CACHE CALL CLEAR COMMA CREATE DESC DISCARD DO END EQUALS EXECUTE EXPLAIN EXPORT FOLLOW FROM GREATER GREATER_EQ GRID GROUP HASH IDENTIFIER IMPORT INDEX INTO JOIN LESS LESS_EQ LIMIT LOAD LPAREN MATERIALIZED MEMORY MINUS NOT_EQUALS NUMBER ON ORDER PREPARE PRINT PROCEDURE QUESTION REFRESH RENAME RPAREN SAVE SELECT SEMICOLON SET SHOW SORTED STAR STATS STRING TABLE USING WHEREprogram : statement\n               | program statementstatements : statement\n                 | statements statementstatement : import_stmt SEMICOLON\n                | follow_stmt SEMICOLON\n                | export_stmt SEMICOLON\n                | save_stmt SEMICOLON\n                | load_stmt SEMICOLON\n                | discard_stmt SEMICOLON\n                | rename_stmt SEMICOLON\n                | print_stmt SEMICOLON\n                | select_stmt SEMICOLON\n                | create_select_stmt SEMICOLON\n                | create_join_stmt SEMICOLON\n                | create_index_stmt SEMICOLON\n                | refresh_stmt SEMICOLON\n                | analyze_stmt SEMICOLON\n                | set_stmt SEMICOLON\n                | cache_stmt SEMICOLON\n                | show_memory_stmt SEMICOLON\n                | explain_stmt SEMICOLON\n                | prepare_stmt SEMICOLON\n                | execute_stmt SEMICOLON\n                | procedure_decl SEMICOLON\n                | procedure_call SEMICOLON\n                | error SEMICOLONimport_stmt : IMPORT TABLE IDENTIFIER FROM STRING\n                  | IMPORT INTO IDENTIFIER FROM STRING APPENDfollow_stmt : FOLLOW TABLE IDENTIFIER FROM STRINGexport_stmt : EXPORT TABLE IDENTIFIER AS STRINGsave_stmt : SAVE TABLE IDENTIFIER AS STRINGload_stmt : LOAD TABLE IDENTIFIER FROM STRINGdiscard_stmt : DISCARD TABLE IDENTIFIERrename_stmt : RENAME TABLE IDENTIFIER IDENTIFIERprint_stmt : PRINT TABLE IDENTIFIERselect_stmt : SELECT select_fields FROM IDENTIFIER where_clause group_clause order_clause limit_clauseselect_fields : STAR\n                    | select_listselect_list : select_item\n                  | select_list COMMA select_itemselect_item : IDENTIFIER\n                  | IDENTIFIER LPAREN STAR RPAREN\n                  | IDENTIFIER LPAREN IDENTIFIER RPAREN\n                  | IDENTIFIER LPAREN STRING COMMA IDENTIFIER RPARENfield_list : IDENTIFIER\n                 | field_list COMMA IDENTIFIERwhere_clause : WHERE condition_list\n                   | emptycondition_list : condition\n                     | condition_list AND conditioncondition : IDENTIFIER GREATER value\n                 | IDENTIFIER LESS value\n                 | IDENTIFIER GREATER_EQ value\n                 | IDENTIFIER LESS_EQ value\n                 | IDENTIFIER EQUALS value\n                 | IDENTIFIER NOT_EQUALS valuecondition : IDENTIFIER LPAREN IDENTIFIER COMMA number_list RPARENnumber_list : signed_number\n                  | number_list COMMA signed_numbervalue : STRING\n            | signed_numbervalue : QUESTION\n            | IDENTIFIERvalue_list : value\n                 | value_list COMMA valuesigned_number : NUMBER\n                    | MINUS NUMBERgroup_clause : GROUP BY select_list\n                   | emptyorder_clause : ORDER BY order_list\n                   | emptyorder_list : order_item\n                 | order_list COMMA order_itemorder_item : select_item\n                 | select_item ASC\n                 | select_item DESClimit_clause : LIMIT NUMBER\n                   | emptycreate_select_stmt : create_table IDENTIFIER select_stmtcreate_join_stmt : create_table IDENTIFIER FROM IDENTIFIER JOIN IDENTIFIER USING LPAREN field_list RPARENcreate_table : CREATE TABLE\n                   | CREATE MATERIALIZED TABLErefresh_stmt : REFRESH TABLE IDENTIFIERcreate_index_stmt : CREATE INDEX IDENTIFIER ON IDENTIFIER LPAREN IDENTIFIER RPAREN index_usingindex_using : USING HASH\n                  | USING SORTED\n                  | USING GRID\n                  | emptyanalyze_stmt : ANALYZE TABLE IDENTIFIERset_stmt : SET IDENTIFIER valuecache_stmt : CACHE STATS\n                 | CACHE CLEARshow_memory_stmt : SHOW MEMORYexplain_stmt : EXPLAIN explainable_stmt\n                   | EXPLAIN ANALYZE explainable_stmtexplainable_stmt : select_stmt\n                       | create_select_stmt\n                       | create_join_stmt\n                       | import_stmtprocedure_decl : PROCEDURE IDENTIFIER DO statements END\n                     | PROCEDURE IDENTIFIER LPAREN field_list RPAREN DO statements ENDprocedure_call : CALL IDENTIFIER\n                     | CALL IDENTIFIER LPAREN value_list RPARENprepare_stmt : PREPARE IDENTIFIER AS explainable_stmtexecute_stmt : EXECUTE IDENTIFIER\n                   | EXECUTE IDENTIFIER LPAREN value_list RPARENempty :'
+    
+_lr_action_items = {'error':([0,1,2,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,70,134,155,156,177,192,209,],[25,25,-1,-2,-5,-6,-7,-8,-9,-10,-11,-12,-13,-14,-15,-16,-17,-18,-19,-20,-21,-22,-23,-24,-25,-26,-27,25,25,-3,-4,25,25,]),'IMPORT':([0,1,2,42,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,70,96,132,134,155,156,177,192,209,],[26,26,-1,26,-2,-5,-6,-7,-8,-9,-10,-11,-12,-13,-14,-15,-16,-17,-18,-19,-20,-21,-22,-23,-24,-25,-26,-27,26,26,26,26,-3,-4,26,26,]),'FOLLOW':([0,1,2,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,70,134,155,156,177,192,209,],[27,27,-1,-2,-5,-6,-7,-8,-9,-10,-11,-12,-13,-14,-15,-16,-17,-18,-19,-20,-21,-22,-23,-24,-25,-26,-27,27,27,-3,-4,27,27,]),'EXPORT':([0,1,2,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,70,134,155,156,177,192,209,],[28,28,-1,-2,-5,-6,-7,-8,-9,-10,-11,-12,-13,-14,-15,-16,-17,-18,-19,-20,-21,-22,-23,-24,-25,-26,-27,28,28,-3,-4,28,28,]),'SAVE':([0,1,2,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,70,134,155,156,177,192,209,],[29,29,-1,-2,-5,-6,-7,-8,-9,-10,-11,-12,-13,-14,-15,-16,-17,-18,-19,-20,-21,-22,-23,-24,-25,-26,-27,29,29,-3,-4,29,29,]),'LOAD':([0,1,2,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,70,134,155,156,177,192,209,],[30,30,-1,-2,-5,-6,-7,-8,-9,-10,-11,-12,-13,-14,-15,-16,-17,-18,-19,-20,-21,-22,-23,-24,-25,-26,-27,30,30,-3,-4,30,30,]),'DISCARD':([0,1,2,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,70,134,155,156,177,192,209,],[31,31,-1,-2,-5,-6,-7,-8,-9,-10,-11,-12,-13,-14,-15,-16,-17,-18,-19,-20,-21,-22,-23,-24,-25,-26,-27,31,31,-3,-4,31,31,]),'RENAME':([0,1,2,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,70,134,155,156,177,192,209,],[32,32,-1,-2,-5,-6,-7,-8,-9,-10,-11,-12,-13,-14,-15,-16,-17,-18,-19,-20,-21,-22,-23,-24,-25,-26,-27,32,32,-3,-4,32,32,]),'PRINT':([0,1,2,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,70,134,155,156,177,192,209,],[33,33,-1,-2,-5,-6,-7,-8,-9,-10,-11,-12,-13,-14,-15,-16,-17,-18,-19,-20,-21,-22,-23,-24,-25,-26,-27,33,33,-3,-4,33,33,]),'SELECT':([0,1,2,42,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,70,85,96,132,134,155,156,177,192,209,],[34,34,-1,34,-2,-5,-6,-7,-8,-9,-10,-11,-12,-13,-14,-15,-16,-17,-18,-19,-20,-21,-22,-23,-24,-25,-26,-27,34,34,34,34,34,-3,-4,34,34,]),'CREATE':([0,1,2,42,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,70,96,132,134,155,156,177,192,209,],[36,36,-1,101,-2,-5,-6,-7,-8,-9,-10,-11,-12,-13,-14,-15,-16,-17,-18,-19,-20,-21,-22,-23,-24,-25,-26,-27,101,101,36,36,-3,-4,36,36,]),'REFRESH':([0,1,2,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,70,134,155,156,177,192,209,],[37,37,-1,-2,-5,-6,-7,-8,-9,-10,-11,-12,-13,-14,-15,-16,-17,-18,-19,-20,-21,-22,-23,-24,-25,-26,-27,37,37,-3,-4,37,37,]),'ANALYZE':([0,1,2,42,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,70,134,155,156,177,192,209,],[38,38,-1,96,-2,-5,-6,-7,-8,-9,-10,-11,-12,-13,-14,-15,-16,-17,-18,-19,-20,-21,-22,-23,-24,-25,-26,-27,38,38,-3,-4,38,38,]),'SET':([0,1,2,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,70,134,155,156,177,192,209,],[39,39,-1,-2,-5,-6,-7,-8,-9,-10,-11,-12,-13,-14,-15,-16,-17,-18,-19,-20,-21,-22,-23,-24,-25,-26,-27,39,39,-3,-4,39,39,]),'CACHE':([0,1,2,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,70,134,155,156,177,192,209,],[40,40,-1,-2,-5,-6,-7,-8,-9,-10,-11,-12,-13,-14,-15,-16,-17,-18,-19,-20,-21,-22,-23,-24,-25,-26,-27,40,40,-3,-4,40,40,]),'SHOW':([0,1,2,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,70,134,155,156,177,192,209,],[41,41,-1,-2,-5,-6,-7,-8,-9,-10,-11,-12,-13,-14,-15,-16,-17,-18,-19,-20,-21,-22,-23,-24,-25,-26,-27,41,41,-3,-4,41,41,]),'EXPLAIN':([0,1,2,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,70,134,155,156,177,192,209,],[42,42,-1,-2,-5,-6,-7,-8,-9,-10,-11,-12,-13,-14,-15,-16,-17,-18,-19,-20,-21,-22,-23,-24,-25,-26,-27,42,42,-3,-4,42,42,]),'PREPARE':([0,1,2,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,70,134,155,156,177,192,209,],[43,43,-1,-2,-5,-6,-7,-8,-9,-10,-11,-12,-13,-14,-15,-16,-17,-18,-19,-20,-21,-22,-23,-24,-25,-26,-27,43,43,-3,-4,43,43,]),'EXECUTE':([0,1,2,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,70,134,155,156,177,192,209,],[44,44,-1,-2,-5,-6,-7,-8,-9,-10,-11,-12,-13,-14,-15,-16,-17,-18,-19,-20,-21,-22,-23,-24,-25,-26,-27,44,44,-3,-4,44,44,]),'PROCEDURE':([0,1,2,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,70,134,155,156,177,192,209,],[45,45,-1,-2,-5,-6,-7,-8,-9,-10,-11,-12,-13,-14,-15,-16,-17,-18,-19,-20,-21,-22,-23,-24,-25,-26,-27,45,45,-3,-4,45,45,]),'CALL':([0,1,2,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,70,134,155,156,177,192,209,],[46,46,-1,-2,-5,-6,-7,-8,-9,-10,-11,-12,-13,-14,-15,-16,-17,-18,-19,-20,-21,-22,-23,-24,-25,-26,-27,46,46,-3,-4,46,46,]),'$end':([1,2,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,70,],[0,-1,-2,-5,-6,-7,-8,-9,-10,-11,-12,-13,-14,-15,-16,-17,-18,-19,-20,-21,-22,-23,-24,-25,-26,-27,]),'SEMICOLON':([3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,81,84,92,93,94,95,97,98,99,100,103,105,112,114,118,122,123,124,125,126,127,128,129,131,143,144,148,151,152,160,162,163,164,165,166,168,169,170,174,176,180,181,182,184,185,186,194,196,206,210,212,214,215,216,217,218,219,220,221,224,225,226,227,228,229,232,234,236,237,240,241,242,243,244,246,],[48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,70,-42,-40,-92,-93,-94,-95,-97,-98,-99,-100,-106,-103,-34,-36,-80,-84,-90,-64,-91,-61,-62,-63,-67,-96,-35,-108,-41,-68,-105,-28,-30,-31,-32,-33,-108,-49,-44,-43,-107,-101,-104,-29,-108,-70,-48,-50,-108,-72,-45,-37,-79,-69,-51,-52,-53,-54,-55,-56,-57,-108,-102,-78,-71,-73,-75,-85,-89,-76,-77,-81,-86,-87,-88,-74,-58,]),'TABLE':([26,27,28,29,30,31,32,33,36,37,38,88,101,],[71,73,74,75,76,77,78,79,87,89,90,121,87,]),'INTO':([26,],[72,]),'STAR':([34,116,],[82,146,]),'IDENTIFIER':([34,35,39,43,44,45,46,71,72,73,74,75,76,77,78,79,86,87,89,90,91,113,115,116,117,119,121,133,135,136,150,167,171,172,175,179,190,197,198,199,200,201,202,203,204,205,213,223,235,],[81,85,91,102,103,104,105,106,107,108,109,110,111,112,113,114,120,-82,122,123,124,143,144,145,81,149,-83,124,157,124,173,187,188,189,124,193,208,81,187,124,124,124,124,124,124,222,81,157,81,]),'INDEX':([36,],[86,]),'MATERIALIZED':([36,101,],[88,88,]),'STATS':([40,],[92,]),'CLEAR':([40,],[93,]),'MEMORY':([41,],[94,]),'END':([48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,70,155,156,177,209,],[-5,-6,-7,-8,-9,-10,-11,-12,-13,-14,-15,-16,-17,-18,-19,-20,-21,-22,-23,-24,-25,-26,-27,176,-3,-4,225,]),'FROM':([80,81,82,83,84,85,106,107,108,111,148,169,170,206,],[115,-42,-38,-39,-40,119,137,138,139,142,-41,-44,-43,-45,]),'COMMA':([81,83,84,124,126,127,128,129,147,148,151,153,154,157,158,159,169,170,191,193,206,214,222,227,228,229,231,236,237,238,239,244,247,],[-42,117,-40,-64,-61,-62,-63,-67,171,-41,-68,175,-65,-46,179,175,-44,-43,-66,-47,-45,117,230,235,-73,-75,179,-76,-77,245,-59,-74,-60,]),'ORDER':([81,84,124,126,127,128,129,144,148,151,166,168,169,170,182,184,185,186,206,214,215,216,217,218,219,220,221,246,],[-42,-40,-64,-61,-62,-63,-67,-108,-41,-68,-108,-49,-44,-43,195,-70,-48,-50,-45,-69,-51,-52,-53,-54,-55,-56,-57,-58,]),'LIMIT':([81,84,124,126,127,128,129,144,148,151,166,168,169,170,182,184,185,186,194,196,206,214,215,216,217,218,219,220,221,227,228,229,236,237,244,246,],[-42,-40,-64,-61,-62,-63,-67,-108,-41,-68,-108,-49,-44,-43,-108,-70,-48,-50,211,-72,-45,-69,-51,-52,-53,-54,-55,-56,-57,-71,-73,-75,-76,-77,-74,-58,]),'ASC':([81,169,170,206,229,],[-42,-44,-43,-45,236,]),'DESC':([81,169,170,206,229,],[-42,-44,-43,-45,237,]),'LPAREN':([81,103,104,105,173,187,207,],[116,133,135,136,190,205,223,]),'STRING':([91,116,133,136,137,138,139,140,141,142,175,199,200,201,202,203,204,],[126,147,126,126,160,161,162,163,164,165,126,126,126,126,126,126,126,]),'QUESTION':([91,133,136,175,199,200,201,202,203,204,],[128,128,128,128,128,128,128,128,128,128,]),'NUMBER':([91,130,133,136,175,199,200,201,202,203,204,211,230,245,],[129,151,129,129,129,129,129,129,129,129,129,226,129,129,]),'MINUS':([91,133,136,175,199,200,201,202,203,204,230,245,],[130,130,130,130,130,130,130,130,130,130,130,130,]),'AS':([102,109,110,],[132,140,141,]),'DO':([104,178,],[134,192,]),'ON':([120,],[150,]),'RPAREN':([124,126,127,128,129,145,146,151,153,154,157,158,159,188,191,193,208,231,238,239,247,],[-64,-61,-62,-63,-67,169,170,-68,174,-65,-46,178,180,206,-66,-47,224,240,246,-59,-60,]),'AND':([124,126,127,128,129,151,185,186,215,216,217,218,219,220,221,246,],[-64,-61,-62,-63,-67,-68,198,-50,-51,-52,-53,-54,-55,-56,-57,-58,]),'GROUP':([124,126,127,128,129,144,151,166,168,185,186,215,216,217,218,219,220,221,246,],[-64,-61,-62,-63,-67,-108,-68,183,-49,-48,-50,-51,-52,-53,-54,-55,-56,-57,-58,]),'WHERE':([144,],[167,]),'JOIN':([149,],[172,]),'APPEND':([161,],[181,]),'BY':([183,195,],[197,213,]),'GREATER':([187,],[199,]),'LESS':([187,],[200,]),'GREATER_EQ':([187,],[201,]),'LESS_EQ':([187,],[202,]),'EQUALS':([187,],[203,]),'NOT_EQUALS':([187,],[204,]),'USING':([189,224,],[207,233,]),'HASH':([233,],[241,]),'SORTED':([233,],[242,]),'GRID':([233,],[243,]),}
+
+_lr_action = {}
+for _k, _v in _lr_action_items.items():
+   for _x,_y in zip(_v[0],_v[1]):
+      if not _x in _lr_action:  _lr_action[_x] = {}
+      _lr_action[_x][_k] = _y
+del _lr_action_items
+
+_lr_goto_items = {'program':([0,],[1,]),'statement':([0,1,134,155,192,209,],[2,47,156,177,156,177,]),'import_stmt':([0,1,42,96,132,134,155,192,209,],[3,3,100,100,100,3,3,3,3,]),'follow_stmt':([0,1,134,155,192,209,],[4,4,4,4,4,4,]),'export_stmt':([0,1,134,155,192,209,],[5,5,5,5,5,5,]),'save_stmt':([0,1,134,155,192,209,],[6,6,6,6,6,6,]),'load_stmt':([0,1,134,155,192,209,],[7,7,7,7,7,7,]),'discard_stmt':([0,1,134,155,192,209,],[8,8,8,8,8,8,]),'rename_stmt':([0,1,134,155,192,209,],[9,9,9,9,9,9,]),'print_stmt':([0,1,134,155,192,209,],[10,10,10,10,10,10,]),'select_stmt':([0,1,42,85,96,132,134,155,192,209,],[11,11,97,118,97,97,11,11,11,11,]),'create_select_stmt':([0,1,42,96,132,134,155,192,209,],[12,12,98,98,98,12,12,12,12,]),'create_join_stmt':([0,1,42,96,132,134,155,192,209,],[13,13,99,99,99,13,13,13,13,]),'create_index_stmt':([0,1,134,155,192,209,],[14,14,14,14,14,14,]),'refresh_stmt':([0,1,134,155,192,209,],[15,15,15,15,15,15,]),'analyze_stmt':([0,1,134,155,192,209,],[16,16,16,16,16,16,]),'set_stmt':([0,1,134,155,192,209,],[17,17,17,17,17,17,]),'cache_stmt':([0,1,134,155,192,209,],[18,18,18,18,18,18,]),'show_memory_stmt':([0,1,134,155,192,209,],[19,19,19,19,19,19,]),'explain_stmt':([0,1,134,155,192,209,],[20,20,20,20,20,20,]),'prepare_stmt':([0,1,134,155,192,209,],[21,21,21,21,21,21,]),'execute_stmt':([0,1,134,155,192,209,],[22,22,22,22,22,22,]),'procedure_decl':([0,1,134,155,192,209,],[23,23,23,23,23,23,]),'procedure_call':([0,1,134,155,192,209,],[24,24,24,24,24,24,]),'create_table':([0,1,42,96,132,134,155,192,209,],[35,35,35,35,35,35,35,35,35,]),'select_fields':([34,],[80,]),'select_list':([34,197,],[83,214,]),'select_item':([34,117,197,213,235,],[84,148,84,229,229,]),'explainable_stmt':([42,96,132,],[95,131,152,]),'value':([91,133,136,175,199,200,201,202,203,204,],[125,154,154,191,216,217,218,219,220,221,]),'signed_number':([91,133,136,175,199,200,201,202,203,204,230,245,],[127,127,127,127,127,127,127,127,127,127,239,247,]),'value_list':([133,136,],[153,159,]),'statements':([134,192,],[155,209,]),'field_list':([135,223,],[158,231,]),'where_clause':([144,],[166,]),'empty':([144,166,182,194,224,],[168,184,196,212,234,]),'group_clause':([166,],[182,]),'condition_list':([167,],[185,]),'condition':([167,198,],[186,215,]),'order_clause':([182,],[194,]),'limit_clause':([194,],[210,]),'order_list':([213,],[227,]),'order_item':([213,235,],[228,244,]),'index_using':([224,],[232,]),'number_list':([230,],[238,]),}
+
+_lr_goto = {}
+for _k, _v in _lr_goto_items.items():
+   for _x, _y in zip(_v[0], _v[1]):
+       if not _x in _lr_goto: _lr_goto[_x] = {}
+       _lr_goto[_x][_k] = _y
+del _lr_goto_items
+_lr_productions = [
+  ("S' -> program","S'",1,None,None,None),
+  ('program -> statement','program',1,'p_program','main.py',159),
+  ('program -> program statement','program',2,'p_program','main.py',160),
+  ('statements -> statement','statements',1,'p_statements','main.py',168),
+  ('statements -> statements statement','statements',2,'p_statements','main.py',169),
+  ('statement -> import_stmt SEMICOLON','statement',2,'p_statement','main.py',176),
+  ('statement -> follow_stmt SEMICOLON','statement',2,'p_statement','main.py',177),
+  ('statement -> export_stmt SEMICOLON','statement',2,'p_statement','main.py',178),
+  ('statement -> save_stmt SEMICOLON','statement',2,'p_statement','main.py',179),
+  ('statement -> load_stmt SEMICOLON','statement',2,'p_statement','main.py',180),
+  ('statement -> discard_stmt SEMICOLON','statement',2,'p_statement','main.py',181),
+  ('statement -> rename_stmt SEMICOLON','statement',2,'p_statement','main.py',182),
+  ('statement -> print_stmt SEMICOLON','statement',2,'p_statement','main.py',183),
+  ('statement -> select_stmt SEMICOLON','statement',2,'p_statement','main.py',184),
+  ('statement -> create_select_stmt SEMICOLON','statement',2,'p_statement','main.py',185),
+  ('statement -> create_join_stmt SEMICOLON','statement',2,'p_statement','main.py',186),
+  ('statement -> create_index_stmt SEMICOLON','statement',2,'p_statement','main.py',187),
+  ('statement -> refresh_stmt SEMICOLON','statement',2,'p_statement','main.py',188),
+  ('statement -> analyze_stmt SEMICOLON','statement',2,'p_statement','main.py',189),
+  ('statement -> set_stmt SEMICOLON','statement',2,'p_statement','main.py',190),
+  ('statement -> cache_stmt SEMICOLON','statement',2,'p_statement','main.py',191),
+  ('statement -> show_memory_stmt SEMICOLON','statement',2,'p_statement','main.py',192),
+  ('statement -> explain_stmt SEMICOLON','statement',2,'p_statement','main.py',193),
+  ('statement -> prepare_stmt SEMICOLON','statement',2,'p_statement','main.py',194),
+  ('statement -> execute_stmt SEMICOLON','statement',2,'p_statement','main.py',195),
+  ('statement -> procedure_decl SEMICOLON','statement',2,'p_statement','main.py',196),
+  ('statement -> procedure_call SEMICOLON','statement',2,'p_statement','main.py',197),
+  ('statement -> error SEMICOLON','statement',2,'p_statement','main.py',198),
+  ('import_stmt -> IMPORT TABLE IDENTIFIER FROM STRING','import_stmt',5,'p_import_stmt','main.py',205),
+  ('import_stmt -> IMPORT INTO IDENTIFIER FROM STRING APPEND','import_stmt',6,'p_import_stmt','main.py',206),
+  ('follow_stmt -> FOLLOW TABLE IDENTIFIER FROM STRING','follow_stmt',5,'p_follow_stmt','main.py',211),
+  ('export_stmt -> EXPORT TABLE IDENTIFIER AS STRING','export_stmt',5,'p_export_stmt','main.py',216),
+  ('save_stmt -> SAVE TABLE IDENTIFIER AS STRING','save_stmt',5,'p_save_stmt','main.py',221),
+  ('load_stmt -> LOAD TABLE IDENTIFIER FROM STRING','load_stmt',5,'p_load_stmt','main.py',226),
+  ('discard_stmt -> DISCARD TABLE IDENTIFIER','discard_stmt',3,'p_discard_stmt','main.py',231),
+  ('rename_stmt -> RENAME TABLE IDENTIFIER IDENTIFIER','rename_stmt',4,'p_rename_stmt','main.py',236),
+  ('print_stmt -> PRINT TABLE IDENTIFIER','print_stmt',3,'p_print_stmt','main.py',241),
+  ('select_stmt -> SELECT select_fields FROM IDENTIFIER where_clause group_clause order_clause limit_clause','select_stmt',8,'p_select_stmt','main.py',245),
+  ('select_fields -> STAR','select_fields',1,'p_select_fields','main.py',258),
+  ('select_fields -> select_list','select_fields',1,'p_select_fields','main.py',259),
+  ('select_list -> select_item','select_list',1,'p_select_list','main.py',266),
+  ('select_list -> select_list COMMA select_item','select_list',3,'p_select_list','main.py',267),
+  ('select_item -> IDENTIFIER','select_item',1,'p_select_item','main.py',276),
+  ('select_item -> IDENTIFIER LPAREN STAR RPAREN','select_item',4,'p_select_item','main.py',277),
+  ('select_item -> IDENTIFIER LPAREN IDENTIFIER RPAREN','select_item',4,'p_select_item','main.py',278),
+  ('select_item -> IDENTIFIER LPAREN STRING COMMA IDENTIFIER RPAREN','select_item',6,'p_select_item','main.py',279),
+  ('field_list -> IDENTIFIER','field_list',1,'p_field_list','main.py',288),
+  ('field_list -> field_list COMMA IDENTIFIER','field_list',3,'p_field_list','main.py',289),
+  ('where_clause -> WHERE condition_list','where_clause',2,'p_where_clause','main.py',296),
+  ('where_clause -> empty','where_clause',1,'p_where_clause','main.py',297),
+  ('condition_list -> condition','condition_list',1,'p_condition_list','main.py',304),
+  ('condition_list -> condition_list AND condition','condition_list',3,'p_condition_list','main.py',305),
+  ('condition -> IDENTIFIER GREATER value','condition',3,'p_condition','main.py',312),
+  ('condition -> IDENTIFIER LESS value','condition',3,'p_condition','main.py',313),
+  ('condition -> IDENTIFIER GREATER_EQ value','condition',3,'p_condition','main.py',314),
+  ('condition -> IDENTIFIER LESS_EQ value','condition',3,'p_condition','main.py',315),
+  ('condition -> IDENTIFIER EQUALS value','condition',3,'p_condition','main.py',316),
+  ('condition -> IDENTIFIER NOT_EQUALS value','condition',3,'p_condition','main.py',317),
+  ('condition -> IDENTIFIER LPAREN IDENTIFIER COMMA number_list RPAREN','condition',6,'p_condition_spatial','main.py',323),
+  ('number_list -> signed_number','number_list',1,'p_number_list','main.py',327),
+  ('number_list -> number_list COMMA signed_number','number_list',3,'p_number_list','main.py',328),
+  ('value -> STRING','value',1,'p_value','main.py',335),
+  ('value -> signed_number','value',1,'p_value','main.py',336),
+  ('value -> QUESTION','value',1,'p_value_parameter','main.py',341),
+  ('value -> IDENTIFIER','value',1,'p_value_parameter','main.py',342),
+  ('value_list -> value','value_list',1,'p_value_list','main.py',346),
+  ('value_list -> value_list COMMA value','value_list',3,'p_value_list','main.py',347),
+  ('signed_number -> NUMBER','signed_number',1,'p_signed_number','main.py',354),
+  ('signed_number -> MINUS NUMBER','signed_number',2,'p_signed_number','main.py',355),
+  ('group_clause -> GROUP BY select_list','group_clause',3,'p_group_clause','main.py',359),
+  ('group_clause -> empty','group_clause',1,'p_group_clause','main.py',360),
+  ('order_clause -> ORDER BY order_list','order_clause',3,'p_order_clause','main.py',367),
+  ('order_clause -> empty','order_clause',1,'p_order_clause','main.py',368),
+  ('order_list -> order_item','order_list',1,'p_order_list','main.py',375),
+  ('order_list -> order_list COMMA order_item','order_list',3,'p_order_list','main.py',376),
+  ('order_item -> select_item','order_item',1,'p_order_item','main.py',383),
+  ('order_item -> select_item ASC','order_item',2,'p_order_item','main.py',384),
+  ('order_item -> select_item DESC','order_item',2,'p_order_item','main.py',385),
+  ('limit_clause -> LIMIT NUMBER','limit_clause',2,'p_limit_clause','main.py',389),
+  ('limit_clause -> empty','limit_clause',1,'p_limit_clause','main.py',390),
+  ('create_select_stmt -> create_table IDENTIFIER select_stmt','create_select_stmt',3,'p_create_select_stmt','main.py',398),
+  ('create_join_stmt -> create_table IDENTIFIER FROM IDENTIFIER JOIN IDENTIFIER USING LPAREN field_list RPAREN','create_join_stmt',10,'p_create_join_stmt','main.py',403),
+  ('create_table -> CREATE TABLE','create_table',2,'p_create_table','main.py',414),
+  ('create_table -> CREATE MATERIALIZED TABLE','create_table',3,'p_create_table','main.py',415),
+  ('refresh_stmt -> REFRESH TABLE IDENTIFIER','refresh_stmt',3,'p_refresh_stmt','main.py',420),
+  ('create_index_stmt -> CREATE INDEX IDENTIFIER ON IDENTIFIER LPAREN IDENTIFIER RPAREN index_using','create_index_stmt',9,'p_create_index_stmt','main.py',425),
+  ('index_using -> USING HASH','index_using',2,'p_index_using','main.py',435),
+  ('index_using -> USING SORTED','index_using',2,'p_index_using','main.py',436),
+  ('index_using -> USING GRID','index_using',2,'p_index_using','main.py',437),
+  ('index_using -> empty','index_using',1,'p_index_using','main.py',438),
+  ('analyze_stmt -> ANALYZE TABLE IDENTIFIER','analyze_stmt',3,'p_analyze_stmt','main.py',446),
+  ('set_stmt -> SET IDENTIFIER value','set_stmt',3,'p_set_stmt','main.py',451),
+  ('cache_stmt -> CACHE STATS','cache_stmt',2,'p_cache_stmt','main.py',456),
+  ('cache_stmt -> CACHE CLEAR','cache_stmt',2,'p_cache_stmt','main.py',457),
+  ('show_memory_stmt -> SHOW MEMORY','show_memory_stmt',2,'p_show_memory_stmt','main.py',462),
+  ('explain_stmt -> EXPLAIN explainable_stmt','explain_stmt',2,'p_explain_stmt','main.py',467),
+  ('explain_stmt -> EXPLAIN ANALYZE explainable_stmt','explain_stmt',3,'p_explain_stmt','main.py',468),
+  ('explainable_stmt -> select_stmt','explainable_stmt',1,'p_explainable_stmt','main.py',472),
+  ('explainable_stmt -> create_select_stmt','explainable_stmt',1,'p_explainable_stmt','main.py',473),
+  ('explainable_stmt -> create_join_stmt','explainable_stmt',1,'p_explainable_stmt','main.py',474),
+  ('explainable_stmt -> import_stmt','explainable_stmt',1,'p_explainable_stmt','main.py',475),
+  ('procedure_decl -> PROCEDURE IDENTIFIER DO statements END','procedure_decl',5,'p_procedure_decl','main.py',480),
+  ('procedure_decl -> PROCEDURE IDENTIFIER LPAREN field_list RPAREN DO statements END','procedure_decl',8,'p_procedure_decl','main.py',481),
+  ('procedure_call -> CALL IDENTIFIER','procedure_call',2,'p_procedure_call','main.py',489),
+  ('procedure_call -> CALL IDENTIFIER LPAREN value_list RPAREN','procedure_call',5,'p_procedure_call','main.py',490),
+  ('prepare_stmt -> PREPARE IDENTIFIER AS explainable_stmt','prepare_stmt',4,'p_prepare_stmt','main.py',495),
+  ('execute_stmt -> EXECUTE IDENTIFIER','execute_stmt',2,'p_execute_stmt','main.py',502),
+  ('execute_stmt -> EXECUTE IDENTIFIER LPAREN value_list RPAREN','execute_stmt',5,'p_execute_stmt','main.py',503),
+  ('empty -> <empty>','empty',0,'p_empty','main.py',507),
+]
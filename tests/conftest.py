@@ -0,0 +1,79 @@
+"""Fixtures for the CQL interpreter tests.
+
+Each test gets an empty catalog, the default settings and a temporary
+working directory; `cql` runs a piece of CQL source and returns what it
+printed."""
+
+import io
+import os
+import sys
+from contextlib import redirect_stdout
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+CATALOG = ('tables', 'procedures', 'prepared', 'indexes', 'materialized', 'follows',
+           'table_stats', 'result_cache', 'table_versions', 'table_use', 'table_locks')
+
+
+def reset_catalog():
+    for name in CATALOG:
+        getattr(main, name).clear()
+    main.cache_stats.update(dict.fromkeys(main.cache_stats, 0))
+    main.memory_stats.update(dict.fromkeys(main.memory_stats, 0))
+
+
+@pytest.fixture
+def cql(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main, 'settings', dict(main.settings))
+    reset_catalog()
+
+    def run(source):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            main.run_source(source)
+        return output.getvalue()
+
+    yield run
+    reset_catalog()
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    """Write a CSV file in the test directory and return its name"""
+    def write(name, text):
+        (tmp_path / name).write_text(text, encoding='utf-8')
+        return name
+    return write
+
+
+ESTACOES = """Id,Local,Coordenadas
+E1,Bouro,"[-8.31808611,41.70225278]"
+E2,Graciosa,"[-28.0038,39.0672]"
+E3,"Olhão, EPPO","[-7.821,37.033]"
+E4,"Setúbal, Areias","[-8.89066111,38.54846667]"
+"""
+
+OBSERVACOES = """Id,Temperatura,Humidade,DirecaoVento,DataHoraObservacao
+E1,23.2,58.0,NE,2025-04-10T19:00
+E2,12.5,99.0,E,2025-04-10T19:00
+E3,18.1,,SW,2025-04-10T20:00
+E1,21.0,61.5,N,2025-04-10T20:00
+E4,9.8,88.0,NE,2025-04-10T21:00
+E2,,97.0,E,2025-04-10T21:00
+"""
+
+
+@pytest.fixture
+def weather(cql, csv_file):
+    """The small estacoes/observacoes tables used by most tests"""
+    csv_file('estacoes.csv', ESTACOES)
+    csv_file('observacoes.csv', OBSERVACOES)
+    cql('IMPORT TABLE estacoes FROM "estacoes.csv"; '
+        'IMPORT TABLE observacoes FROM "observacoes.csv";')
+    return cql
+
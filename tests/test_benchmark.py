@@ -0,0 +1,51 @@
+"""Benchmark suite: reproducible generated data and a workload that runs cleanly"""
+
+import argparse
+import csv
+
+import pytest
+
+from benchmark import generate, run
+
+
+@pytest.mark.parametrize('text, count', [('1000', 1000), ('1e6', 10 ** 6), ('10^8', 10 ** 8)])
+def test_parse_count(text, count):
+    assert generate.parse_count(text) == count
+
+
+def test_same_seed_gives_the_same_files(tmp_path):
+    first = generate.generate(str(tmp_path / 'a'), 500, 12, seed=7)
+    second = generate.generate(str(tmp_path / 'b'), 500, 12, seed=7)
+    other = generate.generate(str(tmp_path / 'c'), 500, 12, seed=8)
+    for a, b, c in zip(first, second, other):
+        with open(a, 'rb') as fa, open(b, 'rb') as fb, open(c, 'rb') as fc:
+            data = fa.read()
+            assert data == fb.read()
+            assert data != fc.read()
+
+
+def test_generated_files_have_the_interpreter_format(tmp_path):
+    estacoes, observacoes = generate.generate(str(tmp_path), 2000, 30, seed=1)
+    with open(estacoes, encoding='utf-8', newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['Id', 'Local', 'Coordenadas'] and len(rows) == 31
+    with open(observacoes, encoding='utf-8', newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == generate.OBSERVACOES_HEADERS and len(rows) == 2001
+    assert {row[0] for row in rows[1:]} <= {f'E{k}' for k in range(1, 31)}
+    assert rows[1][-1] == '2024-01-01T00:00'
+
+
+def test_workload_runs_and_compares(cql, tmp_path):
+    args = argparse.Namespace(rows=1000, stations=None, seed=42, repeat=1, workers=1,
+                              cache=False, data=str(tmp_path / 'data'))
+    report = run.run_benchmark(args)
+    assert [case['name'] for case in report['results']] == [name for name, _, _ in run.CASES]
+    assert report['results'][1]['rows'] == 1000
+    assert report['meta']['rows'] == 1000
+
+    slower = {'meta': report['meta'], 'results': [
+        dict(case, median_seconds=case['median_seconds'] / 2) for case in report['results']]}
+    assert run.compare(report, report, 0.10) == []
+    assert run.compare(report, slower, 0.10) == [case['name'] for case in report['results']
+                                                 if case['median_seconds']]
@@ -0,0 +1,57 @@
+"""SAVE TABLE / LOAD TABLE: a loaded table answers queries like the original"""
+
+import pytest
+
+import main
+
+QUERIES = [
+    'SELECT * FROM {t};',
+    'SELECT Id, Temperatura FROM {t} WHERE Temperatura > 15 AND Id <> "E3";',
+    'SELECT Id, COUNT(*), AVG(Humidade) FROM {t} GROUP BY Id ORDER BY Id;',
+    'SELECT * FROM {t} WHERE DataHoraObservacao >= "2025-04-10T20:00" ORDER BY Temperatura DESC LIMIT 3;',
+]
+
+
+def same_tables(a, b):
+    assert a['headers'] == b['headers']
+    assert a['types'] == b['types']
+    for x, y in zip(a['columns'], b['columns']):
+        assert list(map(str, x)) == list(map(str, y))
+
+
+@pytest.fixture
+def loaded(weather):
+    weather('SAVE TABLE observacoes AS "obs.cqlb"; LOAD TABLE copia FROM "obs.cqlb";')
+    return weather
+
+
+def test_round_trip_keeps_types_and_values(loaded):
+    same_tables(main.tables['observacoes'], main.tables['copia'])
+    assert main.tables['copia']['types'] == ['str', 'float', 'float', 'str', 'timestamp']
+    assert main.mapped_table_bytes(main.tables['copia']) > 0
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_loaded_table_answers_like_the_original(loaded, query):
+    assert loaded(query.format(t='copia')) == loaded(query.format(t='observacoes'))
+
+
+def test_points_and_encoded_text_round_trip(cql, csv_file):
+    lines = ['Id,Zona,Local'] + [f'P{i},{"norte" if i % 3 else "sul"},"[{i * 0.5},{-i}]"'
+                                 for i in range(300)]
+    csv_file('pontos.csv', '\n'.join(lines) + '\n')
+    cql('IMPORT TABLE pontos FROM "pontos.csv"; '
+        'SAVE TABLE pontos AS "pontos.cqlb"; LOAD TABLE copia FROM "pontos.cqlb";')
+    same_tables(main.tables['pontos'], main.tables['copia'])
+    query = 'SELECT Id, Zona FROM {t} WHERE WITHIN_BBOX(Local, 0, -20, 10, 0) AND Zona = "sul";'
+    assert cql(query.format(t='copia')) == cql(query.format(t='pontos'))
+
+
+def test_export_of_loaded_table_matches_original(loaded, tmp_path):
+    loaded('EXPORT TABLE observacoes AS "a.csv"; EXPORT TABLE copia AS "b.csv";')
+    assert (tmp_path / 'a.csv').read_bytes() == (tmp_path / 'b.csv').read_bytes()
+
+
+def test_load_of_missing_file_reports_an_error(cql):
+    output = cql('LOAD TABLE t FROM "nada.cqlb";')
+    assert output.startswith('Erro') and 't' not in main.tables
@@ -0,0 +1,96 @@
+"""Result cache: hits, invalidation on catalog changes, its memory bound and EXPLAIN ANALYZE"""
+
+import threading
+
+import pytest
+
+import main
+
+
+def test_repeated_select_hits_the_cache(weather):
+    first = weather('SELECT * FROM observacoes WHERE Temperatura > 15;')
+    assert weather('SELECT * FROM observacoes WHERE Temperatura > 15;') == first
+    assert main.cache_stats['hits'] == 1
+
+
+def test_import_invalidates_cached_results(weather, csv_file):
+    weather('SELECT COUNT(*) FROM estacoes;')
+    csv_file('mais.csv', 'Id,Local,Coordenadas\nE9,Faro,"[-7.9,37.0]"\n')
+    weather('IMPORT INTO estacoes FROM "mais.csv" APPEND;')
+    assert weather('SELECT COUNT(*) FROM estacoes;').split()[-1] == '5'
+
+
+def test_explain_analyze_runs_without_the_cache(weather):
+    weather('SELECT * FROM observacoes WHERE Temperatura > 15;')
+    output = weather('EXPLAIN ANALYZE SELECT * FROM observacoes WHERE Temperatura > 15;')
+    assert main.cache_stats['hits'] == 0
+    assert 'Filter Temperatura > 15 [full scan]  (linhas: 6 -> 3' in output
+
+
+def test_bypass_is_local_to_the_thread(weather):
+    weather('SELECT * FROM observacoes WHERE Temperatura > 15;')
+    inside = threading.Event()
+    done = threading.Event()
+
+    def explain_analyze():
+        with main.bypassing_cache():
+            inside.set()
+            done.wait(5)
+
+    thread = threading.Thread(target=explain_analyze)
+    thread.start()
+    try:
+        inside.wait(5)
+        weather('SELECT * FROM observacoes WHERE Temperatura > 15;')
+        assert main.cache_stats['hits'] == 1
+    finally:
+        done.set()
+        thread.join()
+
+
+def test_join_results_are_cached(weather):
+    weather('CREATE TABLE a FROM observacoes JOIN estacoes USING (Id);')
+    weather('CREATE TABLE b FROM observacoes JOIN estacoes USING (Id);')
+    assert main.cache_stats['hits'] == 1
+    assert main.tables['a']['columns'] == main.tables['b']['columns']
+
+
+@pytest.mark.parametrize('change', [
+    'DISCARD TABLE estacoes; IMPORT TABLE estacoes FROM "poucas.csv";',
+    'RENAME TABLE outra estacoes;',
+    'CREATE TABLE estacoes SELECT * FROM outra;',
+    'LOAD TABLE estacoes FROM "outra.cqlb";',
+])
+def test_catalog_changes_invalidate_cached_results(weather, csv_file, change):
+    csv_file('poucas.csv', 'Id,Local,Coordenadas\nE1,Braga,"[-8.4,41.5]"\n')
+    weather('IMPORT TABLE outra FROM "poucas.csv"; SAVE TABLE outra AS "outra.cqlb";')
+    query = 'SELECT Local FROM estacoes WHERE Id = "E1";'
+    assert weather(query).split()[-1] == 'Bouro'
+    weather(change)
+    assert weather(query).split()[-1] == 'Braga'
+    assert main.cache_stats['hits'] == 0
+    assert main.cache_stats['invalidations'] >= 1
+
+
+def test_cache_stays_within_cache_memory(weather):
+    queries = [f'SELECT * FROM observacoes WHERE Temperatura > {t};' for t in range(5, 25)]
+    size = main.estimate_table_bytes(main.tables['observacoes'])
+    weather(f'SET cache_memory {3 * size};')
+    for query in queries:
+        weather(query)
+    assert main.cache_stats['bytes'] <= 3 * size
+    assert main.cache_stats['evictions'] > 0
+    weather(queries[-1])
+    assert main.cache_stats['hits'] == 1
+    weather(queries[0])
+    assert main.cache_stats['hits'] == 1
+
+
+def test_cache_stats_and_clear(weather):
+    weather('SELECT * FROM estacoes; SELECT * FROM estacoes;')
+    output = weather('CACHE STATS;')
+    assert 'Acertos: 1  Falhas: 1  (taxa de acerto 50.0%)' in output
+    weather('CACHE CLEAR;')
+    assert not main.result_cache and main.cache_stats['bytes'] == 0
+    weather('SET cache_memory 0; SELECT * FROM estacoes; SELECT * FROM estacoes;')
+    assert main.cache_stats['hits'] == 1 and not main.result_cache
@@ -0,0 +1,66 @@
+"""Shared state touched by concurrent readers in --serve mode"""
+
+import threading
+import time
+
+import main
+
+
+def run_threads(target, count=8):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_index_data_is_built_once(weather, monkeypatch):
+    weather('CREATE INDEX por_id ON observacoes (Id);')
+    index = main.indexes['por_id']
+    index['data'] = None
+    calls = []
+    build = main.build_hash_index
+
+    def slow_build(column):
+        calls.append(1)
+        time.sleep(0.05)
+        return build(column)
+
+    monkeypatch.setattr(main, 'build_hash_index', slow_build)
+    results = []
+    run_threads(lambda: results.append(main.index_data(index)))
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_zone_map_is_built_once(weather, monkeypatch):
+    table = main.tables['observacoes']
+    calls = []
+    extend = main.extend_zone
+
+    def slow_extend(*args):
+        calls.append(1)
+        time.sleep(0.05)
+        return extend(*args)
+
+    monkeypatch.setattr(main, 'extend_zone', slow_extend)
+    results = []
+    run_threads(lambda: results.append(main.zone_map(table, 1)))
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_table_use_under_concurrent_readers(weather):
+    errors = []
+
+    def reader():
+        try:
+            for i in range(2000):
+                main.touch_table(f't{i % 50}')
+                main.tables_by_use()
+        except RuntimeError as e:
+            errors.append(e)
+
+    run_threads(reader)
+    assert not errors
+    assert len(set(main.tables_by_use())) == len(main.tables_by_use())
@@ -0,0 +1,30 @@
+"""Dictionary encoding of text columns, also in tables built by queries"""
+
+import main
+
+
+def test_import_encodes_repeated_text(cql, csv_file):
+    csv_file('vento.csv', 'Direcao,N\n' + ''.join(f"{'NSEW'[i % 4]},{i}\n" for i in range(40)))
+    cql('IMPORT TABLE v FROM "vento.csv";')
+    column = main.tables['v']['columns'][0]
+    assert isinstance(column, main.DictColumn)
+    assert column.values == ['N', 'S', 'E', 'W']
+
+
+def test_create_select_encodes_repeated_text(cql, csv_file):
+    # 'Nome' é quase toda distinta na tabela importada, mas não nas linhas escolhidas
+    lines = ['Nome,N'] + [f'n{i},{i}' for i in range(100)] + [f'x,{i}' for i in range(100, 200)]
+    csv_file('nomes.csv', '\n'.join(lines) + '\n')
+    cql('IMPORT TABLE t FROM "nomes.csv"; CREATE TABLE s SELECT * FROM t WHERE N >= 100;')
+    assert isinstance(main.tables['t']['columns'][0], list)
+    column = main.tables['s']['columns'][0]
+    assert isinstance(column, main.DictColumn)
+    assert list(column) == ['x'] * 100
+
+
+def test_loaded_text_is_encoded_again_by_create_select(cql, csv_file):
+    lines = ['Nome,N'] + [f'n{i},{i}' for i in range(100)] + [f'x,{i}' for i in range(100, 200)]
+    csv_file('nomes.csv', '\n'.join(lines) + '\n')
+    cql('IMPORT TABLE t FROM "nomes.csv"; SAVE TABLE t AS "t.cqlb"; LOAD TABLE u FROM "t.cqlb";'
+        'CREATE TABLE s SELECT Nome FROM u WHERE N >= 150;')
+    assert isinstance(main.tables['s']['columns'][0], main.DictColumn)
@@ -0,0 +1,70 @@
+"""FOLLOW TABLE: each poll appends only the complete records written since the last one"""
+
+import main
+
+HEADER = 'Id,Nota,Valor\n'
+
+
+def write(tmp_path, text, mode='a'):
+    with open(tmp_path / 'log.csv', mode, encoding='utf-8', newline='') as f:
+        f.write(text)
+
+
+def table_rows(name):
+    return list(zip(*(map(str, column) for column in main.tables[name]['columns'])))
+
+
+def test_polls_append_new_lines(cql, tmp_path):
+    write(tmp_path, HEADER + 'A,um,1\nB,dois,2\n', 'w')
+    output = cql('FOLLOW TABLE log FROM "log.csv";')
+    assert "Tabela 'log' importada de 'log.csv' (2 linhas válidas)" in output
+    write(tmp_path, 'C,três,3\nD,qua')
+    assert cql('FOLLOW TABLE log FROM "log.csv";').startswith("1 linhas novas de 'log.csv' em 'log' (3 no total)")
+    write(tmp_path, 'tro,4\n')
+    cql('FOLLOW TABLE log FROM "log.csv";')
+    assert cql('FOLLOW TABLE log FROM "log.csv";').startswith('0 linhas novas')
+    assert table_rows('log') == [('A', 'um', '1'), ('B', 'dois', '2'), ('C', 'três', '3'),
+                                 ('D', 'quatro', '4')]
+
+
+def test_quoted_newline_waits_for_the_whole_record(cql, tmp_path):
+    write(tmp_path, HEADER + 'A,"primeira\nsegunda', 'w')
+    assert "(0 linhas válidas)" in cql('FOLLOW TABLE log FROM "log.csv";')
+    write(tmp_path, '\nterceira",1\nB,"x\n')
+    assert cql('FOLLOW TABLE log FROM "log.csv";').startswith('1 linhas novas')
+    write(tmp_path, 'y",2\nC,z,3\n')
+    assert cql('FOLLOW TABLE log FROM "log.csv";').startswith('2 linhas novas')
+    assert table_rows('log') == [('A', 'primeira\nsegunda\nterceira', '1'), ('B', 'x\ny', '2'),
+                                 ('C', 'z', '3')]
+
+
+def test_warnings_number_records_like_import(cql, tmp_path):
+    write(tmp_path, HEADER + 'A,"duas\nlinhas",1\n', 'w')
+    cql('FOLLOW TABLE log FROM "log.csv";')
+    write(tmp_path, 'B,"mais\nduas",2\npartida\nC,c,x\nD,d,4\n')
+    output = cql('FOLLOW TABLE log FROM "log.csv";')
+    imported = cql('IMPORT TABLE todo FROM "log.csv";')
+    assert output.splitlines()[:2] == [
+        'Aviso: Linha 4 ignorada - número de colunas inválido (esperado 3, obtido 1)',
+        "Aviso: Linha 5 ignorada - valor 'x' inválido para a coluna 'Valor' (int)"]
+    assert output.splitlines()[0] in imported
+
+
+def test_shrunk_file_is_imported_again(cql, tmp_path):
+    write(tmp_path, HEADER + 'A,um,1\nB,dois,2\n', 'w')
+    cql('FOLLOW TABLE log FROM "log.csv";')
+    write(tmp_path, HEADER + 'Z,novo,9\n', 'w')
+    output = cql('FOLLOW TABLE log FROM "log.csv";')
+    assert 'encolheu' in output
+    assert table_rows('log') == [('Z', 'novo', '9')]
+
+
+def test_followed_table_matches_a_full_import(cql, tmp_path):
+    write(tmp_path, HEADER + 'E,"primeira\nnota",0.5\n', 'w')
+    cql('FOLLOW TABLE log FROM "log.csv";')
+    for k in range(5):
+        write(tmp_path, ''.join(f'E{i},"nota {i}\n""{k}""",{i}.5\n' for i in range(k * 10, k * 10 + 10)))
+        cql('FOLLOW TABLE log FROM "log.csv";')
+    cql('IMPORT TABLE todo FROM "log.csv";')
+    assert table_rows('log') == table_rows('todo')
+    assert main.tables['log']['types'] == main.tables['todo']['types']
@@ -0,0 +1,94 @@
+"""GROUP BY: the hash aggregator gives the groups and values of a plain Python loop"""
+
+import math
+from collections import defaultdict
+
+import pytest
+
+import main
+
+
+def medidas(rows):
+    lines = ['Estacao,Sensor,Valor,Nivel']
+    for i in range(rows):
+        valor = '' if i % 17 == 0 else f'{(i * 37) % 1000 / 10}'
+        nivel = '' if i % 23 == 0 else str(i % 7)
+        lines.append(f'E{i % 12},S{i % 3},{valor},{nivel}')
+    return '\n'.join(lines) + '\n'
+
+
+@pytest.fixture
+def m(cql, csv_file):
+    csv_file('m.csv', medidas(3000))
+    cql('SET cache_memory 0; IMPORT TABLE m FROM "m.csv";')
+    return cql
+
+
+def group_key(value):
+    """Missing values form one group"""
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+
+def expected_groups(keys, where=lambda row: True):
+    """{key: (count, count Valor, sum Valor, min Valor, max Valor, avg Nivel)} from the rows"""
+    table = main.tables['m']
+    headers = table['headers']
+    groups = defaultdict(list)
+    for row in zip(*table['columns']):
+        row = dict(zip(headers, row))
+        if where(row):
+            groups[tuple(group_key(row[k]) for k in keys)].append(row)
+    result = {}
+    for key, rows in groups.items():
+        valores = [r['Valor'] for r in rows if not math.isnan(r['Valor'])]
+        niveis = [r['Nivel'] for r in rows if not math.isnan(r['Nivel'])]
+        result[key] = (len(rows), len(valores), sum(valores), min(valores, default=math.nan),
+                       max(valores, default=math.nan),
+                       sum(niveis) / len(niveis) if niveis else math.nan)
+    return result
+
+
+def grouped(cql, keys, where=''):
+    cql(f'CREATE TABLE g SELECT {", ".join(keys)}, COUNT(*), COUNT(Valor), SUM(Valor), '
+        f'MIN(Valor), MAX(Valor), AVG(Nivel) FROM m {where} GROUP BY {", ".join(keys)};')
+    table = main.tables['g']
+    return {tuple(map(group_key, row[:len(keys)])): row[len(keys):]
+            for row in zip(*table['columns'])}
+
+
+def assert_same(result, expected):
+    assert result.keys() == expected.keys()
+    for key, values in expected.items():
+        assert result[key][:2] == values[:2]
+        assert result[key][2:] == pytest.approx(values[2:], nan_ok=True)
+
+
+@pytest.mark.parametrize('keys', [['Estacao'], ['Sensor'], ['Estacao', 'Sensor'], ['Nivel']])
+def test_groups_match_a_python_loop(m, keys):
+    assert_same(grouped(m, keys), expected_groups(keys))
+
+
+def test_groups_of_filtered_rows(m):
+    result = grouped(m, ['Sensor', 'Estacao'], 'WHERE Valor > 50 AND Estacao <> "E3"')
+    expected = expected_groups(['Sensor', 'Estacao'],
+                               lambda row: row['Valor'] > 50 and row['Estacao'] != 'E3')
+    assert_same(result, expected)
+
+
+def test_aggregates_skip_missing_values(weather):
+    output = weather('SELECT Id, COUNT(*), COUNT(Temperatura), AVG(Humidade) FROM observacoes '
+                     'GROUP BY Id ORDER BY Id;')
+    assert output.strip('\n').splitlines()[2:] == [
+        'E1 | 2 | 2 | 59.75', 'E2 | 2 | 1 | 98.0', 'E3 | 1 | 1 | ', 'E4 | 1 | 1 | 88.0']
+
+
+def test_aggregates_without_group_by(weather):
+    output = weather('SELECT COUNT(*), AVG(Temperatura), MAX(DataHoraObservacao) FROM observacoes;')
+    assert output.strip('\n').splitlines()[2:] == ['6 | 16.92 | 2025-04-10T21:00:00']
+    output = weather('SELECT COUNT(*) FROM observacoes WHERE Temperatura > 100;')
+    assert output.split()[-1] == '0'
+
+
+def test_group_by_errors(weather):
+    assert weather('SELECT Nada, COUNT(*) FROM observacoes GROUP BY Nada;').startswith('Erro')
+    assert weather('SELECT SUM(Id) FROM observacoes;').startswith('Erro')
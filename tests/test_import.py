@@ -0,0 +1,101 @@
+"""IMPORT of glob patterns and parallel IMPORT: same table as a sequential read"""
+
+import pytest
+
+import main
+
+
+def notas(rows, start=0):
+    """CSV text whose 'Nota' column has quoted commas, quotes and newlines"""
+    lines = ['Id,Valor,Nota,Quando']
+    for i in range(start, start + rows):
+        nota = {0: 'simples', 1: '"com, vírgula"', 2: '"duas\nlinhas"',
+                3: '"aspas ""dentro"""', 4: '"três\nlinhas\naqui"'}[i % 5]
+        lines.append(f'E{i % 13},{i * 0.5},{nota},2024-01-{1 + i % 28:02d}T{i % 24:02d}:00')
+        if i % 97 == 0:
+            lines.append('linha,partida')
+    return '\n'.join(lines) + '\n'
+
+
+def same_tables(a, b):
+    assert a['headers'] == b['headers']
+    assert a['types'] == b['types']
+    for x, y in zip(a['columns'], b['columns']):
+        assert list(map(str, x)) == list(map(str, y))
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(main, 'PARALLEL_MIN_IMPORT_BYTES', 1)
+    monkeypatch.setattr(main, 'IMPORT_CHUNK_BYTES', 512)
+
+
+def test_parallel_import_matches_sequential(cql, csv_file, small_chunks):
+    csv_file('notas.csv', notas(600))
+    sequential = cql('IMPORT TABLE a FROM "notas.csv";')
+    parallel = cql('SET parallelism 3; IMPORT TABLE b FROM "notas.csv";')
+    same_tables(main.tables['a'], main.tables['b'])
+    assert main.tables['b']['types'] == ['str', 'float', 'str', 'timestamp']
+    assert 'duas\nlinhas' in list(main.tables['b']['columns'][2])
+    # Os avisos indicam as mesmas linhas
+    warnings = [line for line in sequential.splitlines() if line.startswith('Aviso')]
+    assert len(warnings) == 7
+    assert [line for line in parallel.splitlines() if line.startswith('Aviso')] == warnings
+
+
+def test_cuts_are_outside_quoted_fields(cql, csv_file, tmp_path):
+    csv_file('notas.csv', notas(300))
+    headers, offset = main.csv_header('notas.csv')
+    size = (tmp_path / 'notas.csv').stat().st_size
+    tasks = main.import_tasks([('notas.csv', offset, size)], 256)
+    assert len(tasks) > 5
+    for task in tasks:
+        for segment in task:
+            assert all(len(row) in (4, 2) for row in main.segment_reader(*segment))
+
+
+def test_glob_imports_every_file_in_order(cql, csv_file):
+    csv_file('obs_2.csv', notas(20, 40))
+    csv_file('obs_1.csv', notas(20, 20))
+    csv_file('obs_0.csv', notas(20))
+    csv_file('todas.csv', notas(60))
+    output = cql('IMPORT TABLE g FROM "obs_*.csv"; IMPORT TABLE t FROM "todas.csv";')
+    assert "(3 ficheiros, 60 linhas válidas)" in output
+    assert "Linha 3 de 'obs_0.csv' ignorada" in output
+    same_tables(main.tables['g'], main.tables['t'])
+
+
+def test_parallel_glob_import(cql, csv_file, small_chunks):
+    for k in range(4):
+        csv_file(f'obs_{k}.csv', notas(50, 50 * k))
+    csv_file('todas.csv', notas(200))
+    cql('SET parallelism 2; IMPORT TABLE g FROM "obs_*.csv"; IMPORT TABLE t FROM "todas.csv";')
+    same_tables(main.tables['g'], main.tables['t'])
+
+
+def test_columns_typed_differently_in_each_part(cql, csv_file, small_chunks):
+    # int no início, float mais à frente; texto que parece número até ao fim
+    lines = ['A,B,C'] + [f'{i},{i},' for i in range(200)] + [f'{i}.5,x{i},7' for i in range(200)]
+    csv_file('tipos.csv', '\n'.join(lines) + '\n')
+    cql('IMPORT TABLE a FROM "tipos.csv"; SET parallelism 2; IMPORT TABLE b FROM "tipos.csv";')
+    assert main.tables['b']['types'] == ['float', 'str', 'float']
+    same_tables(main.tables['a'], main.tables['b'])
+
+
+def test_files_with_different_headers(cql, csv_file):
+    csv_file('obs_0.csv', 'Id,V\nE1,1\n')
+    csv_file('obs_1.csv', 'Id,W\nE1,1\n')
+    output = cql('IMPORT TABLE g FROM "obs_*.csv";')
+    assert "Erro: O cabeçalho de 'obs_1.csv' (Id, W) não corresponde ao de 'obs_0.csv'" in output
+    assert 'g' not in main.tables
+
+
+def test_pattern_without_files(cql):
+    assert "Erro: Nenhum ficheiro corresponde a 'nada_*.csv'" in cql(
+        'IMPORT TABLE g FROM "nada_*.csv";')
+
+
+def test_text_is_read_as_utf8(cql, tmp_path):
+    (tmp_path / 'acentos.csv').write_bytes('Local\nOlhão\nÉvora\n'.encode('utf-8'))
+    cql('IMPORT TABLE a FROM "acentos.csv";')
+    assert list(main.tables['a']['columns'][0]) == ['Olhão', 'Évora']
@@ -0,0 +1,57 @@
+"""CREATE INDEX: an index lookup returns the same rows as a full scan"""
+
+import pytest
+
+import main
+
+QUERIES = [
+    'SELECT * FROM d WHERE Id = "E7";',
+    'SELECT * FROM d WHERE Id = "E7" AND Valor > 500;',
+    'SELECT * FROM d WHERE Id = "nenhum";',
+    'SELECT * FROM d WHERE Valor >= 100 AND Valor < 120;',
+    'SELECT * FROM d WHERE Valor > 990;',
+    'SELECT * FROM d WHERE Valor <= 3;',
+    'SELECT * FROM d WHERE Valor = 37;',
+    'SELECT Id, COUNT(*) FROM d WHERE Valor < 50 GROUP BY Id ORDER BY Id;',
+    'SELECT * FROM d WHERE Valor > 100 ORDER BY Valor LIMIT 5;',
+]
+
+
+def dados(rows, start=0):
+    lines = ['Id,Valor,Quando'] + [f'E{i % 50},{(i * 37) % 1000},2024-01-{1 + i % 28:02d}T{i % 24:02d}:00'
+                                   for i in range(start, start + rows)]
+    return '\n'.join(lines) + '\n'
+
+
+@pytest.fixture
+def d(cql, csv_file):
+    csv_file('d.csv', dados(2000))
+    cql('SET cache_memory 0; IMPORT TABLE d FROM "d.csv";')
+    return cql
+
+
+def scans(cql):
+    return [cql(query) for query in QUERIES]
+
+
+@pytest.mark.parametrize('kind', ['HASH', 'SORTED'])
+def test_index_gives_the_rows_of_a_full_scan(d, kind):
+    expected = scans(d)
+    d(f'CREATE INDEX por_id ON d (Id) USING {kind}; CREATE INDEX por_valor ON d (Valor) USING {kind};')
+    assert 'index' in d(f'EXPLAIN {QUERIES[0]}')
+    assert scans(d) == expected
+
+
+def test_index_follows_appended_rows(d, csv_file):
+    d('CREATE INDEX por_id ON d (Id); CREATE INDEX por_valor ON d (Valor) USING SORTED;')
+    csv_file('mais.csv', dados(500, start=2000))
+    d('IMPORT INTO d FROM "mais.csv" APPEND;')
+    indexed = scans(d)
+    d('DISCARD TABLE d; IMPORT TABLE d FROM "d.csv"; IMPORT INTO d FROM "mais.csv" APPEND;')
+    assert not main.indexes
+    assert scans(d) == indexed
+
+
+def test_index_on_missing_column(d):
+    output = d('CREATE INDEX x ON d (Nada);')
+    assert output.startswith('Erro') and 'x' not in main.indexes
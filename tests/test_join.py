@@ -0,0 +1,93 @@
+"""JOIN ... USING: every build strategy gives the rows of a nested-loop join"""
+
+from collections import Counter
+
+import pytest
+
+import main
+
+
+def leituras(rows):
+    lines = ['Id,Sensor,Valor'] + [f"{'' if i % 41 == 0 else f'E{i % 60}'},S{i % 3},{i}"
+                                   for i in range(rows)]
+    return '\n'.join(lines) + '\n'
+
+
+def locais(rows):
+    lines = ['Id,Sensor,Local'] + [f"{'' if i % 50 == 0 else f'E{i % 80}'},S{i % 2},L{i}"
+                                   for i in range(rows)]
+    return '\n'.join(lines) + '\n'
+
+
+def table_rows(name):
+    table = main.tables[name]
+    return [[str(column[i]) for column in table['columns']] for i in range(len(table['columns'][0]))]
+
+
+def nested_loop(left, right, columns):
+    """Reference join: each left row with each right row that has the same keys"""
+    lh, rh = main.tables[left]['headers'], main.tables[right]['headers']
+    lkey = [lh.index(c) for c in columns]
+    rkey = [rh.index(c) for c in columns]
+    rest = [i for i, h in enumerate(rh) if h not in columns]
+    return Counter(tuple(l + [r[i] for i in rest])
+                   for l in table_rows(left) for r in table_rows(right)
+                   if [l[i] for i in lkey] == [r[i] for i in rkey])
+
+
+def joined(cql, left, right, columns):
+    cql(f'CREATE TABLE j FROM {left} JOIN {right} USING ({", ".join(columns)});')
+    return Counter(map(tuple, table_rows('j')))
+
+
+@pytest.fixture
+def sensores(cql, csv_file):
+    csv_file('leituras.csv', leituras(600))
+    csv_file('locais.csv', locais(160))
+    cql('SET cache_memory 0; IMPORT TABLE leituras FROM "leituras.csv"; '
+        'IMPORT TABLE locais FROM "locais.csv";')
+    return cql
+
+
+@pytest.mark.parametrize('left, right', [('leituras', 'locais'), ('locais', 'leituras')])
+@pytest.mark.parametrize('columns', [['Id'], ['Id', 'Sensor']])
+@pytest.mark.parametrize('setup', [
+    '',
+    'SET join_memory 1;',
+    'ANALYZE TABLE leituras; ANALYZE TABLE locais; SET join_memory 512;',
+    'CREATE INDEX li ON leituras (Id); CREATE INDEX ci ON locais (Id);',
+])
+def test_join_matches_nested_loop(sensores, left, right, columns, setup):
+    sensores(setup)
+    expected = nested_loop(left, right, columns)
+    assert sum(expected.values()) > 0
+    assert joined(sensores, left, right, columns) == expected
+
+
+def test_grace_hash_join_is_used_over_budget(sensores):
+    output = sensores('SET join_memory 1; EXPLAIN ANALYZE CREATE TABLE j FROM locais JOIN leituras USING (Id);')
+    assert 'grace hash join' in output
+    assert joined(sensores, 'locais', 'leituras', ['Id']) == nested_loop('locais', 'leituras', ['Id'])
+
+
+def test_join_on_dictionary_codes(cql, csv_file):
+    csv_file('a.csv', '\n'.join(['Zona,A'] + [f'Z{i % 4},{i}' for i in range(400)]) + '\n')
+    csv_file('b.csv', '\n'.join(['Zona,B'] + [f'Z{i % 6},{i}' for i in range(300)]) + '\n')
+    cql('IMPORT TABLE a FROM "a.csv"; IMPORT TABLE b FROM "b.csv";')
+    assert isinstance(main.tables['a']['columns'][0], main.DictColumn)
+    assert 'dictionary-code' in cql('EXPLAIN CREATE TABLE j FROM a JOIN b USING (Zona);')
+    assert joined(cql, 'a', 'b', ['Zona']) == nested_loop('a', 'b', ['Zona'])
+
+
+def test_parallel_probe_matches_sequential(sensores, monkeypatch):
+    monkeypatch.setattr(main, 'PARALLEL_MIN_ROWS', 100)
+    monkeypatch.setattr(main, 'PARALLEL_MIN_CHUNK', 50)
+    expected = joined(sensores, 'locais', 'leituras', ['Id', 'Sensor'])
+    output = sensores('SET parallelism 2; EXPLAIN ANALYZE CREATE TABLE k FROM locais JOIN leituras USING (Id, Sensor);')
+    assert 'parallel probe' in output
+    assert Counter(map(tuple, table_rows('k'))) == expected
+
+
+def test_join_on_missing_column(sensores):
+    output = sensores('CREATE TABLE j FROM leituras JOIN locais USING (Nada);')
+    assert output.startswith('Erro') and 'j' not in main.tables
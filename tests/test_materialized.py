@@ -0,0 +1,102 @@
+"""Materialized tables: incremental maintenance, rebuilds and RENAME of their sources"""
+
+import pytest
+
+import main
+
+MAIS = 'Id,Temperatura,Humidade,DirecaoVento,DataHoraObservacao\n' \
+       'E2,30.5,40.0,S,2025-04-10T22:00\nE4,5.0,90.0,N,2025-04-10T22:00\nE1,19.9,70.0,NE,2025-04-10T23:00\n'
+
+
+def table_rows(name):
+    return sorted(zip(*(map(str, column) for column in main.tables[name]['columns'])))
+
+
+@pytest.fixture
+def views(weather, csv_file):
+    csv_file('mais.csv', MAIS)
+    weather('SET cache_memory 0;\n'
+            'CREATE MATERIALIZED TABLE quentes SELECT Id, Temperatura FROM observacoes WHERE Temperatura > 15;\n'
+            'CREATE MATERIALIZED TABLE junto FROM quentes JOIN estacoes USING (Id);\n'
+            'CREATE MATERIALIZED TABLE contagem SELECT Id, COUNT(*) FROM observacoes GROUP BY Id;')
+    return weather
+
+
+def same_as_rebuilt(cql, name, query):
+    """The materialized table has the rows of its definition run from scratch"""
+    cql(f'CREATE TABLE fresco {query};')
+    return table_rows(name) == table_rows('fresco')
+
+
+DEFINITIONS = {
+    'quentes': 'SELECT Id, Temperatura FROM observacoes WHERE Temperatura > 15',
+    'junto': 'FROM quentes JOIN estacoes USING (Id)',
+    'contagem': 'SELECT Id, COUNT(*) FROM observacoes GROUP BY Id',
+}
+
+
+def all_up_to_date(cql):
+    return all(same_as_rebuilt(cql, name, query) for name, query in DEFINITIONS.items())
+
+
+def test_append_updates_dependents_incrementally(views):
+    output = views('IMPORT INTO observacoes FROM "mais.csv" APPEND;')
+    assert "Tabela materializada 'quentes' atualizada (+2 registros)" in output
+    assert "Tabela materializada 'junto' atualizada (+2 registros)" in output
+    assert "Tabela materializada 'contagem' reconstruída (4 registros)" in output
+    assert all_up_to_date(views)
+
+
+def test_reimport_rebuilds_dependents(views, csv_file):
+    output = views('DISCARD TABLE observacoes; SELECT * FROM quentes;')
+    assert 'Bouro' not in output
+    output = views('IMPORT TABLE observacoes FROM "mais.csv";')
+    assert "Tabela materializada 'quentes' reconstruída (2 registros)" in output
+    assert "Tabela materializada 'junto' reconstruída (2 registros)" in output
+    assert all_up_to_date(views)
+
+
+def test_missing_source_is_reported(views):
+    output = views('DISCARD TABLE estacoes; IMPORT INTO observacoes FROM "mais.csv" APPEND;')
+    assert "Aviso: Tabela materializada 'junto' não atualizada ('estacoes' não existe)" in output
+    output = views('REFRESH TABLE quentes;')
+    assert "Tabela materializada 'quentes' reconstruída (5 registros)" in output
+
+
+def test_renamed_source_keeps_updating(views):
+    views('RENAME TABLE observacoes obs;')
+    assert main.materialized['quentes']['sources'] == ['obs']
+    assert main.materialized['quentes']['stmt']['select']['table'] == 'obs'
+    output = views('IMPORT INTO obs FROM "mais.csv" APPEND;')
+    assert "Tabela materializada 'quentes' atualizada (+2 registros)" in output
+    assert "Tabela materializada 'junto' atualizada (+2 registros)" in output
+    assert same_as_rebuilt(views, 'quentes', DEFINITIONS['quentes'].replace('observacoes', 'obs'))
+    assert same_as_rebuilt(views, 'junto', DEFINITIONS['junto'])
+    assert 'reconstruída' in views('REFRESH TABLE junto;')
+
+
+def test_renamed_materialized_table_keeps_its_dependents(views):
+    views('RENAME TABLE quentes q;')
+    assert main.materialized['junto']['sources'] == ['q', 'estacoes']
+    assert main.materialized['junto']['stmt']['left_table'] == 'q'
+    output = views('IMPORT INTO observacoes FROM "mais.csv" APPEND;')
+    assert "Tabela materializada 'q' atualizada (+2 registros)" in output
+    assert "Tabela materializada 'junto' atualizada (+2 registros)" in output
+    assert same_as_rebuilt(views, 'junto', 'FROM q JOIN estacoes USING (Id)')
+
+
+def test_rename_over_a_source_rebuilds_its_dependents(views, csv_file):
+    views('IMPORT TABLE outras FROM "mais.csv";')
+    output = views('RENAME TABLE outras observacoes;')
+    assert "Tabela materializada 'quentes' reconstruída (2 registros)" in output
+    assert all_up_to_date(views)
+
+
+def test_join_of_a_table_with_itself_after_rename(views):
+    views('CREATE TABLE a SELECT Id, Temperatura FROM observacoes; '
+          'CREATE TABLE b SELECT Id, Local FROM estacoes; '
+          'CREATE MATERIALIZED TABLE pares FROM a JOIN b USING (Id); '
+          'RENAME TABLE b a;')
+    assert main.materialized['pares']['sources'] == ['a', 'a']
+    assert not main.materialized['pares']['incremental']
+    assert same_as_rebuilt(views, 'pares', 'FROM a JOIN a USING (Id)')
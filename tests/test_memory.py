@@ -0,0 +1,104 @@
+"""MEMORY_LIMIT: spilling cold tables to SPILL_DIR and reading them back on use"""
+
+import os
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def spill_dir(tmp_path, weather):
+    directory = tmp_path / 'spill'
+    directory.mkdir()
+    weather('SET spill_dir "spill";')
+    return directory
+
+
+def test_spilled_table_is_read_back_on_use(weather, spill_dir):
+    expected = weather('SELECT * FROM observacoes;')
+    main.spill_table('observacoes')
+    table = main.tables['observacoes']
+    assert table['spilled'] and os.path.dirname(table['spilled']) == str(spill_dir)
+    assert len(os.listdir(spill_dir)) == 1
+    assert main.mapped_table_bytes(table) > 0
+
+    weather('SET cache_memory 0;')
+    assert weather('SELECT * FROM observacoes;') == expected
+    assert not main.tables['observacoes'].get('spilled')
+    assert main.mapped_table_bytes(main.tables['observacoes']) == 0
+    assert os.listdir(spill_dir) == []
+    assert main.memory_stats['reloads'] == 1
+
+
+def test_spilling_drops_index_data_and_cached_copy(weather, spill_dir):
+    weather('CREATE INDEX por_id ON observacoes (Id); '
+            'SELECT * FROM observacoes WHERE Id = "E1"; '
+            'CREATE TABLE quentes SELECT * FROM observacoes WHERE Temperatura > 15;')
+    assert main.indexes['por_id']['data'] is not None
+    cached = main.tables['quentes']
+    assert any(entry['table'] is cached for entry in main.result_cache.values())
+
+    main.spill_table('observacoes')
+    main.spill_table('quentes')
+    assert main.indexes['por_id']['data'] is None
+    assert 'zones' not in main.tables['observacoes']
+    assert not any(entry['table'] is cached for entry in main.result_cache.values())
+    assert weather('SELECT COUNT(*) FROM observacoes WHERE Id = "E1";').split()[-1] == '2'
+
+
+def test_memory_limit_spills_least_recently_used(weather, spill_dir):
+    weather('SELECT COUNT(*) FROM estacoes;')
+    limit = main.estimate_table_bytes(main.tables['estacoes']) + 1
+    output = weather(f'SET memory_limit {limit};')
+    assert main.tables['observacoes'].get('spilled')
+    assert not main.tables['estacoes'].get('spilled')
+    assert "Parâmetro 'MEMORY_LIMIT'" in output
+
+
+def test_dropped_or_replaced_spilled_table_removes_its_file(weather, spill_dir, csv_file):
+    main.spill_table('observacoes')
+    main.spill_table('estacoes')
+    weather('DISCARD TABLE observacoes; IMPORT TABLE estacoes FROM "estacoes.csv";')
+    assert os.listdir(spill_dir) == []
+
+
+def test_show_memory_lists_mapped_tables(weather):
+    weather('SAVE TABLE observacoes AS "obs.cqlb"; LOAD TABLE carregada FROM "obs.cqlb";')
+    table = main.tables['carregada']
+    assert main.mapped_table_bytes(table) > main.estimate_table_bytes(table)
+    output = weather('SHOW MEMORY;')
+    assert 'Mapeadas de ficheiros:' in output
+    assert any(line.startswith('carregada | 6 |') and line.endswith('mapeada (LOAD)')
+               for line in output.splitlines())
+
+
+def test_spill_dir_must_exist(weather):
+    assert 'Erro: Diretório' in weather('SET spill_dir "nao_existe";')
+
+
+def test_followed_table_keeps_appended_rows_after_a_spill(weather, spill_dir, csv_file):
+    csv_file('log.csv', 'Id,Valor\n' + ''.join(f'E{i},{i}\n' for i in range(100)))
+    weather('FOLLOW TABLE log FROM "log.csv"; SET memory_limit 1;')
+    assert main.tables['log'].get('spilled')
+    with open('log.csv', 'a', encoding='utf-8') as f:
+        f.write(''.join(f'E{i},{i}\n' for i in range(100, 150)))
+    assert weather('FOLLOW TABLE log FROM "log.csv";').startswith("50 linhas novas de 'log.csv' em 'log' (150 no total)")
+    assert weather('SET cache_memory 0; SELECT COUNT(*) FROM log;').split()[-1] == '150'
+    # Só ficam os ficheiros das tabelas que estão despejadas agora
+    spilled = {os.path.basename(t['spilled']) for t in main.tables.values() if t.get('spilled')}
+    assert set(os.listdir(spill_dir)) == spilled
+
+
+def test_incremental_refresh_of_a_spilled_materialized_table(weather, spill_dir, csv_file):
+    csv_file('mais.csv', 'Id,Temperatura,Humidade,DirecaoVento,DataHoraObservacao\n'
+                         'E2,30.5,40.0,S,2025-04-10T22:00\nE4,5.0,90.0,N,2025-04-10T22:00\n')
+    weather('SET cache_memory 0; '
+            'CREATE MATERIALIZED TABLE quentes SELECT * FROM observacoes WHERE Temperatura > 15;')
+    main.spill_table('quentes')
+    main.spill_table('observacoes')
+    output = weather('IMPORT INTO observacoes FROM "mais.csv" APPEND;')
+    assert "Tabela materializada 'quentes' atualizada (+1 registros)" in output
+    assert weather('SELECT COUNT(*) FROM quentes;').split()[-1] == '4'
+    assert weather('SELECT COUNT(*) FROM observacoes;').split()[-1] == '8'
+    assert os.listdir(spill_dir) == []
@@ -0,0 +1,51 @@
+"""ORDER BY: missing values sort last, whatever the path (full sort, top-K, merge)"""
+
+import pytest
+
+import main
+
+NOMES = 'Nome,Valor\nbeta,2\n,5\nalfa,\ngama,1\n,3\n'
+
+
+def column(output, position=0):
+    """Values of one column of a printed SELECT result"""
+    return [row[position] for row in result_rows(output)]
+
+
+def result_rows(output):
+    return [line.split(' | ') for line in output.strip('\n').splitlines()[2:]]
+
+
+@pytest.fixture
+def nomes(cql, csv_file):
+    csv_file('nomes.csv', NOMES)
+    cql('IMPORT TABLE n FROM "nomes.csv";')
+    return cql
+
+
+@pytest.mark.parametrize('suffix', ['', ' LIMIT 5'])
+def test_missing_text_sorts_last(nomes, suffix):
+    output = nomes(f'SELECT Nome, Valor FROM n ORDER BY Nome{suffix};')
+    assert column(output) == ['alfa', 'beta', 'gama', '', '']
+    output = nomes(f'SELECT Nome, Valor FROM n ORDER BY Nome DESC{suffix};')
+    assert column(output) == ['gama', 'beta', 'alfa', '', '']
+
+
+def test_missing_number_sorts_last(nomes):
+    output = nomes('SELECT Nome, Valor FROM n ORDER BY Valor DESC;')
+    assert column(output, 1) == ['5.0', '3.0', '2.0', '1.0', '']
+
+
+def test_second_key_orders_missing_text(nomes):
+    output = nomes('SELECT Nome, Valor FROM n ORDER BY Nome, Valor DESC;')
+    assert result_rows(output)[-2:] == [['', '5.0'], ['', '3.0']]
+
+
+def test_external_sort_matches_in_memory_sort(cql, csv_file):
+    lines = ['Nome,Valor'] + [f"{'' if i % 7 == 0 else f'n{i % 97:03d}'},{i}" for i in range(3000)]
+    csv_file('muitos.csv', '\n'.join(lines) + '\n')
+    cql('IMPORT TABLE m FROM "muitos.csv"; SET cache_memory 0;')
+    expected = cql('SELECT * FROM m ORDER BY Nome DESC, Valor;')
+    main.settings['sort_memory'] = 4096
+    assert cql('SELECT * FROM m ORDER BY Nome DESC, Valor;') == expected
+    assert column(expected)[-1] == ''
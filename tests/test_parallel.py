@@ -0,0 +1,65 @@
+"""PARALLELISM: scans and join probes on the process pool give the sequential results"""
+
+import pytest
+
+import main
+
+QUERIES = [
+    'SELECT * FROM obs WHERE Temperatura > 20;',
+    'SELECT Id, Temperatura FROM obs WHERE Temperatura >= 10 AND Temperatura < 12 AND Id <> "E3";',
+    'SELECT * FROM obs WHERE Zona = "norte" AND Quando >= "2024-01-05T00:00";',
+    'SELECT * FROM obs WHERE Temperatura > 39 LIMIT 7;',
+    'SELECT Id, COUNT(*), AVG(Temperatura) FROM obs WHERE Temperatura > 5 GROUP BY Id ORDER BY Id;',
+    'SELECT Id, Temperatura FROM obs WHERE Temperatura > 30 ORDER BY Temperatura DESC, Id LIMIT 20;',
+]
+
+
+def observacoes(rows):
+    lines = ['Id,Zona,Temperatura,Quando']
+    for i in range(rows):
+        temperatura = '' if i % 53 == 0 else f'{(i * 7919) % 4000 / 100}'
+        zona = 'norte' if i % 3 else 'sul'
+        lines.append(f'E{i % 40},{zona},{temperatura},2024-01-{1 + i % 28:02d}T{i % 24:02d}:00')
+    return '\n'.join(lines) + '\n'
+
+
+@pytest.fixture
+def obs(cql, csv_file, monkeypatch):
+    monkeypatch.setattr(main, 'PARALLEL_MIN_ROWS', 1000)
+    monkeypatch.setattr(main, 'PARALLEL_MIN_CHUNK', 500)
+    csv_file('obs.csv', observacoes(6000))
+    csv_file('estacoes.csv', '\n'.join(['Id,Local'] + [f'E{k},L{k}' for k in range(0, 50, 2)]) + '\n')
+    cql('SET cache_memory 0; IMPORT TABLE obs FROM "obs.csv"; IMPORT TABLE estacoes FROM "estacoes.csv";')
+    return cql
+
+
+def table_rows(name):
+    columns = main.tables[name]['columns']
+    return sorted(zip(*(map(str, column) for column in columns)))
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_parallel_filter_matches_sequential(obs, query):
+    sequential = obs(query)
+    obs('SET parallelism 3;')
+    assert obs(query) == sequential
+
+
+def test_filter_runs_on_the_workers(obs):
+    assert 'parallel (3 workers)' in obs('SET parallelism 3; EXPLAIN SELECT * FROM obs WHERE Temperatura > 20;')
+    assert 'parallel' not in obs('SET parallelism 1; EXPLAIN SELECT * FROM obs WHERE Temperatura > 20;')
+
+
+def test_parallel_probe_matches_sequential(obs):
+    obs('CREATE TABLE a FROM obs JOIN estacoes USING (Id);')
+    output = obs('SET parallelism 2; EXPLAIN ANALYZE CREATE TABLE b FROM obs JOIN estacoes USING (Id);')
+    assert 'parallel probe (2 workers)' in output
+    assert table_rows('a') == table_rows('b')
+    assert len(table_rows('b')) == 3000
+
+
+def test_parallel_create_select_matches_sequential(obs):
+    obs('CREATE TABLE a SELECT * FROM obs WHERE Temperatura < 8;')
+    obs('SET parallelism 4; CREATE TABLE b SELECT * FROM obs WHERE Temperatura < 8;')
+    assert table_rows('a') == table_rows('b')
+    assert main.tables['a']['types'] == main.tables['b']['types']
@@ -0,0 +1,73 @@
+"""Statements are parsed into AST nodes and compiled into plans that can run many times"""
+
+import io
+from contextlib import redirect_stdout
+
+import pytest
+
+import main
+
+
+def run_plan(plan):
+    output = io.StringIO()
+    with redirect_stdout(output):
+        plan.execute()
+    return output.getvalue()
+
+
+def test_grammar_builds_ast_nodes():
+    select, rename, procedure = main.parse_source(
+        'SELECT Id, Temperatura FROM obs WHERE Temperatura > 20 AND Id = "E1" LIMIT 2;\n'
+        'RENAME TABLE a b;\n'
+        'PROCEDURE p DO DISCARD TABLE x; END;')
+    assert select == {'type': 'select_stmt', 'fields': ['Id', 'Temperatura'], 'table': 'obs',
+                      'conditions': [{'field': 'Temperatura', 'op': '>', 'value': 20},
+                                     {'field': 'Id', 'op': '=', 'value': 'E1'}],
+                      'group_by': None, 'order_by': None, 'limit': 2}
+    assert rename == {'type': 'rename_stmt', 'old_table': 'a', 'new_table': 'b'}
+    assert procedure['body'] == [{'type': 'discard_stmt', 'table': 'x'}]
+
+
+def test_plan_reads_the_catalog_each_time_it_runs(weather):
+    stmt, = main.parse_source('SELECT COUNT(*) FROM obs WHERE Temperatura > 15;')
+    plan = main.compile_statement(stmt)
+    weather('SET cache_memory 0; RENAME TABLE observacoes obs;')
+    assert run_plan(plan).split()[-1] == '3'
+    weather('CREATE TABLE obs SELECT * FROM obs WHERE Id = "E1";')
+    assert run_plan(plan).split()[-1] == '2'
+    weather('DISCARD TABLE obs;')
+    with pytest.raises(main.CQLError, match="Tabela 'obs' não encontrada"):
+        plan.execute()
+
+
+def test_procedure_body_is_compiled_once(weather, monkeypatch):
+    weather('PROCEDURE contar DO SELECT COUNT(*) FROM estacoes; END;')
+    compiled = []
+    monkeypatch.setattr(main, 'compile_statement',
+                        lambda stmt: compiled.append(stmt) or main.PLANNERS[stmt['type']](stmt))
+    output = weather('CALL contar; CALL contar;')
+    assert output.count('\n4\n') == 2
+    assert [stmt['type'] for stmt in compiled] == ['procedure_call', 'procedure_call']
+
+
+def test_statements_end_to_end(weather, tmp_path):
+    output = weather('CREATE TABLE quentes SELECT Id, Temperatura FROM observacoes WHERE Temperatura > 15;\n'
+                     'CREATE TABLE junto FROM quentes JOIN estacoes USING (Id);\n'
+                     'RENAME TABLE junto final;\n'
+                     'EXPORT TABLE final AS "final.csv";\n'
+                     'DISCARD TABLE quentes;')
+    assert 'Erro' not in output
+    assert set(main.tables) == {'estacoes', 'observacoes', 'final'}
+    header, *rows = (tmp_path / 'final.csv').read_text(encoding='utf-8').splitlines()
+    assert header == 'Id,Temperatura,Local,Coordenadas'
+    assert sorted(rows) == [
+        'E1,21.0,Bouro,"[-8.31808611,41.70225278]"',
+        'E1,23.2,Bouro,"[-8.31808611,41.70225278]"',
+        'E3,18.1,"Olhão, EPPO","[-7.821,37.033]"',
+    ]
+
+
+def test_errors_name_the_missing_table_or_column(weather):
+    assert weather('SELECT * FROM nada;') == "Erro: Tabela 'nada' não encontrada\n"
+    assert weather('SELECT Nada FROM estacoes;').startswith("Erro: ")
+    assert weather('DISCARD TABLE nada;').startswith("Erro: ")
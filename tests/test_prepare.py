@@ -0,0 +1,63 @@
+"""PREPARE/EXECUTE and CALL with arguments: parsed once, bound on every run"""
+
+import main
+
+
+def counts(output):
+    """The values printed under each COUNT(*) header of an output"""
+    lines = output.splitlines()
+    return [lines[i + 2] for i, line in enumerate(lines) if line == 'COUNT(*)']
+
+
+def test_execute_binds_the_marks_in_order(weather):
+    output = weather('PREPARE q AS SELECT COUNT(*) FROM observacoes WHERE Id = ? AND Temperatura > ?;')
+    assert "Instrução 'q' preparada com 2 parâmetros" in output
+    output = weather('EXECUTE q ("E1", 15); EXECUTE q ("E2", 10); EXECUTE q ("E3", 20);')
+    assert counts(output) == ['2', '1', '0']
+
+
+def test_wrong_number_of_values(weather):
+    weather('PREPARE q AS SELECT * FROM observacoes WHERE Id = ?;'
+            'PROCEDURE p(estacao) DO SELECT * FROM observacoes WHERE Id = estacao; END;')
+    assert "Erro: A instrução 'q' espera 1 parâmetros (2 dados)" in weather('EXECUTE q ("E1", "E2");')
+    assert "Erro: A instrução 'q' espera 1 parâmetros (0 dados)" in weather('EXECUTE q;')
+    assert "Erro: O procedimento 'p' espera 1 argumentos (0 dados)" in weather('CALL p;')
+    assert "Erro: Instrução preparada 'nada' não encontrada" in weather('EXECUTE nada (1);')
+
+
+def test_mark_outside_prepare(weather):
+    output = weather('SELECT * FROM observacoes WHERE Id = ?;')
+    assert "Erro: '?' só pode ser usado numa instrução PREPARE" in output
+
+
+def test_call_with_arguments(weather):
+    weather('PROCEDURE contar(estacao, minimo) DO '
+            'SELECT COUNT(*) FROM observacoes WHERE Id = estacao AND Temperatura > minimo; END;')
+    assert counts(weather('CALL contar("E1", 22); CALL contar("E3", 15);')) == ['1', '1']
+
+
+def test_nested_call_passes_its_own_arguments(weather):
+    weather('PROCEDURE contar(estacao) DO SELECT COUNT(*) FROM observacoes WHERE Id = estacao; END;'
+            'PROCEDURE todas(a, b) DO CALL contar(a); CALL contar(b); END;')
+    assert counts(weather('CALL todas("E1", "E4");')) == ['2', '1']
+
+
+def test_prepare_inside_a_procedure_keeps_its_arguments(weather):
+    output = weather('PROCEDURE p(estacao) DO '
+                     'PREPARE q AS SELECT COUNT(*) FROM observacoes WHERE Id = estacao AND Temperatura > ?; '
+                     'EXECUTE q (15); END;'
+                     'CALL p("E1"); CALL p("E2");')
+    assert "Instrução 'q' preparada com 1 parâmetros" in output
+    assert counts(output) == ['2', '0']
+    statement = main.prepared['q'].statement
+    assert [param['param'] for param in main.find_parameters(statement)] == ['estacao', 1]
+    # Fora do procedimento o argumento já não existe
+    assert "Erro: Valor 'estacao' desconhecido" in weather('EXECUTE q (15);')
+
+
+def test_cached_results_are_kept_per_value(weather):
+    weather('PREPARE q AS SELECT COUNT(*) FROM observacoes WHERE Id = ?;')
+    first = counts(weather('EXECUTE q ("E1"); EXECUTE q ("E4");'))
+    hits = main.cache_stats['hits']
+    assert counts(weather('EXECUTE q ("E1"); EXECUTE q ("E4");')) == first == ['2', '1']
+    assert main.cache_stats['hits'] - hits == 2
@@ -0,0 +1,51 @@
+"""Running scripts: statements run as they are parsed and errors stay local"""
+
+import main
+
+
+def test_last_statement_without_semicolon_runs(weather):
+    output = weather('PRINT TABLE estacoes;\nSELECT Local FROM estacoes WHERE Id = "E2"')
+    assert 'Bouro' in output
+    assert output.split()[-1] == 'Graciosa'
+
+
+def test_statements_before_a_syntax_error_run(weather):
+    output = weather('SELECT COUNT(*) FROM estacoes;\nSELECT FROM ;\nSELECT * FROM estacoes WHERE')
+    lines = output.splitlines()
+    assert '4' in lines
+    assert any(line.startswith('Erro de sintaxe na linha 2') for line in lines)
+    assert lines[-1] == 'Erro de sintaxe: comando incompleto ou inválido'
+
+
+def test_statement_after_a_syntax_error_runs(weather):
+    output = weather('SELECT FROM ;\nCREATE TABLE e2 SELECT * FROM estacoes;')
+    assert 'e2' in main.tables
+    assert output.startswith('Erro de sintaxe')
+
+
+def test_procedure_without_semicolon_after_end(weather):
+    output = weather('PROCEDURE p DO\n  SELECT COUNT(*) FROM estacoes;\nEND\n'
+                     'CREATE TABLE e2 SELECT * FROM estacoes;\nCALL p;')
+    assert 'p' in main.procedures
+    assert 'e2' in main.tables
+    assert "Procedimento 'p' concluído" in output
+
+
+def test_statements_run_as_they_are_parsed(weather):
+    # O IMPORT já correu quando o SELECT seguinte é executado
+    output = weather('IMPORT TABLE e2 FROM "estacoes.csv"; SELECT COUNT(*) FROM e2;')
+    assert output.splitlines()[-2] == '4'
+
+
+def test_unexpected_error_does_not_stop_the_script(weather, monkeypatch):
+    class Broken:
+        def __init__(self, stmt):
+            pass
+
+        def execute(self):
+            raise RuntimeError('avaria')
+
+    monkeypatch.setitem(main.PLANNERS, 'print_stmt', Broken)
+    output = weather('PRINT TABLE estacoes; CREATE TABLE e2 SELECT * FROM estacoes;')
+    assert 'Erro inesperado em print_stmt: RuntimeError: avaria' in output
+    assert 'e2' in main.tables
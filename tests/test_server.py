@@ -0,0 +1,117 @@
+"""--serve: clients on their own threads share the catalog but not parameters or EXPLAIN state"""
+
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import main
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATIONS = 12
+
+
+def observacoes(rows):
+    lines = ['Id,Temperatura'] + [f'E{i % STATIONS},{i % 40}' for i in range(rows)]
+    return '\n'.join(lines) + '\n'
+
+
+def expected_count(station, rows=3000, above=None):
+    return sum(1 for i in range(rows) if i % STATIONS == station and (above is None or i % 40 > above))
+
+
+def count_value(response):
+    """The value printed under the COUNT(*) header of a response"""
+    lines = response.splitlines()
+    return lines[lines.index('COUNT(*)') + 2]
+
+
+@pytest.fixture
+def server(tmp_path):
+    (tmp_path / 'obs.csv').write_text(observacoes(3000), encoding='utf-8')
+    (tmp_path / 'carregar.fca').write_text(
+        'IMPORT TABLE obs FROM "obs.csv";\n'
+        'PREPARE por_id AS SELECT COUNT(*) FROM obs WHERE Id = ? AND Temperatura > ?;\n'
+        'PROCEDURE contar(estacao) DO SELECT COUNT(*) FROM obs WHERE Id = estacao; END;\n',
+        encoding='utf-8')
+    path = str(tmp_path / 'cql.sock')
+    process = subprocess.Popen([sys.executable, os.path.join(REPO_DIR, 'main.py'), 'carregar.fca',
+                                '--serve', f'unix:{path}', '--threads', '4'],
+                               cwd=tmp_path, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    deadline = time.monotonic() + 20
+    while not os.path.exists(path):
+        assert process.poll() is None, process.stderr.read().decode()
+        assert time.monotonic() < deadline, 'o servidor não arrancou'
+        time.sleep(0.05)
+
+    def ask(*statements):
+        """Send statements on one connection and return the response to each"""
+        responses = []
+        with socket.socket(socket.AF_UNIX) as client:
+            client.connect(path)
+            stream = client.makefile('rw', encoding='utf-8', newline='\n')
+            for statement in statements:
+                stream.write(statement + '\n')
+                stream.flush()
+                lines = []
+                for line in stream:
+                    if line == '.\n':
+                        break
+                    lines.append(line[1:] if line.startswith('..') else line)
+                responses.append(''.join(lines))
+            stream.write('sair\n')
+            stream.flush()
+        return responses
+
+    yield ask
+    process.terminate()
+    process.wait(10)
+
+
+def test_prepared_statements_from_many_clients(server):
+    def client(station):
+        above = station % 5 * 8
+        responses = server(*[f'EXECUTE por_id ("E{station}", {above});'] * 10)
+        return set(map(count_value, responses)), str(expected_count(station, above=above))
+
+    with ThreadPoolExecutor(STATIONS) as pool:
+        for counts, expected in pool.map(client, range(STATIONS)):
+            assert counts == {expected}
+
+
+def test_procedure_arguments_from_many_clients(server):
+    def client(station):
+        responses = server(*[f'CALL contar("E{station}");'] * 5)
+        return set(map(count_value, responses)), str(expected_count(station))
+
+    with ThreadPoolExecutor(STATIONS) as pool:
+        for counts, expected in pool.map(client, range(STATIONS)):
+            assert counts == {expected}
+
+
+def test_statement_split_over_lines_and_errors(server):
+    response, error = server('SELECT COUNT(*)\nFROM obs\nWHERE Temperatura > 38;', 'SELECT * FROM nada;')
+    assert count_value(response) == str(sum(1 for i in range(3000) if i % 40 > 38))
+    assert error == "Erro: Tabela 'nada' não encontrada\n"
+
+
+def test_explain_analyze_bypass_stays_in_its_thread(weather, monkeypatch):
+    output = main.ThreadOutput(sys.stdout)
+    monkeypatch.setattr(sys, 'stdout', output)
+    query = 'SELECT * FROM observacoes WHERE Temperatura > 15;'
+    main.serve_request(output, query)
+    hits = main.cache_stats['hits']
+    requests = [query if i % 2 else 'EXPLAIN ANALYZE ' + query for i in range(40)]
+    with ThreadPoolExecutor(8) as pool:
+        responses = list(pool.map(lambda source: main.serve_request(output, source), requests))
+    for source, response in zip(requests, responses):
+        if source.startswith('EXPLAIN'):
+            assert 'Filter Temperatura > 15 [full scan]  (linhas: 6 -> 3' in response
+        else:
+            assert response == responses[1]
+    # Nenhum SELECT foi executado sem a cache por causa de um EXPLAIN ANALYZE de outra thread
+    assert main.cache_stats['hits'] - hits == 20
@@ -0,0 +1,80 @@
+"""Point columns: WITHIN_BBOX, WITHIN_DISTANCE and NEAREST with and without a grid index"""
+
+import random
+
+import pytest
+
+import main
+
+QUERIES = [
+    'SELECT Id FROM e WHERE WITHIN_BBOX(Local, -9, 38, -8, 40);',
+    'SELECT Id FROM e WHERE WITHIN_BBOX(Local, -9, 38, -8, 40) AND Zona = "Z1";',
+    'SELECT Id FROM e WHERE WITHIN_DISTANCE(Local, -8.6, 41.1, 75);',
+    'SELECT Id FROM e WHERE WITHIN_DISTANCE(Local, -16.9, 32.6, 1);',
+    'SELECT Id FROM e WHERE NEAREST(Local, -9.1, 38.7, 5);',
+    'SELECT Id FROM e WHERE NEAREST(Local, -27, 38.5, 12) AND Zona <> "Z0";',
+]
+
+
+def estacoes(rows):
+    rng = random.Random(5)
+    lines = ['Id,Zona,Local']
+    for i in range(rows):
+        local = '' if i % 97 == 0 else f'"[{rng.uniform(-31, -6):.6f},{rng.uniform(32, 42):.6f}]"'
+        lines.append(f'E{i},Z{i % 3},{local}')
+    return '\n'.join(lines) + '\n'
+
+
+@pytest.fixture
+def e(cql, csv_file):
+    csv_file('e.csv', estacoes(2000))
+    cql('SET cache_memory 0; IMPORT TABLE e FROM "e.csv";')
+    return cql
+
+
+def ids(output):
+    return output.strip('\n').splitlines()[2:]
+
+
+def points():
+    table = main.tables['e']
+    return [(i, zona, point) for i, zona, point in zip(*table['columns']) if point[0] == point[0]]
+
+
+def test_coordinates_are_point_columns(e):
+    assert main.tables['e']['types'] == ['str', 'str', 'point']
+    assert isinstance(main.tables['e']['columns'][2], main.PointColumn)
+
+
+def test_bbox_and_distance_match_brute_force(e):
+    assert ids(e(QUERIES[0])) == [i for i, _, (lon, lat) in points()
+                                  if -9 <= lon <= -8 and 38 <= lat <= 40]
+    assert ids(e(QUERIES[2])) == [i for i, _, (lon, lat) in points()
+                                  if main.haversine_km(lon, lat, -8.6, 41.1) <= 75]
+
+
+def test_nearest_returns_the_k_closest_first(e):
+    by_distance = sorted(points(), key=lambda p: main.haversine_km(*p[2], -9.1, 38.7))
+    assert ids(e(QUERIES[4])) == [i for i, _, _ in by_distance[:5]]
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_grid_index_gives_the_rows_of_a_scan(e, query):
+    scanned = e(query)
+    output = e('CREATE INDEX g ON e (Local) USING GRID; EXPLAIN ' + query)
+    assert "grid index 'g'" in output
+    assert e(query) == scanned
+
+
+def test_point_equality(e):
+    i, _, (lon, lat) = points()[10]
+    assert ids(e(f'SELECT Id FROM e WHERE Local = "[{lon!r},{lat!r}]";')) == [i]
+    assert ids(e('SELECT COUNT(*) FROM e WHERE Local = "x";')) == ['0']
+
+
+def test_spatial_errors(e):
+    assert e('SELECT Id FROM e WHERE WITHIN_BBOX(Zona, 0, 0, 1, 1);').startswith(
+        "Erro: WITHIN_BBOX requer uma coluna espacial")
+    assert e('SELECT Id FROM e WHERE NEAREST(Local, 0, 0, 0);').startswith(
+        "Erro: NEAREST requer um número inteiro positivo")
+    assert e('SELECT Id FROM e WHERE Local > "[0,0]";').startswith("Erro: Operador '>'")
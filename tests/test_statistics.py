@@ -0,0 +1,83 @@
+"""ANALYZE TABLE: the statistics change the plan, never the rows it returns"""
+
+import pytest
+
+import main
+
+QUERIES = [
+    'SELECT * FROM t WHERE Id = "E0";',
+    'SELECT * FROM t WHERE Id = "E10" AND V > 5000;',
+    'SELECT * FROM t WHERE Par = 1 AND V < 100;',
+    'SELECT * FROM t WHERE Id = "E0" AND Par <> 1 AND Regiao = "R1";',
+    'SELECT Regiao, COUNT(*) FROM t WHERE V >= 9000 GROUP BY Regiao ORDER BY Regiao;',
+]
+
+
+def dados(rows):
+    # Id muito desequilibrado: E0 está em 90% das linhas
+    lines = ['Id,Par,V,Regiao'] + [f"{'E0' if i % 10 else f'E{i % 500}'},{i % 2},{(i * 7919) % 10000},R{i % 3}"
+                                   for i in range(rows)]
+    return '\n'.join(lines) + '\n'
+
+
+@pytest.fixture
+def t(cql, csv_file):
+    csv_file('t.csv', dados(20000))
+    csv_file('s.csv', '\n'.join(['Id,Nome'] + [f'E{k},N{k}' for k in range(500)]) + '\n')
+    cql('SET cache_memory 0; IMPORT TABLE t FROM "t.csv"; IMPORT TABLE s FROM "s.csv"; '
+        'CREATE INDEX ix ON t (Id); CREATE INDEX iv ON t (V) USING SORTED;')
+    return cql
+
+
+def plan(cql, query):
+    return cql('EXPLAIN ' + query)
+
+
+def test_results_do_not_change_after_analyze(t):
+    before = [t(query) for query in QUERIES]
+    t('ANALYZE TABLE t; ANALYZE TABLE s;')
+    assert [t(query) for query in QUERIES] == before
+    assert all('est.' in plan(t, query) for query in QUERIES)
+
+
+def test_unselective_index_is_left_aside(t):
+    assert "hash index 'ix' on Id = 'E0'" in plan(t, QUERIES[0])
+    t('ANALYZE TABLE t;')
+    assert "Filter Id = 'E0' [full scan, est. 18" in plan(t, QUERIES[0])
+    assert "hash index 'ix' on Id = 'E10'" in plan(t, QUERIES[1])
+
+
+def test_selective_conditions_are_tested_first(t):
+    query = 'SELECT * FROM t WHERE Par <> 1 AND Regiao = "R1";'
+    assert "Filter Par <> 1 AND Regiao = 'R1' [full scan]" in plan(t, query)
+    t('ANALYZE TABLE t;')
+    assert "Filter Regiao = 'R1' AND Par <> 1 [full scan, est. 3334 rows]" in plan(t, query)
+
+
+def test_estimate_counts_the_conditions_answered_by_an_index(t):
+    t('ANALYZE TABLE t;')
+    assert "[sorted index 'iv' on V < 100, est. 100 rows]" in plan(t, QUERIES[2])
+    output = plan(t, 'SELECT * FROM t WHERE Id = "E10";')
+    assert "[hash index 'ix' on Id = 'E10', est. 40 rows]" in output
+
+
+def test_join_estimates(t):
+    t('CREATE TABLE r SELECT Id, Regiao FROM t WHERE V < 500;')
+    before = plan(t, 'CREATE TABLE j FROM r JOIN s USING (Id);')
+    assert '[hash build on s]' in before and 'est.' not in before
+    t('CREATE TABLE j0 FROM r JOIN s USING (Id);')
+    t('ANALYZE TABLE r; ANALYZE TABLE s;')
+    assert '[hash build on s, est. ' in plan(t, 'CREATE TABLE j FROM r JOIN s USING (Id);')
+    t('CREATE TABLE j1 FROM r JOIN s USING (Id);')
+    assert sorted(zip(*main.tables['j0']['columns'])) == sorted(zip(*main.tables['j1']['columns']))
+
+
+def test_statistics_are_dropped_when_the_table_changes(t, csv_file):
+    t('ANALYZE TABLE t;')
+    assert main.table_stats['t']['rows'] == 20000
+    csv_file('mais.csv', 'Id,Par,V,Regiao\nE1,1,1,R1\n')
+    t('IMPORT INTO t FROM "mais.csv" APPEND;')
+    assert 't' not in main.table_stats
+    assert 'est.' not in plan(t, QUERIES[0])
+    t('SET auto_analyze 1; IMPORT TABLE t FROM "t.csv";')
+    assert main.table_stats['t']['rows'] == 20000
@@ -0,0 +1,51 @@
+"""Typed columns: what IMPORT infers from the CSV text"""
+
+import math
+
+import pytest
+
+import main
+
+
+@pytest.mark.parametrize('values, col_type', [
+    (['1', '-2', '+3', '0'], 'int'),
+    (['1', '2.5', ''], 'float'),
+    (['.5', '1e5', '-0.25'], 'float'),
+    (['2024-01-01T10:00', '2024-01-02', '2024-01-02 10:00:30Z'], 'timestamp'),
+    (['[1.5,2.5]', ''], 'point'),
+    (['007', '008'], 'str'),         # códigos com zeros à esquerda
+    (['00.5', '1.5'], 'str'),
+    (['1_000', '2'], 'str'),
+    ([' 7', '8'], 'str'),
+    (['1.5', 'nan'], 'str'),
+    (['inf', '1'], 'str'),
+    (['2024-W01-1', '2024-01-01'], 'str'),   # datas por semana
+    (['2024-13-01'], 'str'),
+    (['', ''], 'str'),
+])
+def test_infer_column_type(values, col_type):
+    assert main.infer_column(values)[0] == col_type
+
+
+def test_zero_padded_codes_keep_their_text(cql, csv_file):
+    csv_file('codigos.csv', 'Codigo,Valor\n007,1\n010,2\n')
+    cql('IMPORT TABLE c FROM "codigos.csv";')
+    table = main.tables['c']
+    assert table['types'] == ['str', 'int']
+    assert list(table['columns'][0]) == ['007', '010']
+
+
+def test_missing_values(weather):
+    table = main.tables['observacoes']
+    assert table['types'] == ['str', 'float', 'float', 'str', 'timestamp']
+    assert math.isnan(table['columns'][1][5])
+    assert math.isnan(table['columns'][2][2])
+
+
+def test_append_rejects_cells_that_do_not_fit(cql, csv_file):
+    csv_file('a.csv', 'Id,N\nx,1\n')
+    csv_file('b.csv', 'Id,N\ny,007\nz,1_0\nw,2\n')
+    output = cql('IMPORT TABLE t FROM "a.csv"; IMPORT INTO t FROM "b.csv" APPEND;')
+    assert "Linha 2 ignorada - valor '007' inválido para a coluna 'N' (int)" in output
+    assert "Linha 3 ignorada - valor '1_0' inválido" in output
+    assert list(main.tables['t']['columns'][1]) == [1, 2]
@@ -0,0 +1,64 @@
+"""Streaming SELECT: rows are pulled by the sink, so LIMIT stops the scan early"""
+
+import pytest
+
+import main
+
+
+def rows(output):
+    return output.strip('\n').splitlines()[2:]
+
+
+@pytest.fixture
+def medidas(cql, csv_file):
+    lines = ['Id,Valor'] + [f'M{i},{i % 100}' for i in range(20000)]
+    csv_file('medidas.csv', '\n'.join(lines) + '\n')
+    cql('SET cache_memory 0; IMPORT TABLE medidas FROM "medidas.csv";')
+    return cql
+
+
+@pytest.fixture
+def tested_rows(monkeypatch):
+    """Number of rows the WHERE predicates were evaluated on"""
+    calls = [0]
+    compile_conditions = main.compile_conditions
+
+    def counting(conditions, relation):
+        predicate = compile_conditions(conditions, relation)
+        if predicate is None:
+            return None
+
+        def counted(i):
+            calls[0] += 1
+            return predicate(i)
+        return counted
+
+    monkeypatch.setattr(main, 'compile_conditions', counting)
+    return calls
+
+
+@pytest.mark.parametrize('query', [
+    'SELECT * FROM medidas WHERE Valor > 49',
+    'SELECT Id FROM medidas WHERE Valor = 7',
+    'SELECT Valor, Id FROM medidas',
+])
+@pytest.mark.parametrize('limit', [1, 3, 250])
+def test_limit_gives_the_first_rows(medidas, query, limit):
+    everything = rows(medidas(query + ';'))
+    assert rows(medidas(f'{query} LIMIT {limit};')) == everything[:limit]
+
+
+def test_limit_stops_the_scan(medidas, tested_rows):
+    assert len(rows(medidas('SELECT Id FROM medidas WHERE Valor = 7 LIMIT 3;'))) == 3
+    assert tested_rows[0] <= 208
+
+
+def test_scan_without_limit_tests_every_row(medidas, tested_rows):
+    assert len(rows(medidas('SELECT Id FROM medidas WHERE Valor = 7;'))) == 200
+    assert tested_rows[0] == 20000
+
+
+def test_create_table_from_a_limited_select(medidas, tested_rows):
+    medidas('CREATE TABLE poucas SELECT Id FROM medidas WHERE Valor > 90 LIMIT 4;')
+    assert list(main.tables['poucas']['columns'][0]) == ['M91', 'M92', 'M93', 'M94']
+    assert tested_rows[0] == 95
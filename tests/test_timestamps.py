@@ -0,0 +1,92 @@
+"""Timestamp columns: ISO-8601 parsing, time-range pruning and TIME_BUCKET"""
+
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+import main
+
+START = datetime(2024, 3, 1)
+
+RANGES = [
+    'Quando >= "2024-03-02T00:00"',
+    'Quando < "2024-03-01T12:00"',
+    'Quando >= "2024-03-01T06:30" AND Quando <= "2024-03-01T09:00"',
+    'Quando > "2024-03-03T00:00:00Z" AND Valor > 50',
+    'Quando = "2024-03-01T10:20"',
+    'Quando <> "2024-03-01T10:20"',
+    'Quando > "2030-01-01"',
+]
+
+
+def leituras(rows, shuffle=False):
+    lines = [f"{'' if i % 89 == 0 else (START + timedelta(minutes=10 * i)).strftime('%Y-%m-%dT%H:%M')},"
+             f"{i % 100}" for i in range(rows)]
+    if shuffle:
+        random.Random(3).shuffle(lines)
+    else:
+        lines.sort(key=lambda line: line.split(',')[0])
+    return 'Quando,Valor\n' + '\n'.join(lines) + '\n'
+
+
+@pytest.fixture
+def tempos(cql, csv_file):
+    csv_file('ordenado.csv', leituras(3000))
+    csv_file('baralhado.csv', leituras(3000, shuffle=True))
+    cql('SET cache_memory 0; IMPORT TABLE ordenado FROM "ordenado.csv"; '
+        'IMPORT TABLE baralhado FROM "baralhado.csv";')
+    return cql
+
+
+def result_rows(output):
+    return Counter(output.strip('\n').splitlines()[2:])
+
+
+def test_cells_are_parsed_as_utc_instants(cql, csv_file):
+    csv_file('t.csv', 'Id,Quando\nA,2024-03-01T10:15\nB,2024-03-01T10:45:30\nC,\n'
+                      'D,2024-03-01T11:05+01:00\nE,2024-03-02\nF,2024-03-02 01:00Z\n')
+    output = cql('IMPORT TABLE t FROM "t.csv"; PRINT TABLE t;')
+    assert main.tables['t']['types'] == ['str', 'timestamp']
+    assert output.strip('\n').splitlines()[-6:] == [
+        'A | 2024-03-01T10:15:00', 'B | 2024-03-01T10:45:30', 'C | ',
+        'D | 2024-03-01T10:05:00', 'E | 2024-03-02T00:00:00', 'F | 2024-03-02T01:00:00']
+
+
+@pytest.mark.parametrize('condition', RANGES)
+def test_time_range_on_sorted_column_matches_full_scan(tempos, condition):
+    pruned = tempos(f'SELECT * FROM ordenado WHERE {condition};')
+    scanned = tempos(f'SELECT * FROM baralhado WHERE {condition};')
+    assert result_rows(pruned) == result_rows(scanned)
+
+
+def test_sorted_column_is_searched_not_scanned(tempos):
+    output = tempos('EXPLAIN SELECT * FROM ordenado WHERE Quando >= "2024-03-02T00:00";')
+    assert 'binary search on sorted Quando' in output
+    output = tempos('EXPLAIN SELECT * FROM baralhado WHERE Quando >= "2024-03-02T00:00";')
+    assert 'binary search' not in output
+
+
+def test_missing_instants_match_no_range(tempos):
+    output = tempos('SELECT COUNT(*) FROM baralhado WHERE Quando < "2030-01-01";')
+    assert output.split()[-1] == str(3000 - 34)
+
+
+@pytest.mark.parametrize('width, seconds', [('30m', 1800), ('1h', 3600), ('1d', 86400)])
+def test_time_bucket_groups_by_interval(tempos, width, seconds):
+    output = tempos(f'SELECT TIME_BUCKET("{width}", Quando), COUNT(*) FROM baralhado '
+                    f'GROUP BY TIME_BUCKET("{width}", Quando);')
+    table = main.tables['baralhado']
+    expected = Counter('' if t == main.MISSING_TIMESTAMP else main.format_timestamp(t - t % seconds)
+                       for t in table['columns'][0])
+    assert dict(row.split(' | ') for row in output.strip('\n').splitlines()[2:]) == {
+        bucket: str(count) for bucket, count in expected.items()}
+
+
+def test_invalid_literals_and_intervals(tempos):
+    assert tempos('SELECT * FROM ordenado WHERE Quando > "ontem";').startswith(
+        "Erro: Valor 'ontem' inválido para a coluna temporal 'Quando'")
+    assert tempos('SELECT COUNT(*) FROM ordenado WHERE Quando = "ontem";').split()[-1] == '0'
+    assert tempos('SELECT TIME_BUCKET("0h", Quando), COUNT(*) FROM ordenado '
+                  'GROUP BY TIME_BUCKET("0h", Quando);').startswith("Erro: Intervalo inválido")
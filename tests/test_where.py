@@ -0,0 +1,74 @@
+"""Compiled WHERE predicates: the same rows as evaluating each condition in turn"""
+
+import operator
+from itertools import product
+
+import pytest
+
+import main
+
+OPS = {'>': operator.gt, '<': operator.lt, '>=': operator.ge, '<=': operator.le,
+       '=': operator.eq, '<>': operator.ne}
+
+
+def matching_ids(table, conditions):
+    relation = main.table_relation(table)
+    predicate = main.compile_conditions(conditions, relation)
+    return [i for i in relation['ids'] if predicate is None or predicate(i)]
+
+
+def naive_ids(table, conditions):
+    """Row ids for which every condition holds, one Python comparison at a time"""
+    ids = []
+    for i in range(main.table_size(table)):
+        for cond in conditions:
+            column = table['columns'][table['headers'].index(cond['field'])]
+            value = cond['value']
+            if isinstance(column[i], float):
+                value = float(value)
+            if not OPS[cond['op']](column[i], value):
+                break
+        else:
+            ids.append(i)
+    return ids
+
+
+@pytest.fixture
+def observacoes(weather):
+    return main.tables['observacoes']
+
+
+@pytest.mark.parametrize('op, value', list(product(OPS, [9.8, 18.1, 20, '21.0', -1])))
+def test_numeric_condition(observacoes, op, value):
+    conditions = [{'field': 'Temperatura', 'op': op, 'value': value}]
+    assert matching_ids(observacoes, conditions) == naive_ids(observacoes, conditions)
+
+
+@pytest.mark.parametrize('first, second', list(product(
+    [('Temperatura', '>', 10), ('Humidade', '<=', 90), ('Temperatura', '<>', 12.5)],
+    [('Id', '=', 'E1'), ('Id', '<>', 'E2'), ('DirecaoVento', '=', 'NE'), ('Humidade', '>=', 61.5)])))
+def test_condition_lists(observacoes, first, second):
+    conditions = [dict(zip(('field', 'op', 'value'), c)) for c in (first, second)]
+    assert matching_ids(observacoes, conditions) == naive_ids(observacoes, conditions)
+
+
+def test_missing_numbers_never_match_a_comparison(observacoes):
+    for op in ('>', '<', '>=', '<=', '='):
+        ids = matching_ids(observacoes, [{'field': 'Temperatura', 'op': op, 'value': 12.5}])
+        assert 5 not in ids        # E2 sem temperatura
+
+
+def test_conditions_decided_without_the_rows(weather, observacoes):
+    assert matching_ids(observacoes, []) == list(range(6))
+    assert matching_ids(observacoes, [{'field': 'Nada', 'op': '=', 'value': 1}]) == []
+    assert matching_ids(observacoes, [{'field': 'Temperatura', 'op': '=', 'value': 'x'}]) == []
+    assert len(matching_ids(observacoes, [{'field': 'Temperatura', 'op': '<>', 'value': 'x'}])) == 6
+    assert weather('SELECT * FROM observacoes WHERE Temperatura > "x";').startswith(
+        "Erro: Valor 'x' inválido para a coluna numérica 'Temperatura'")
+    assert weather('SELECT * FROM observacoes WHERE Id > "E1";').startswith(
+        "Erro: Operador '>' requer uma coluna numérica")
+
+
+def test_select_uses_the_compiled_predicate(weather):
+    output = weather('SELECT Id, Temperatura FROM observacoes WHERE Temperatura >= 12.5 AND Id <> "E1";')
+    assert output.strip('\n').splitlines()[2:] == ['E2 | 12.5', 'E3 | 18.1']
@@ -0,0 +1,73 @@
+"""Zone maps: skipped blocks never hold a matching row"""
+
+import random
+from collections import Counter
+
+import pytest
+
+import main
+
+QUERIES = [
+    'SELECT * FROM {t} WHERE Valor > 18000;',
+    'SELECT * FROM {t} WHERE Valor < 1500 AND Medida >= 3;',
+    'SELECT * FROM {t} WHERE Valor >= 5000 AND Valor <= 5100;',
+    'SELECT * FROM {t} WHERE Valor = 12345;',
+    'SELECT * FROM {t} WHERE Valor <> 12345 AND Valor > 19990;',
+    'SELECT * FROM {t} WHERE Medida > 100;',
+    'SELECT * FROM {t} WHERE Quando < "2024-01-01T05:00";',
+]
+
+
+def medidas(rows, shuffle=False, start=0):
+    lines = []
+    for i in range(start, start + rows):
+        # Quase ordenada pela chegada, com algumas leituras atrasadas
+        valor = '' if i % 211 == 0 else str(i - 3000 if i % 997 == 0 else i)
+        medida = '' if i % 13 == 0 else str(i % 7)
+        quando = '' if i % 401 == 0 else f'2024-01-01T{i // 1000:02d}:{i % 60:02d}'
+        lines.append(f'{valor},{medida},{quando}')
+    if shuffle:
+        random.Random(1).shuffle(lines)
+    return 'Valor,Medida,Quando\n' + '\n'.join(lines) + '\n'
+
+
+@pytest.fixture
+def zonas(cql, csv_file):
+    csv_file('chegada.csv', medidas(20000))
+    csv_file('baralhado.csv', medidas(20000, shuffle=True))
+    cql('SET cache_memory 0; IMPORT TABLE chegada FROM "chegada.csv"; '
+        'IMPORT TABLE baralhado FROM "baralhado.csv";')
+    return cql
+
+
+def result_rows(output):
+    return Counter(output.strip('\n').splitlines()[2:])
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_zone_maps_keep_every_match(zonas, query):
+    assert result_rows(zonas(query.format(t='chegada'))) == result_rows(zonas(query.format(t='baralhado')))
+
+
+def test_blocks_are_skipped(zonas):
+    output = zonas('EXPLAIN SELECT * FROM chegada WHERE Valor > 18000;')
+    assert 'zone maps on Valor > 18000: 1 of 5 blocks' in output
+    output = zonas('EXPLAIN SELECT * FROM baralhado WHERE Valor > 18000;')
+    assert '[full scan]' in output
+
+
+def test_appended_rows_extend_the_zone_maps(zonas, csv_file):
+    zonas('SELECT * FROM chegada WHERE Valor > 18000;')
+    csv_file('mais.csv', medidas(3000, start=20000).replace('20000,', '17,', 1))
+    zonas('IMPORT INTO chegada FROM "mais.csv" APPEND; IMPORT INTO baralhado FROM "mais.csv" APPEND;')
+    assert len(main.tables['chegada']['zones'][0]['min']) == 6
+    for query in QUERIES + ['SELECT * FROM {t} WHERE Valor < 20;']:
+        assert result_rows(zonas(query.format(t='chegada'))) == result_rows(zonas(query.format(t='baralhado')))
+
+
+def test_zone_maps_survive_save_and_load(zonas):
+    zonas('SELECT * FROM chegada WHERE Valor > 18000; SAVE TABLE chegada AS "c.cqlb"; '
+          'LOAD TABLE copia FROM "c.cqlb";')
+    assert main.tables['copia']['zones'][0] == main.tables['chegada']['zones'][0]
+    for query in QUERIES:
+        assert result_rows(zonas(query.format(t='copia'))) == result_rows(zonas(query.format(t='baralhado')))